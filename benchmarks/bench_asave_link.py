@@ -0,0 +1,105 @@
+"""Benchmark the event loop latency while save links are generated.
+
+A ticker task sleeps 1 ms in a loop and records how late it wakes up, while
+``CONCURRENCY`` tasks generate ``LINKS`` save links: with ``api.save_link``
+called on the event loop, and with ``api.asave_link`` signing in a thread and
+in a process pool. The lateness is what every other request of an async server
+waits on top of its own work.
+
+Run with::
+
+    python benchmarks/bench_asave_link.py
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from edutap.wallet_google import api
+from joserfc.jwk import RSAKey
+
+import asyncio
+import os
+import statistics
+import time
+
+
+LINKS = 2000
+CONCURRENCY = 50
+TICK = 0.001
+
+
+async def ticker(lateness: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lateness.append(time.perf_counter() - start - TICK)
+
+
+async def measure(label: str, generate) -> None:
+    lateness: list[float] = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lateness, stop))
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(num: int) -> None:
+        async with semaphore:
+            await generate(num)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(num) for num in range(LINKS)))
+    seconds = time.perf_counter() - start
+    stop.set()
+    await tick
+    lateness.sort()
+    p99 = lateness[int(len(lateness) * 0.99)] if lateness else 0.0
+    print(
+        f"{label:<18} {LINKS / seconds:8.0f} links/s   loop lateness "
+        f"p50 {statistics.median(lateness or [0]) * 1000:7.2f} ms "
+        f"p99 {p99 * 1000:7.2f} ms max {max(lateness or [0]) * 1000:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    credentials = {
+        "client_email": "issuer@example.iam.gserviceaccount.com",
+        "private_key_id": "bench",
+        "private_key": RSAKey.generate_key(2048).as_pem(private=True).decode(),
+    }
+
+    def models(num: int) -> list:
+        return [
+            api.new(
+                "GenericObject",
+                {
+                    "id": f"3388000000022141777.object.{num}",
+                    "classId": "3388000000022141777.class",
+                    "state": "ACTIVE",
+                },
+            )
+        ]
+
+    api.save_link(models(0), credentials=credentials)  # warm up the key cache
+    print(f"{LINKS} links, {CONCURRENCY} concurrent, {os.cpu_count()} CPUs")
+
+    async def on_loop(num: int) -> str:
+        return api.save_link(models(num), credentials=credentials)
+
+    await measure("save_link", on_loop)
+
+    for label, executor in (
+        ("asave_link thread", ThreadPoolExecutor()),
+        ("asave_link process", ProcessPoolExecutor()),
+    ):
+        with executor:
+            # start the workers before measuring
+            await api.asave_link(models(0), credentials=credentials, executor=executor)
+
+            async def off_loop(num: int, executor=executor) -> str:
+                return await api.asave_link(
+                    models(num), credentials=credentials, executor=executor
+                )
+
+            await measure(label, off_loop)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""Benchmark the throughput of the pooled async client with HTTP/1.1 and HTTP/2.
+
+Starts a local stand-in server answering every request after a fixed latency,
+once speaking HTTP/1.1 and once HTTP/2 (cleartext, with prior knowledge), and
+sends concurrent reads through transports built with the connection limits of
+the settings, like the pooled clients are.
+
+With HTTP/1.1 every request in flight needs its own connection, so at most
+``HTTP_MAX_CONNECTIONS`` requests are in flight. HTTP/2 multiplexes them over
+one connection.
+
+Needs the http2 extra. Run with::
+
+    EDUTAP_WALLET_GOOGLE_HTTP_MAX_CONNECTIONS=10 python benchmarks/bench_http2.py
+"""
+
+from edutap.wallet_google.clientpool import ClientPoolManager
+
+import asyncio
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+import time
+
+
+LATENCY = 0.02
+REQUESTS = 1000
+CONCURRENCIES = (10, 50, 200)
+BODY = b'{"id": "3388000000022141777.object.1", "classId": "3388000000022141777.class"}'
+
+
+async def serve_http1(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Answer keep-alive HTTP/1.1 GET requests, one at a time per connection."""
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            await asyncio.sleep(LATENCY)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(BODY), BODY)
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_http2(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Answer HTTP/2 requests, concurrently on the streams of a connection."""
+    connection = h2.connection.H2Connection(
+        config=h2.config.H2Configuration(client_side=False)
+    )
+    connection.initiate_connection()
+    writer.write(connection.data_to_send())
+
+    async def respond(stream_id: int):
+        await asyncio.sleep(LATENCY)
+        connection.send_headers(
+            stream_id,
+            [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(BODY))),
+            ],
+        )
+        connection.send_data(stream_id, BODY, end_stream=True)
+        writer.write(connection.data_to_send())
+
+    tasks = set()
+    try:
+        while data := await reader.read(65535):
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    task = asyncio.ensure_future(respond(event.stream_id))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            writer.write(connection.data_to_send())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run(serve, http2: bool, concurrency: int) -> float:
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    manager = ClientPoolManager()
+    transport = httpx.AsyncHTTPTransport(
+        limits=manager._build_limits(), http1=not http2, http2=http2
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    url = f"http://127.0.0.1:{port}/walletobjects/v1/genericObject/1"
+    async with httpx.AsyncClient(transport=transport) as client:
+
+        async def read():
+            async with semaphore:
+                response = await client.get(url)
+                response.raise_for_status()
+
+        await read()  # connect before measuring
+        start = time.perf_counter()
+        await asyncio.gather(*(read() for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+    return REQUESTS / elapsed
+
+
+async def main():
+    settings = ClientPoolManager().settings
+    print(
+        f"{REQUESTS} requests, {LATENCY * 1000:.0f} ms latency, "
+        f"max_connections={settings.http_max_connections}"
+    )
+    print(f"{'concurrent':>10} {'HTTP/1.1':>10} {'HTTP/2':>10}  requests/s")
+    for concurrency in CONCURRENCIES:
+        http1 = await run(serve_http1, False, concurrency)
+        http2 = await run(serve_http2, True, concurrency)
+        print(f"{concurrency:>10} {http1:>10.0f} {http2:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Benchmark lazy record views against fully validated listing records.
+
+Decodes 100-record pages of wide GenericObject and FlightObject payloads and
+reads ``id``, ``state`` and ``hasUsers`` of each record, once with validated
+model instances and once with ``lazy=True`` views.
+
+Run with::
+
+    python benchmarks/bench_lazy_listing.py
+"""
+
+from edutap.wallet_google.api import _parse_listing_page
+from edutap.wallet_google.registry import lookup_model_by_name
+
+import json
+import timeit
+import tracemalloc
+
+
+ROUNDS = 100
+
+
+def localized(value: str) -> dict:
+    return {
+        "defaultValue": {"language": "en", "value": value},
+        "translatedValues": [{"language": "de", "value": f"{value} (de)"}],
+    }
+
+
+def wide_object(num: int) -> dict:
+    return {
+        "id": f"3388000000022141777.object.{num}",
+        "classId": "3388000000022141777.class",
+        "state": "ACTIVE",
+        "hasUsers": bool(num % 2),
+        "barcode": {"type": "QR_CODE", "value": f"barcode-{num}"},
+        "textModulesData": [
+            {"header": f"Header {index}", "body": "Body " * 20, "id": f"t{index}"}
+            for index in range(10)
+        ],
+        "imageModulesData": [
+            {
+                "mainImage": {
+                    "sourceUri": {"uri": f"https://example.com/{index}.png"},
+                    "contentDescription": localized(f"Image {index}"),
+                },
+                "id": f"i{index}",
+            }
+            for index in range(4)
+        ],
+        "linksModuleData": {
+            "uris": [
+                {"uri": f"https://example.com/{index}", "description": "Link"}
+                for index in range(5)
+            ]
+        },
+        "messages": [
+            {"header": f"Message {index}", "body": "Body", "id": f"m{index}"}
+            for index in range(5)
+        ],
+    }
+
+
+def generic_object(num: int) -> dict:
+    return {
+        **wide_object(num),
+        "cardTitle": localized("Title"),
+        "header": localized(f"Header {num}"),
+        "subheader": localized("Subheader"),
+    }
+
+
+def flight_object(num: int) -> dict:
+    return {
+        **wide_object(num),
+        "passengerName": f"Passenger {num}",
+        "boardingAndSeatingInfo": {
+            "boardingGroup": "B",
+            "seatNumber": f"{num % 30}A",
+            "seatClass": "Economy",
+            "seatAssignment": localized("Window"),
+        },
+        "reservationInfo": {
+            "confirmationCode": f"CONF{num}",
+            "eticketNumber": f"{num:013d}",
+            "frequentFlyerInfo": {
+                "frequentFlyerProgramName": localized("Miles"),
+                "frequentFlyerNumber": f"FF{num}",
+            },
+        },
+    }
+
+
+def summarize(content: bytes, model, lazy: bool) -> list:
+    records, _ = _parse_listing_page(content, model, lazy=lazy)
+    return [(record.id, record.state, record.hasUsers) for record in records]
+
+
+def measure(label: str, content: bytes, model, lazy: bool) -> None:
+    summarize(content, model, lazy)  # warm up caches
+    seconds = (
+        timeit.timeit(lambda: summarize(content, model, lazy), number=ROUNDS) / ROUNDS
+    )
+    tracemalloc.start()
+    records, _ = _parse_listing_page(content, model, lazy=lazy)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    print(f"  {label:<10} {seconds * 1000:8.2f} ms/page {peak / 1024:10.1f} KiB peak")
+
+
+def main() -> None:
+    for name, make_record in (
+        ("GenericObject", generic_object),
+        ("FlightObject", flight_object),
+    ):
+        model = lookup_model_by_name(name)
+        page = {
+            "resources": [make_record(num) for num in range(100)],
+            "pagination": {"resultsPerPage": 100},
+        }
+        content = json.dumps(page).encode()
+        print(f"100 {name} records, {len(content) / 1024:.1f} KiB per page")
+        measure("validated", content, model, lazy=False)
+        measure("lazy", content, model, lazy=True)
+
+
+if __name__ == "__main__":
+    main()
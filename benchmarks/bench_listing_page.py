@@ -0,0 +1,87 @@
+"""Benchmark decoding and validating a listing page.
+
+Compares the former two-pass parsing (untyped ``PaginatedResponse`` plus
+``model_validate`` per record) with the single-pass typed page model used by
+``api.listing``.
+
+Run with::
+
+    python benchmarks/bench_listing_page.py
+"""
+
+from edutap.wallet_google.api import _parse_listing_page
+from edutap.wallet_google.models.datatypes.general import PaginatedResponse
+from edutap.wallet_google.registry import lookup_model_by_name
+
+import json
+import timeit
+import tracemalloc
+
+
+ROUNDS = 200
+
+
+def event_ticket_object(num: int) -> dict:
+    localized = {"defaultValue": {"language": "en", "value": f"Value {num}"}}
+    return {
+        "id": f"3388000000022141777.object.{num}",
+        "classId": "3388000000022141777.class",
+        "state": "ACTIVE",
+        "hasUsers": True,
+        "ticketHolderName": f"Holder {num}",
+        "ticketNumber": f"{num:08d}",
+        "seatInfo": {"seat": localized, "row": localized, "section": localized},
+        "barcode": {"type": "QR_CODE", "value": f"barcode-{num}"},
+        "textModulesData": [
+            {"header": f"Header {index}", "body": f"Body {index}", "id": f"t{index}"}
+            for index in range(5)
+        ],
+        "imageModulesData": [
+            {
+                "mainImage": {"sourceUri": {"uri": f"https://example.com/{index}.png"}},
+                "id": f"i{index}",
+            }
+            for index in range(2)
+        ],
+        "messages": [
+            {"header": f"Message {index}", "body": "Body", "id": f"m{index}"}
+            for index in range(3)
+        ],
+    }
+
+
+def two_pass(content: bytes, model) -> list:
+    # listing() parsed the page for the pagination, then once more for the resources
+    PaginatedResponse.model_validate_json(content)
+    resources = PaginatedResponse.model_validate_json(content).resources
+    return [model.model_validate(record) for record in resources]
+
+
+def single_pass(content: bytes, model) -> list:
+    return _parse_listing_page(content, model)[0]
+
+
+def measure(label: str, func, content: bytes, model) -> None:
+    func(content, model)  # warm up caches
+    seconds = timeit.timeit(lambda: func(content, model), number=ROUNDS) / ROUNDS
+    tracemalloc.start()
+    func(content, model)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {seconds * 1000:8.2f} ms/page {peak / 1024:10.1f} KiB peak")
+
+
+def main() -> None:
+    model = lookup_model_by_name("EventTicketObject")
+    page = {
+        "resources": [event_ticket_object(num) for num in range(100)],
+        "pagination": {"resultsPerPage": 100, "nextPageToken": "next"},
+    }
+    content = json.dumps(page).encode()
+    print(f"100 EventTicketObject records, {len(content) / 1024:.1f} KiB per page")
+    measure("two-pass", two_pass, content, model)
+    measure("single-pass", single_pass, content, model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark the throughput of ``api.save_link``.
+
+Compares signing with the cached signing key of the credentials with parsing
+the PEM encoded private key on every call, as ``save_link`` did before.
+
+Run with::
+
+    python benchmarks/bench_save_link.py
+"""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.credentials import credentials_manager
+from joserfc.jwk import RSAKey
+
+import timeit
+
+
+ROUNDS = 500
+
+
+def main() -> None:
+    credentials = {
+        "client_email": "issuer@example.iam.gserviceaccount.com",
+        "private_key_id": "bench",
+        "private_key": RSAKey.generate_key(2048).as_pem(private=True).decode(),
+    }
+    models = [
+        api.new(
+            "GenericObject",
+            {
+                "id": "3388000000022141777.object.1",
+                "classId": "3388000000022141777.class",
+                "state": "ACTIVE",
+            },
+        )
+    ]
+
+    def uncached() -> None:
+        credentials_manager.clear_signing_keys()
+        api.save_link(models, credentials=credentials)
+
+    def cached() -> None:
+        api.save_link(models, credentials=credentials)
+
+    for label, func in (("parse PEM", uncached), ("cached key", cached)):
+        func()  # warm up
+        seconds = timeit.timeit(func, number=ROUNDS) / ROUNDS
+        print(f"{label:<12} {seconds * 1000:8.3f} ms/link {1 / seconds:10.0f} links/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark the throughput of ``api.save_links`` by number of worker processes.
+
+Signs the same number of save links sequentially with ``api.save_link`` in this
+process, and with ``api.save_links`` on 1, 2, 4, ... worker processes up to the
+number of CPUs. Reports links per second overall and per core used.
+
+Run with::
+
+    python benchmarks/bench_save_links.py [LINKS]
+"""
+
+from edutap.wallet_google import api
+from joserfc.jwk import RSAKey
+
+import os
+import sys
+import time
+
+
+def report(label: str, links: int, seconds: float, cores: int) -> None:
+    rate = links / seconds
+    print(f"{label:<14} {rate:10.0f} links/s {rate / cores:10.0f} links/s/core")
+
+
+def main() -> None:
+    links = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    credentials = {
+        "client_email": "issuer@example.iam.gserviceaccount.com",
+        "private_key_id": "bench",
+        "private_key": RSAKey.generate_key(2048).as_pem(private=True).decode(),
+    }
+    batches = [
+        [
+            api.new(
+                "GenericObject",
+                {
+                    "id": f"3388000000022141777.object.{num}",
+                    "classId": "3388000000022141777.class",
+                    "state": "ACTIVE",
+                },
+            )
+        ]
+        for num in range(links)
+    ]
+    cpus = os.cpu_count() or 1
+    print(f"{links} links, {cpus} CPUs")
+
+    api.save_link(batches[0], credentials=credentials)  # warm up
+    start = time.perf_counter()
+    for models in batches:
+        api.save_link(models, credentials=credentials)
+    report("sequential", links, time.perf_counter() - start, 1)
+
+    workers = 1
+    while True:
+        start = time.perf_counter()
+        for _ in api.save_links(batches, credentials=credentials, workers=workers):
+            pass
+        report(f"{workers} workers", links, time.perf_counter() - start, workers)
+        if workers >= cpus:
+            break
+        workers = min(workers * 2, cpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,16 @@ This module provides the complete API for Google Wallet pass management.
 It includes both sync and async versions of all CRUD operations.
 
 **Naming Convention:**
-- Synchronous functions: `create()`, `read()`, `update()`, `message()`, `listing()`
-- Asynchronous functions: `acreate()`, `aread()`, `aupdate()`, `amessage()`, `alisting()`
+- Synchronous functions: `create()`, `read()`, `update()`, `upsert()`, `message()`, `listing()`
+- Asynchronous functions: `acreate()`, `aread()`, `aupdate()`, `aupsert()`, `amessage()`, `alisting()`
+- Bulk functions: `create_many()`, `update_many()`, `upsert_many()`, `message_many()` and their
+  async counterparts `acreate_many()`, `aupdate_many()`, `aupsert_many()`, `amessage_many()`
+- Fan-out listing: `alisting_many()` lists the objects of many classes concurrently
+- Batch requests: `batch()` and `abatch()` pack many calls into one HTTP request
+- Listing cursors: `listing_cursor()` and `alisting_cursor()` prefetch pages in the background
 - Shared functions (work with both): `new()`, `save_link()`
+- Many save links signed in worker processes: `save_links()`
+- Save links signed off the event loop: `asave_link()`
 
 **Usage:**
 
@@ -29,8 +36,21 @@ link = api.save_link([my_pass])  # save_link is sync, not awaited
 ```
 """
 
+from .cache import read_cache
+from .cache import read_flights
+from .cache import read_key
 from .clientpool import client_pool
+from .concurrency import AdaptiveConcurrencyLimiter
 from .credentials import credentials_manager
+from .credentialsgroup import CredentialsGroup
+from .cursor import AsyncFetchPage
+from .cursor import AsyncListingCursor
+from .cursor import FetchPage
+from .cursor import ListingCursor
+from .deadline import Deadline
+from .deadline import resolve_deadline
+from .exceptions import QuotaExceededException
+from .lazy import LazyRecord
 from .models.bases import make_partial_model
 from .models.bases import Model
 from .models.datatypes.general import PaginatedResponse
@@ -42,33 +62,63 @@ from .models.misc import AddMessageRequest
 from .models.passes.bases import ClassModel
 from .models.passes.bases import ObjectModel
 from .models.passes.bases import Reference
+from .ratelimit import TokenBucket
 from .registry import lookup_metadata_by_model_instance
 from .registry import lookup_metadata_by_model_type
 from .registry import lookup_metadata_by_name
 from .registry import lookup_model_by_name
 from .registry import raise_when_operation_not_allowed
 from .registry import validate_fields_for_name
+from .retry import Retrying
+from .streaming import ListingPageDecoder
 from .utils import handle_response_errors
 from .utils import parse_response_json
 from .utils import validate_data
 from .utils import validate_data_and_convert_to_json
+from authlib.integrations.httpx_client import AssertionClient
+from authlib.integrations.httpx_client import AsyncAssertionClient
+from collections import deque
 from collections.abc import AsyncGenerator
+from collections.abc import AsyncIterable
+from collections.abc import Awaitable
+from collections.abc import Callable
 from collections.abc import Generator
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractAsyncContextManager
+from contextvars import ContextVar
 from joserfc import jwt
-from joserfc.jwk import RSAKey
+from pydantic import ValidationError
 
+import asyncio
+import contextlib
 import datetime
+import functools
+import httpx
+import itertools
 import json
 import logging
+import os
+import threading
 import typing
 
 
+if typing.TYPE_CHECKING:
+    from .batch import AsyncBatch
+    from .batch import Batch
+
+
 logger = logging.getLogger(__name__)
 
 
 __all__ = [
     "new",
     "save_link",
+    "save_links",
+    "asave_link",
     "create",
     "read",
     "update",
@@ -79,8 +129,151 @@ __all__ = [
     "aupdate",
     "amessage",
     "alisting",
+    "listing_cursor",
+    "alisting_cursor",
+    "upsert",
+    "aupsert",
+    "create_many",
+    "update_many",
+    "message_many",
+    "acreate_many",
+    "aupdate_many",
+    "amessage_many",
+    "upsert_many",
+    "aupsert_many",
+    "alisting_many",
+    "batch",
+    "abatch",
 ]
 
+_T = typing.TypeVar("_T")
+_F = typing.TypeVar("_F", bound=Callable[..., typing.Any])
+
+
+# Credentials groups
+
+# the group whose account makes the calls of the context, see `_cache_credentials`
+_current_group: ContextVar[CredentialsGroup | None] = ContextVar(
+    "edutap_wallet_google_credentials_group", default=None
+)
+
+
+def _data_id(data: Model, *args, **kwargs) -> str | None:
+    return getattr(data, "id", None)
+
+
+def _resource_id(name: str, resource_id: str, *args, **kwargs) -> str | None:
+    return resource_id
+
+
+def _on_account(
+    credentials: dict | CredentialsGroup | None,
+    call: Callable[[dict | None], _T],
+    affinity: str | None = None,
+) -> _T:
+    """Make a call with the credentials, on an account if they are a `CredentialsGroup`.
+
+    An account exceeding its quota is drained and the call is repeated on
+    another one, until all accounts of the group were tried.
+
+    :param credentials: Credentials dict, group, or None.
+    :param call:        Function making the call with the credentials dict of an account.
+    :param affinity:    Id of the object of the call, see `CredentialsGroup.select`.
+    :return:            The result of the call.
+    """
+    if not isinstance(credentials, CredentialsGroup):
+        return call(credentials)
+    token = _current_group.set(credentials)
+    try:
+        attempts = len(credentials)
+        while True:
+            member = client_pool.select_credentials(credentials, affinity)
+            try:
+                return call(member)
+            except QuotaExceededException:
+                credentials.drain(member)
+                attempts -= 1
+                if not attempts:
+                    raise
+    finally:
+        _current_group.reset(token)
+
+
+async def _aon_account(
+    credentials: dict | CredentialsGroup | None,
+    call: Callable[[dict | None], Awaitable[_T]],
+    affinity: str | None = None,
+) -> _T:
+    """Make an async call with the credentials, on an account if they are a group, see `_on_account`."""
+    if not isinstance(credentials, CredentialsGroup):
+        return await call(credentials)
+    token = _current_group.set(credentials)
+    try:
+        attempts = len(credentials)
+        while True:
+            member = client_pool.select_credentials(credentials, affinity)
+            try:
+                return await call(member)
+            except QuotaExceededException:
+                credentials.drain(member)
+                attempts -= 1
+                if not attempts:
+                    raise
+    finally:
+        _current_group.reset(token)
+
+
+def _cache_credentials(credentials: dict | None) -> dict | CredentialsGroup | None:
+    """Return the credentials the read cache keys the calls of an account by.
+
+    Calls on an account of a group are keyed by the group, as its calls of one
+    object may move to another account.
+    """
+    group = _current_group.get()
+    if group is not None and credentials is not None and credentials in group:
+        return group
+    return credentials
+
+
+def _sharded(affinity: Callable[..., str | None]) -> Callable[[_F], _F]:
+    """Run an API function on an account of a `CredentialsGroup` passed as credentials.
+
+    The account is selected by the id of the object, so the calls of an object go
+    to one account, see `_on_account`.
+
+    :param affinity: Function returning the object id from the arguments of the call.
+    """
+
+    def decorator(func: _F) -> _F:
+        @functools.wraps(func)
+        def wrapper(*args, credentials=None, **kwargs):
+            return _on_account(
+                credentials,
+                lambda member: func(*args, credentials=member, **kwargs),
+                affinity(*args, **kwargs),
+            )
+
+        return typing.cast(_F, wrapper)
+
+    return decorator
+
+
+def _asharded(affinity: Callable[..., str | None]) -> Callable[[_F], _F]:
+    """Run an async API function on an account of a `CredentialsGroup`, see `_sharded`."""
+
+    def decorator(func: _F) -> _F:
+        @functools.wraps(func)
+        async def wrapper(*args, credentials=None, **kwargs):
+            return await _aon_account(
+                credentials,
+                lambda member: func(*args, credentials=member, **kwargs),
+                affinity(*args, **kwargs),
+            )
+
+        return typing.cast(_F, wrapper)
+
+    return decorator
+
 
 # Shared API functions
 
@@ -160,7 +353,7 @@ def save_link(
     origins: list[str] | None = None,
     iat: str | datetime.datetime = "",
     exp: str | datetime.datetime = "",
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
 ) -> str:
     """
     Creates a link to save a Google Wallet Object to the wallet on the device.
@@ -174,6 +367,7 @@ def save_link(
     - https://developers.google.com/wallet/generic/use-cases/jwt
 
     This function uses authlib for JWT signing with RSA keys.
+    The parsed key is cached per private key id, see `CredentialsManager.signing_key`.
     It can be used with both sync and async APIs:
 
     .. code-block:: python
@@ -189,11 +383,13 @@ def save_link(
                         messages in the browser console when the origins field is not defined.
     :param: iat:        Issued At Time. The time when the JWT was issued.
     :param: exp:        Expiration Time. The time when the JWT expires.
-    :param credentials: Optional session credentials as dict.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
     :return:            Link with JWT to save the resources to the wallet.
     """
     if origins is None:
         origins = []
+    if isinstance(credentials, CredentialsGroup):
+        credentials = client_pool.select_credentials(credentials)
     if credentials is None:
         credentials = credentials_manager.credentials_from_file()
 
@@ -228,7 +424,7 @@ def save_link(
     )
 
     # joserfc.jwt.encode requires a typed Key and returns a str
-    private_key = RSAKey.import_key(credentials["private_key"])
+    private_key = credentials_manager.signing_key(credentials)
     jwt_string = jwt.encode(header, payload, private_key)
 
     logger.debug(jwt_string)
@@ -239,6 +435,166 @@ def save_link(
     return f"{settings.save_url}/{jwt_string}"
 
 
+_link_executor: Executor | None = None
+_link_executor_lock = threading.Lock()
+
+
+def _save_link_executor() -> Executor:
+    """Return the executor of `asave_link`, created from the settings on first use."""
+    global _link_executor
+    with _link_executor_lock:
+        if _link_executor is None:
+            settings = client_pool.settings
+            workers = settings.save_link_workers or os.cpu_count() or 1
+            if settings.save_link_executor == "process":
+                _link_executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _link_executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="wallet-google-link"
+                )
+        return _link_executor
+
+
+async def asave_link(
+    models: list[ClassModel | ObjectModel | Reference],
+    *,
+    origins: list[str] | None = None,
+    iat: str | datetime.datetime = "",
+    exp: str | datetime.datetime = "",
+    credentials: dict | CredentialsGroup | None = None,
+    executor: Executor | None = None,
+) -> str:
+    """
+    Creates a link to save a Google Wallet Object, without blocking the event loop.
+
+    Same as `save_link`, but building the claims and signing them runs in an
+    executor, so other tasks of the loop are served meanwhile. The executor is
+    a thread or a process pool shared by the calls, see the
+    ``EDUTAP_WALLET_GOOGLE_SAVE_LINK_*`` settings. Processes sign in parallel
+    on several CPUs, threads avoid sending the models to another process.
+
+    :param models:      List of ObjectModels or ClassModels to save, see `save_link`.
+    :param origins:     List of domains to approve for JWT saving functionality.
+    :param iat:         Issued At Time. The time when the JWT was issued.
+    :param exp:         Expiration Time. The time when the JWT expires.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param executor:    Optional executor to sign in, instead of the one of the settings.
+    :return:            Link with JWT to save the resources to the wallet.
+    """
+    if isinstance(credentials, CredentialsGroup):
+        credentials = client_pool.select_credentials(credentials)
+    if credentials is None:
+        credentials = credentials_manager.credentials_from_file()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor or _save_link_executor(),
+        functools.partial(
+            save_link,
+            models,
+            origins=origins,
+            iat=iat,
+            exp=exp,
+            credentials=credentials,
+        ),
+    )
+
+
+# credentials and options of a save_links worker process, set by its initializer
+_link_worker: tuple[dict, dict] | None = None
+
+
+def _init_link_worker(credentials: dict, options: dict) -> None:
+    global _link_worker
+    # parse the signing key once per worker
+    credentials_manager.signing_key(credentials)
+    _link_worker = (credentials, options)
+
+
+def _sign_links(chunk: list[list[ClassModel | ObjectModel | Reference]]) -> list[str]:
+    """Create the save links of a chunk in a save_links worker process."""
+    credentials, options = typing.cast(tuple[dict, dict], _link_worker)
+    return [save_link(models, credentials=credentials, **options) for models in chunk]
+
+
+def _save_links(
+    batches: Iterable[list[ClassModel | ObjectModel | Reference]],
+    credentials: dict,
+    options: dict,
+    workers: int,
+    chunk_size: int,
+) -> Generator[str, None, None]:
+    """Sign the links of *batches* in chunks in *workers* processes and yield them in order."""
+    batches = iter(batches)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_link_worker,
+        initargs=(credentials, options),
+    ) as executor:
+        pending: deque[Future] = deque()
+        try:
+            while chunk := list(itertools.islice(batches, chunk_size)):
+                pending.append(executor.submit(_sign_links, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def save_links(
+    batches: Iterable[list[ClassModel | ObjectModel | Reference]],
+    *,
+    origins: list[str] | None = None,
+    iat: str | datetime.datetime = "",
+    exp: str | datetime.datetime = "",
+    credentials: dict | CredentialsGroup | None = None,
+    workers: int | None = None,
+    chunk_size: int = 100,
+) -> Generator[str, None, None]:
+    """
+    Creates many save links, signed in parallel by worker processes, see `save_link`.
+
+    Signing with RS256 is CPU-bound and holds the GIL, so threads don't speed
+    it up. The models of each link are sent to a pool of worker processes in
+    chunks, each worker parses the signing key once.
+
+    .. code-block:: python
+
+        links = api.save_links(([obj] for obj in objects), workers=8)
+        for obj, link in zip(objects, links):
+            ...
+
+    :param batches:     Iterable of the models of each link, may be a generator.
+    :param origins:     Domains to approve for JWT saving functionality, for all links.
+    :param iat:         Issued At Time of all links.
+    :param exp:         Expiration Time of all links.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+                        All links are signed with one account.
+    :param workers:     Number of worker processes, defaults to the number of CPUs.
+    :param chunk_size:  Number of links signed per task of a worker.
+    :raises ValueError: When workers or chunk_size is lower than 1.
+    :return:            Generator of the links, in the order of *batches*.
+                        At most ``2 * workers`` chunks are taken ahead of the consumer.
+                        An error signing a link is raised when its chunk is reached.
+    """
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be >= 1, got {chunk_size}")
+    if isinstance(credentials, CredentialsGroup):
+        credentials = client_pool.select_credentials(credentials)
+    if credentials is None:
+        credentials = credentials_manager.credentials_from_file()
+    return _save_links(
+        batches,
+        credentials,
+        {"origins": origins, "iat": iat, "exp": exp},
+        workers or os.cpu_count() or 1,
+        chunk_size,
+    )
+
+
 # Internal helper functions for CRUD operations
 
 
@@ -289,6 +645,16 @@ def _prepare_create(data: Model) -> tuple[str, str, type[Model], dict]:
     return name, verified_json, model, headers
 
 
+def _created_by_earlier_attempt(
+    response: httpx.Response, retrying: Retrying, allow_409: bool
+) -> bool:
+    """Check if a retried create got a 409 for the object an earlier attempt created.
+
+    The response of the earlier attempt got lost, the object is read instead.
+    """
+    return response.status_code == 409 and retrying.attempts > 1 and not allow_409
+
+
 def _prepare_read(name: str, resource_id: str) -> tuple[type[Model]]:
     """Prepare data for read operation.
 
@@ -338,6 +704,48 @@ def _prepare_message(
     return model, verified_json
 
 
+def _parse_message_response(
+    response,
+    model: type[Model],
+    *,
+    partial: bool = False,
+) -> Model:
+    """Parse the response of a message operation.
+
+    Returns: the validated model of the 'resource' the message was added to
+    """
+    logger.debug(f"RAW-Response: {response.content!r}")
+    resource_data = json.loads(response.content)["resource"]
+    if partial:
+        return make_partial_model(model).model_validate(resource_data)
+    return model.model_validate(resource_data)
+
+
+def _cache_written(
+    credentials: dict | None,
+    name: str,
+    result: Model,
+    *,
+    partial: bool = False,
+    resource_id: str | None = None,
+) -> Model:
+    """Update the read cache with the result of a write operation.
+
+    Returns: the result
+    """
+    if read_cache.enabled:
+        if resource_id is None:
+            resource_id_key = lookup_metadata_by_name(name)["resource_id"]
+            resource_id = getattr(result, resource_id_key, None)
+        read_cache.written(
+            _cache_credentials(credentials),
+            name,
+            resource_id,
+            None if partial else result,
+        )
+    return result
+
+
 def _prepare_listing(
     name: str,
     resource_id: str | None,
@@ -376,34 +784,45 @@ def _prepare_listing(
     return model, params, is_pageable, resource_identifier
 
 
-def _process_listing_page(
+@functools.cache
+def _page_model(model: type[Model]) -> type[PaginatedResponse]:
+    """Return the listing page model with resources typed as model, cached per model."""
+    return PaginatedResponse[model]  # type: ignore
+
+
+def _parse_listing_page(
     response_content: bytes,
     model: type[Model],
-) -> list[Model]:
-    """Process a single page of listing results.
+    *,
+    partial: bool = False,
+    lazy: bool = False,
+) -> tuple[list[Model] | list[LazyRecord], Pagination | None]:
+    """Decode and validate a single page of listing results in one pass.
+
+    With lazy, the records are only decoded and wrapped in lazy views.
 
-    Returns: list of validated models
+    Returns: (list of validated models or lazy records, pagination)
     """
-    paginated_response = PaginatedResponse.model_validate_json(response_content)
+    if partial:
+        model = make_partial_model(model)
+    # untyped, the resources stay raw dicts for the lazy views
+    page_model = PaginatedResponse if lazy else _page_model(model)
+    try:
+        paginated_response = page_model.model_validate_json(response_content)
+    except ValidationError:
+        logger.exception(f"Error validating listing page of {model.__name__}")
+        raise
     pagination = paginated_response.pagination
     resources = paginated_response.resources
-
-    validated_models = []
     if not resources:
         logger.warning("Response does not contain 'resources'")
         if pagination and pagination.resultsPerPage == 0:
             logger.warning(
                 "No results per page set, this might be an error in the API response."
             )
-    else:
-        for count, record in enumerate(resources):
-            try:
-                validated_models.append(model.model_validate(record))
-            except Exception:
-                logger.exception(f"Error validating record {count}:\n{record}")
-                raise
-
-    return validated_models
+    if lazy:
+        return [LazyRecord(model, record) for record in resources], pagination
+    return resources, pagination
 
 
 def _setup_pagination_params(
@@ -426,27 +845,96 @@ def _setup_pagination_params(
     return params
 
 
+def _stream_auth(client: httpx.Client) -> typing.Any:
+    """Return the auth for a streamed request of a client.
+
+    `AssertionClient` refreshes its access token in ``request()`` only, which
+    ``stream()`` bypasses, so streamed requests pass the token auth explicitly.
+    """
+    if not isinstance(client, AssertionClient):
+        return httpx.USE_CLIENT_DEFAULT
+    if not client.token or client.token.is_expired():
+        client.refresh_token()
+    return client.token_auth
+
+
+async def _astream_auth(client: httpx.AsyncClient) -> typing.Any:
+    """Return the auth for a streamed request of an async client, see `_stream_auth`."""
+    if not isinstance(client, AsyncAssertionClient):
+        return httpx.USE_CLIENT_DEFAULT
+    if not client.token or client.token.is_expired():
+        await client.refresh_token()
+    return client.token_auth
+
+
+def _send_stream(
+    client: httpx.Client, url: str, params: dict, timeout: typing.Any
+) -> httpx.Response:
+    """Send a streamed GET request, the body of an error response is read.
+
+    The caller has to close the response.
+    """
+    request = client.build_request("GET", url=url, params=params, timeout=timeout)
+    response = client.send(request, auth=_stream_auth(client), stream=True)
+    if response.status_code != 200:
+        response.read()
+    return response
+
+
+async def _asend_stream(
+    client: httpx.AsyncClient, url: str, params: dict, timeout: typing.Any
+) -> httpx.Response:
+    """Send a streamed GET request asynchronously, see `_send_stream`."""
+    request = client.build_request("GET", url=url, params=params, timeout=timeout)
+    response = await client.send(request, auth=await _astream_auth(client), stream=True)
+    if response.status_code != 200:
+        await response.aread()
+    return response
+
+
 # Synchronous API
 
 
+@_sharded(_data_id)
 def create(
     data: Model,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """
     Creates a Google Wallet items. `C` in CRUD.
 
     :param data:                          Data to pass to the Google RESTful API.
                                           A model instance, has to be a registered model.
-    :param credentials:                   Optional session credentials as dict.
+    :param credentials:                   Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                        Optional list of fields to include in the response for partial responses.
+    :param timeout:                       Optional timeout of the call in seconds, or a `Deadline`.
     :raises QuotaExceededException:       When the quota was exceeded.
     :raises ObjectAlreadyExistsException: When the id to be created already exists at Google.
+                                          Not raised when a retry gets a 409 for the object an
+                                          earlier attempt created, it is read and returned instead.
     :raises WalletException:              When the response status code is not 200.
     :return:                              The created model instance.
     """
+    return typing.cast(
+        Model, _create(data, credentials=credentials, fields=fields, timeout=timeout)
+    )
+
+
+def _create(
+    data: Model,
+    *,
+    credentials: dict | None,
+    fields: list[str] | None,
+    timeout: float | Deadline | None,
+    allow_409: bool = False,
+) -> Model | None:
+    """Create, see `create`.
+
+    Returns: the created model instance, or None if allow_409 is set and it already exists
+    """
     name, verified_json, model, headers = _prepare_create(data)
     url = client_pool.url(name)
     params: dict[str, str] | None = None
@@ -456,33 +944,52 @@ def create(
             params = {"fields": ",".join(fields)}
 
     client = client_pool.client(credentials=credentials)
-    response = client.post(
-        url=url,
-        data=verified_json.encode("utf-8"),
-        headers=headers,
-        params=params,
+    resource_id = getattr(data, "id", None)
+    deadline = resolve_deadline(timeout)
+    # a create without an id can't be recognised by its 409, a retry could duplicate it
+    retrying = Retrying(
+        "create", name, resource_id or "", deadline=deadline, retry=bool(resource_id)
+    )
+    response = retrying.send(
+        lambda timeout: client.post(
+            url=url,
+            data=verified_json.encode("utf-8"),
+            headers=headers,
+            params=params,
+            timeout=timeout,
+        )
     )
 
-    handle_response_errors(response, "create", name, getattr(data, "id", "No ID"))
-    if params is not None:
-        return parse_response_json(response, model, partial=True)
-    return parse_response_json(response, model)
+    if resource_id and _created_by_earlier_attempt(response, retrying, allow_409):
+        return read(
+            name, resource_id, credentials=credentials, fields=fields, timeout=deadline
+        )
+    handle_response_errors(
+        response, "create", name, resource_id or "No ID", allow_409=allow_409
+    )
+    if response.status_code == 409:
+        return None
+    result = parse_response_json(response, model, partial=params is not None)
+    return _cache_written(credentials, name, result, partial=params is not None)
 
 
+@_sharded(_resource_id)
 def read(
     name: str,
     resource_id: str,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """
     Reads a Google Wallet Class or Object. `R` in CRUD.
 
     :param name:             Registered name of the model to use
     :param resource_id:      Identifier of the resource to read from the Google RESTful API
-    :param credentials:      Optional session credentials as dict.
+    :param credentials:      Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:           Optional list of fields to include in the response for partial responses.
+    :param timeout:          Optional timeout of the call in seconds, or a `Deadline`.
     :QuotaExceededException: When the quota was exceeded.
     :raises LookupError:     When the resource was not found (404).
     :raises WalletException  When the response status code is not 200 or 404.
@@ -495,30 +1002,46 @@ def read(
         if _validate_partial_response_fields(fields, name):
             params = {"fields": ",".join(fields)}
 
+    cache_key = read_cache.key(
+        _cache_credentials(credentials),
+        name,
+        resource_id,
+        params["fields"] if params else None,
+    )
+    if (cached := read_cache.get(cache_key)) is not None:
+        return cached
+
     client = client_pool.client(credentials=credentials)
-    response = client.get(url=url, params=params)
+    deadline = resolve_deadline(timeout)
+    generation = read_cache.generation(cache_key)
+    response = Retrying("read", name, resource_id, deadline=deadline).send(
+        lambda timeout: client.get(url=url, params=params, timeout=timeout)
+    )
 
     handle_response_errors(response, "read", name, resource_id)
-    if params is not None:
-        return parse_response_json(response, model, partial=True)
-    return parse_response_json(response, model)
+    result = parse_response_json(response, model, partial=params is not None)
+    read_cache.put(cache_key, result, generation)
+    return result
 
 
+@_sharded(_data_id)
 def update(
     data: Model,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
     partial: bool = True,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """
     Updates a Google Wallet Class or Object. `U` in CRUD.
 
     :param data:                    Data to pass to the Google RESTful API.
                                     A model instance, has to be a registered model.
-    :param credentials:             Optional session credentials as dict.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                  Optional list of fields to include in the response for partial responses.
     :param partial:                 Optional Flag, whether a partial update is executed or a full replacement.
+    :param timeout:                 Optional timeout of the call in seconds, or a `Deadline`.
     :raises QuotaExceededException: When the quota was exceeded
     :raises LookupError:            When the resource was not found (404)
     :raises WalletException:        When the response status code is not 200 or 404
@@ -531,41 +1054,44 @@ def update(
             params = {"fields": ",".join(fields)}
 
     session = client_pool.client(credentials=credentials)
-    if partial:
-        response = session.patch(
-            url=client_pool.url(name, f"/{resource_id}"),
-            data=verified_json.encode("utf-8"),
-            params=params,
-        )
-    else:
-        response = session.put(
+    send = session.patch if partial else session.put
+    response = Retrying(
+        "update", name, resource_id, deadline=resolve_deadline(timeout), retry=False
+    ).send(
+        lambda timeout: send(
             url=client_pool.url(name, f"/{resource_id}"),
             data=verified_json.encode("utf-8"),
             params=params,
+            timeout=timeout,
         )
+    )
 
     logger.debug(verified_json.encode("utf-8"))
     handle_response_errors(response, "update", name, resource_id)
-    if params is not None:
-        return parse_response_json(response, model, partial=True)
-    return parse_response_json(response, model)
+    result = parse_response_json(response, model, partial=params is not None)
+    return _cache_written(
+        credentials, name, result, partial=params is not None, resource_id=resource_id
+    )
 
 
+@_sharded(_resource_id)
 def message(
     name: str,
     resource_id: str,
     message: dict[str, typing.Any] | Message,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """Sends a message to a Google Wallet Class or Object.
 
     :param name:                      Registered name of the model to use
     :param resource_id:               Identifier of the resource to send to
     :param message:                   Message to send.
-    :param credentials:               Optional session credentials as dict.
+    :param credentials:               Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                    Optional list of fields to include in the response for partial responses.
+    :param timeout:                   Optional timeout of the call in seconds, or a `Deadline`.
     :raises QuotaExceededException:   When the quota was exceeded
     :raises LookupError:              When the resource was not found (404)
     :raises WalletException:          When the response status code is not 200 or 404
@@ -579,15 +1105,64 @@ def message(
             params = {"fields": ",".join(fields)}
 
     client = client_pool.client(credentials=credentials)
-    response = client.post(url=url, data=verified_json.encode("utf-8"), params=params)
+    response = Retrying(
+        "message", name, resource_id, deadline=resolve_deadline(timeout), retry=False
+    ).send(
+        lambda timeout: client.post(
+            url=url, data=verified_json.encode("utf-8"), params=params, timeout=timeout
+        )
+    )
 
     handle_response_errors(response, "send message to", name, resource_id)
-    logger.debug(f"RAW-Response: {response.content!r}")
-    resource_data = json.loads(response.content)["resource"]
-    if params is not None:
-        partial_model = make_partial_model(model)
-        return partial_model.model_validate(resource_data)
-    return model.model_validate(resource_data)
+    result = _parse_message_response(response, model, partial=params is not None)
+    return _cache_written(
+        credentials, name, result, partial=params is not None, resource_id=resource_id
+    )
+
+
+@_sharded(_data_id)
+def upsert(
+    data: Model,
+    *,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    update_first: bool = False,
+    timeout: float | Deadline | None = None,
+) -> Model:
+    """
+    Creates a Google Wallet Class or Object, or updates it if it already exists.
+
+    By default the create is tried first, and on a 409 (already exists) a partial update
+    is sent. For data sets where most resources already exist, ``update_first`` tries the
+    partial update first and creates the resource on a 404 (not found).
+    Either way the common path takes one round trip, the other path two.
+
+    :param data:                    Data to pass to the Google RESTful API.
+                                    A model instance, has to be a registered model.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:                  Optional list of fields to include in the response for partial responses.
+    :param update_first:            Optional Flag, whether to try the update before the create.
+    :param timeout:                 Optional timeout of both round trips together in seconds, or a `Deadline`.
+    :raises QuotaExceededException: When the quota was exceeded
+    :raises WalletException:        When the response status code is not 200
+    :return:                        The created or updated model instance.
+    """
+    deadline = resolve_deadline(timeout)
+    if update_first:
+        try:
+            return update(
+                data, credentials=credentials, fields=fields, timeout=deadline
+            )
+        except LookupError:
+            return create(
+                data, credentials=credentials, fields=fields, timeout=deadline
+            )
+    result = _create(
+        data, credentials=credentials, fields=fields, timeout=deadline, allow_409=True
+    )
+    if result is None:
+        return update(data, credentials=credentials, fields=fields, timeout=deadline)
+    return result
 
 
 def listing(
@@ -597,9 +1172,12 @@ def listing(
     issuer_id: str | None = None,
     result_per_page: int = 0,
     next_page_token: str | None = None,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
-) -> Generator[Model | str, None, None]:
+    stream: bool = False,
+    lazy: bool = False,
+    timeout: float | Deadline | None = None,
+) -> Generator[Model | LazyRecord | str, None, None]:
     """Lists wallet related resources.
 
     It is possible to list all classes of an issuer. Parameter 'name' has to end with 'Class',
@@ -619,8 +1197,15 @@ def listing(
     :param result_per_page:         Number of results per page to fetch.
                                     If omitted all results will be fetched and provided by the generator.
     :param next_page_token:         Token to get the next page of results.
-    :param credentials:             Optional session credentials as dict.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                  Optional list of fields to include in the response for partial responses.
+    :param stream:                  Decode the response body incrementally and yield each record as soon
+                                    as it arrived, instead of decoding whole pages.
+                                    Keeps about one record in memory instead of one page.
+    :param lazy:                    Yield a read-only `LazyRecord` view per record instead of a model instance.
+                                    Fields are validated on first access, `materialize()` returns the model instance.
+    :param timeout:                 Optional timeout of fetching all pages in seconds, or a `Deadline`.
+                                    It starts with the iteration, each page is fetched within the time left.
     :raises QuotaExceededException: When the quota was exceeded
     :raises ValueError:             When input was invalid.
     :raises LookupError:            When the resource was not found (404)
@@ -644,20 +1229,41 @@ def listing(
 
     url = client_pool.url(name)
 
-    client = client_pool.client(credentials=credentials)
+    deadline = resolve_deadline(timeout)
+
+    def send_page(member: dict | None) -> httpx.Response:
+        client = client_pool.client(credentials=member)
+        retrying = Retrying("list", name, resource_identifier, deadline=deadline)
+        if stream:
+            response = retrying.send(
+                lambda timeout: _send_stream(client, url, params, timeout)
+            )
+        else:
+            response = retrying.send(
+                lambda timeout: client.get(url=url, params=params, timeout=timeout)
+            )
+        try:
+            handle_response_errors(response, "list", name, resource_identifier)
+        except Exception:
+            response.close()
+            raise
+        return response
+
     while True:
-        response = client.get(url=url, params=params)
-        handle_response_errors(response, "list", name, resource_identifier)
-        paginated_response = PaginatedResponse.model_validate_json(response.content)
-        pagination: Pagination | None = paginated_response.pagination
-
-        if "fields" in params:
-            partial_model = make_partial_model(model)
-            resources = paginated_response.resources
-            if resources:
-                yield from (partial_model.model_validate(r) for r in resources)
+        # each page on an account of a group, before any of its records is yielded
+        response = _on_account(credentials, send_page)
+        if stream:
+            decoder = ListingPageDecoder(model, partial="fields" in params, lazy=lazy)
+            try:
+                for chunk in response.iter_bytes():
+                    yield from decoder.feed(chunk)
+            finally:
+                response.close()
+            pagination = decoder.close()
         else:
-            validated_models = _process_listing_page(response.content, model)
+            validated_models, pagination = _parse_listing_page(
+                response.content, model, partial="fields" in params, lazy=lazy
+            )
             yield from validated_models
 
         if not is_pageable or not pagination:
@@ -674,27 +1280,151 @@ def listing(
     return
 
 
+def _listing_page_fetcher(
+    name: str,
+    *,
+    resource_id: str | None,
+    issuer_id: str | None,
+    page_size: int,
+    credentials: dict | CredentialsGroup | None,
+    fields: list[str] | None,
+    deadline: Deadline | None,
+) -> FetchPage:
+    """Prepare a listing and return a function fetching one of its pages by token.
+
+    :raises ValueError: When input was invalid.
+    """
+    model, params, is_pageable, resource_identifier = _prepare_listing(
+        name, resource_id, issuer_id
+    )
+    if fields:
+        if _validate_partial_response_fields(fields, name):
+            params["fields"] = ",".join(fields)
+    params.update(_setup_pagination_params(is_pageable, page_size, None))
+    url = client_pool.url(name)
+
+    def send_page(member: dict | None, page_params: dict) -> httpx.Response:
+        client = client_pool.client(credentials=member)
+        response = Retrying("list", name, resource_identifier, deadline=deadline).send(
+            lambda timeout: client.get(url=url, params=page_params, timeout=timeout)
+        )
+        handle_response_errors(response, "list", name, resource_identifier)
+        return response
+
+    def fetch_page(token: str | None) -> tuple[list[Model], str | None]:
+        page_params = {**params, "token": token} if token else params
+        response = _on_account(
+            credentials, lambda member: send_page(member, page_params)
+        )
+        validated_models, pagination = _parse_listing_page(
+            response.content, model, partial="fields" in params
+        )
+        if not is_pageable or not pagination:
+            return validated_models, None
+        return validated_models, pagination.nextPageToken
+
+    return fetch_page
+
+
+def listing_cursor(
+    name: str,
+    *,
+    resource_id: str | None = None,
+    issuer_id: str | None = None,
+    page_size: int = 0,
+    next_page_token: str | None = None,
+    prefetch: int = 1,
+    max_pages: int | None = None,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> ListingCursor:
+    """Lists wallet related resources with a cursor prefetching the next pages.
+
+    Same as `listing`, but while the consumer processes a page, the next ``prefetch``
+    pages are fetched in a background thread. Iterating the cursor yields model instances
+    only, the token to continue the listing is available as ``cursor.next_page_token``.
+    Use ``cursor.pages()`` to iterate page by page.
+
+    :param name:                    Registered name to base the listing on.
+    :param resource_id:             Id of the class to list objects of.
+                                    Only for object listings.
+                                    Mutually exclusive with issuer_id.
+    :param issuer_id:               Identifier of the issuer to list classes of.
+                                    Only for class listings.
+                                    Mutually exclusive with resource_id.
+    :param page_size:               Number of results per page to fetch, defaults to 100.
+    :param next_page_token:         Token of the first page to fetch.
+    :param prefetch:                Number of pages to fetch ahead of the page being consumed.
+    :param max_pages:               Stop after this number of pages, by default all pages are fetched.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:                  Optional list of fields to include in the response for partial responses.
+    :param timeout:                 Optional timeout of fetching all pages in seconds, or a `Deadline`.
+    :raises ValueError:             When input was invalid.
+    :return:                        The cursor. Errors of the requests are raised while iterating,
+                                    see `listing`.
+    """
+    fetch_page = _listing_page_fetcher(
+        name,
+        resource_id=resource_id,
+        issuer_id=issuer_id,
+        page_size=page_size,
+        credentials=credentials,
+        fields=fields,
+        deadline=resolve_deadline(timeout),
+    )
+    return ListingCursor(
+        fetch_page,
+        next_page_token=next_page_token,
+        prefetch=prefetch,
+        max_pages=max_pages,
+    )
+
+
 # Asynchronous API
 
 
+@_asharded(_data_id)
 async def acreate(
     data: Model,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """
     Creates a Google Wallet item asynchronously. `C` in CRUD.
 
     :param data:                          Data to pass to the Google RESTful API.
                                           A model instance, has to be a registered model.
-    :param credentials:                   Optional session credentials as dict.
+    :param credentials:                   Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                        Optional list of fields to include in the response for partial responses.
+    :param timeout:                       Optional timeout of the call in seconds, or a `Deadline`.
     :raises QuotaExceededException:       When the quota was exceeded.
     :raises ObjectAlreadyExistsException: When the id to be created already exists at Google.
+                                          Not raised when a retry gets a 409 for the object an
+                                          earlier attempt created, it is read and returned instead.
     :raises WalletException:              When the response status code is not 200.
     :return:                              The created model instance.
     """
+    return typing.cast(
+        Model,
+        await _acreate(data, credentials=credentials, fields=fields, timeout=timeout),
+    )
+
+
+async def _acreate(
+    data: Model,
+    *,
+    credentials: dict | None,
+    fields: list[str] | None,
+    timeout: float | Deadline | None,
+    allow_409: bool = False,
+) -> Model | None:
+    """Create asynchronously, see `acreate`.
+
+    Returns: the created model instance, or None if allow_409 is set and it already exists
+    """
     name, verified_json, model, headers = _prepare_create(data)
     url = client_pool.url(name)
     params: dict[str, str] | None = None
@@ -703,33 +1433,52 @@ async def acreate(
             params = {"fields": ",".join(fields)}
 
     client = client_pool.async_client(credentials=credentials)
-    response = await client.post(
-        url=url,
-        data=verified_json.encode("utf-8"),
-        headers=headers,
-        params=params,
+    resource_id = getattr(data, "id", None)
+    deadline = resolve_deadline(timeout)
+    # a create without an id can't be recognised by its 409, a retry could duplicate it
+    retrying = Retrying(
+        "create", name, resource_id or "", deadline=deadline, retry=bool(resource_id)
+    )
+    response = await retrying.asend(
+        lambda timeout: client.post(
+            url=url,
+            data=verified_json.encode("utf-8"),
+            headers=headers,
+            params=params,
+            timeout=timeout,
+        )
     )
 
-    handle_response_errors(response, "create", name, getattr(data, "id", "No ID"))
-    if params is not None:
-        return parse_response_json(response, model, partial=True)
-    return parse_response_json(response, model)
+    if resource_id and _created_by_earlier_attempt(response, retrying, allow_409):
+        return await aread(
+            name, resource_id, credentials=credentials, fields=fields, timeout=deadline
+        )
+    handle_response_errors(
+        response, "create", name, resource_id or "No ID", allow_409=allow_409
+    )
+    if response.status_code == 409:
+        return None
+    result = parse_response_json(response, model, partial=params is not None)
+    return _cache_written(credentials, name, result, partial=params is not None)
 
 
+@_asharded(_resource_id)
 async def aread(
     name: str,
     resource_id: str,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """
     Reads a Google Wallet Class or Object asynchronously. `R` in CRUD.
 
     :param name:             Registered name of the model to use
     :param resource_id:      Identifier of the resource to read from the Google RESTful API
-    :param credentials:      Optional session credentials as dict.
+    :param credentials:      Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:           Optional list of fields to include in the response for partial responses.
+    :param timeout:          Optional timeout of the call in seconds, or a `Deadline`.
     :QuotaExceededException: When the quota was exceeded.
     :raises LookupError:     When the resource was not found (404).
     :raises WalletException  When the response status code is not 200 or 404.
@@ -742,30 +1491,57 @@ async def aread(
         if _validate_partial_response_fields(fields, name):
             params = {"fields": ",".join(fields)}
 
-    client = client_pool.async_client(credentials=credentials)
-    response = await client.get(url=url, params=params)
+    fields_mask = params["fields"] if params else None
+    cache_credentials = _cache_credentials(credentials)
+    cache_key = read_cache.key(cache_credentials, name, resource_id, fields_mask)
+    if (cached := read_cache.get(cache_key)) is not None:
+        return cached
 
-    handle_response_errors(response, "read", name, resource_id)
-    if params is not None:
-        return parse_response_json(response, model, partial=True)
-    return parse_response_json(response, model)
+    deadline = resolve_deadline(timeout)
+
+    generation = read_cache.generation(cache_key)
 
+    async def fetch(deadline: Deadline | None) -> Model:
+        client = client_pool.async_client(credentials=credentials)
+        response = await Retrying("read", name, resource_id, deadline=deadline).asend(
+            lambda timeout: client.get(url=url, params=params, timeout=timeout)
+        )
 
+        handle_response_errors(response, "read", name, resource_id)
+        result = parse_response_json(response, model, partial=params is not None)
+        read_cache.put(cache_key, result, generation)
+        return result
+
+    if not client_pool.settings.read_coalescing:
+        return await fetch(deadline)
+    # concurrent identical reads share one request, not bound to the deadline of
+    # the first caller, each caller waits for it until its own deadline; a read
+    # started after a write doesn't join one started before it
+    flight_key = (
+        cache_key or read_key(cache_credentials, name, resource_id, fields_mask),
+        generation,
+    )
+    return await read_flights.do(flight_key, lambda: fetch(None), deadline)
+
+
+@_asharded(_data_id)
 async def aupdate(
     data: Model,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
     partial: bool = True,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """
     Updates a Google Wallet Class or Object asynchronously. `U` in CRUD.
 
     :param data:                    Data to pass to the Google RESTful API.
                                     A model instance, has to be a registered model.
-    :param credentials:             Optional session credentials as dict.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                  Optional list of fields to include in the response for partial responses.
     :param partial:                 Optional boolean indicating whether a partial update is executed or a full replacement.
+    :param timeout:                 Optional timeout of the call in seconds, or a `Deadline`.
     :raises QuotaExceededException: When the quota was exceeded
     :raises LookupError:            When the resource was not found (404)
     :raises WalletException:        When the response status code is not 200 or 404
@@ -778,41 +1554,44 @@ async def aupdate(
             params = {"fields": ",".join(fields)}
 
     session = client_pool.async_client(credentials=credentials)
-    if partial:
-        response = await session.patch(
-            url=client_pool.url(name, f"/{resource_id}"),
-            data=verified_json.encode("utf-8"),
-            params=params,
-        )
-    else:
-        response = await session.put(
+    send = session.patch if partial else session.put
+    response = await Retrying(
+        "update", name, resource_id, deadline=resolve_deadline(timeout), retry=False
+    ).asend(
+        lambda timeout: send(
             url=client_pool.url(name, f"/{resource_id}"),
             data=verified_json.encode("utf-8"),
             params=params,
+            timeout=timeout,
         )
+    )
 
     logger.debug(verified_json.encode("utf-8"))
     handle_response_errors(response, "update", name, resource_id)
-    if params is not None:
-        return parse_response_json(response, model, partial=True)
-    return parse_response_json(response, model)
+    result = parse_response_json(response, model, partial=params is not None)
+    return _cache_written(
+        credentials, name, result, partial=params is not None, resource_id=resource_id
+    )
 
 
+@_asharded(_resource_id)
 async def amessage(
     name: str,
     resource_id: str,
     message: dict[str, typing.Any] | Message,
     *,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
 ) -> Model:
     """Sends a message to a Google Wallet Class or Object asynchronously.
 
     :param name:                      Registered name of the model to use
     :param resource_id:               Identifier of the resource to send to
     :param message:                   Message to send.
-    :param credentials:               Optional session credentials as dict.
+    :param credentials:               Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                    Optional list of fields to include in the response for partial responses.
+    :param timeout:                   Optional timeout of the call in seconds, or a `Deadline`.
     :raises QuotaExceededException:   When the quota was exceeded
     :raises LookupError:              When the resource was not found (404)
     :raises WalletException:          When the response status code is not 200 or 404
@@ -826,17 +1605,63 @@ async def amessage(
             params = {"fields": ",".join(fields)}
 
     client = client_pool.async_client(credentials=credentials)
-    response = await client.post(
-        url=url, data=verified_json.encode("utf-8"), params=params
+    response = await Retrying(
+        "message", name, resource_id, deadline=resolve_deadline(timeout), retry=False
+    ).asend(
+        lambda timeout: client.post(
+            url=url, data=verified_json.encode("utf-8"), params=params, timeout=timeout
+        )
     )
 
     handle_response_errors(response, "send message to", name, resource_id)
-    logger.debug(f"RAW-Response: {response.content!r}")
-    resource_data = json.loads(response.content)["resource"]
-    if params is not None:
-        partial_model = make_partial_model(model)
-        return partial_model.model_validate(resource_data)
-    return model.model_validate(resource_data)
+    result = _parse_message_response(response, model, partial=params is not None)
+    return _cache_written(
+        credentials, name, result, partial=params is not None, resource_id=resource_id
+    )
+
+
+@_asharded(_data_id)
+async def aupsert(
+    data: Model,
+    *,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    update_first: bool = False,
+    timeout: float | Deadline | None = None,
+) -> Model:
+    """
+    Creates a Google Wallet Class or Object asynchronously, or updates it if it already exists.
+
+    See `upsert` for the strategies.
+
+    :param data:                    Data to pass to the Google RESTful API.
+                                    A model instance, has to be a registered model.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:                  Optional list of fields to include in the response for partial responses.
+    :param update_first:            Optional Flag, whether to try the update before the create.
+    :param timeout:                 Optional timeout of both round trips together in seconds, or a `Deadline`.
+    :raises QuotaExceededException: When the quota was exceeded
+    :raises WalletException:        When the response status code is not 200
+    :return:                        The created or updated model instance.
+    """
+    deadline = resolve_deadline(timeout)
+    if update_first:
+        try:
+            return await aupdate(
+                data, credentials=credentials, fields=fields, timeout=deadline
+            )
+        except LookupError:
+            return await acreate(
+                data, credentials=credentials, fields=fields, timeout=deadline
+            )
+    result = await _acreate(
+        data, credentials=credentials, fields=fields, timeout=deadline, allow_409=True
+    )
+    if result is None:
+        return await aupdate(
+            data, credentials=credentials, fields=fields, timeout=deadline
+        )
+    return result
 
 
 async def alisting(
@@ -846,9 +1671,12 @@ async def alisting(
     issuer_id: str | None = None,
     result_per_page: int = 0,
     next_page_token: str | None = None,
-    credentials: dict | None = None,
+    credentials: dict | CredentialsGroup | None = None,
     fields: list[str] | None = None,
-) -> AsyncGenerator[Model | str, None]:
+    stream: bool = False,
+    lazy: bool = False,
+    timeout: float | Deadline | None = None,
+) -> AsyncGenerator[Model | LazyRecord | str, None]:
     """Lists wallet related resources asynchronously.
 
     It is possible to list all classes of an issuer. Parameter 'name' has to end with 'Class',
@@ -868,8 +1696,15 @@ async def alisting(
     :param result_per_page:         Number of results per page to fetch.
                                     If omitted all results will be fetched and provided by the generator.
     :param next_page_token:         Token to get the next page of results.
-    :param credentials:             Optional session credentials as dict.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
     :param fields:                  Optional list of fields to include in the response for partial responses.
+    :param stream:                  Decode the response body incrementally and yield each record as soon
+                                    as it arrived, instead of decoding whole pages.
+                                    Keeps about one record in memory instead of one page.
+    :param lazy:                    Yield a read-only `LazyRecord` view per record instead of a model instance.
+                                    Fields are validated on first access, `materialize()` returns the model instance.
+    :param timeout:                 Optional timeout of fetching all pages in seconds, or a `Deadline`.
+                                    It starts with the iteration, each page is fetched within the time left.
     :raises QuotaExceededException: When the quota was exceeded
     :raises ValueError:             When input was invalid.
     :raises LookupError:            When the resource was not found (404)
@@ -893,21 +1728,42 @@ async def alisting(
 
     url = client_pool.url(name)
 
-    client = client_pool.async_client(credentials=credentials)
+    deadline = resolve_deadline(timeout)
+
+    async def send_page(member: dict | None) -> httpx.Response:
+        client = client_pool.async_client(credentials=member)
+        retrying = Retrying("list", name, resource_identifier, deadline=deadline)
+        if stream:
+            response = await retrying.asend(
+                lambda timeout: _asend_stream(client, url, params, timeout)
+            )
+        else:
+            response = await retrying.asend(
+                lambda timeout: client.get(url=url, params=params, timeout=timeout)
+            )
+        try:
+            handle_response_errors(response, "list", name, resource_identifier)
+        except Exception:
+            await response.aclose()
+            raise
+        return response
+
     while True:
-        response = await client.get(url=url, params=params)
-        handle_response_errors(response, "list", name, resource_identifier)
-        paginated_response = PaginatedResponse.model_validate_json(response.content)
-        pagination: Pagination | None = paginated_response.pagination
-
-        if "fields" in params:
-            partial_model = make_partial_model(model)
-            resources = paginated_response.resources
-            if resources:
-                for resource in resources:
-                    yield partial_model.model_validate(resource)
+        # each page on an account of a group, before any of its records is yielded
+        response = await _aon_account(credentials, send_page)
+        if stream:
+            decoder = ListingPageDecoder(model, partial="fields" in params, lazy=lazy)
+            try:
+                async for chunk in response.aiter_bytes():
+                    for resource in decoder.feed(chunk):
+                        yield resource
+            finally:
+                await response.aclose()
+            pagination = decoder.close()
         else:
-            validated_models = _process_listing_page(response.content, model)
+            validated_models, pagination = _parse_listing_page(
+                response.content, model, partial="fields" in params, lazy=lazy
+            )
             for resource in validated_models:
                 yield resource
 
@@ -923,3 +1779,682 @@ async def alisting(
                 continue
         break
     return
+
+
+def _alisting_page_fetcher(
+    name: str,
+    *,
+    resource_id: str | None,
+    issuer_id: str | None,
+    page_size: int,
+    credentials: dict | CredentialsGroup | None,
+    fields: list[str] | None,
+    deadline: Deadline | None,
+) -> AsyncFetchPage:
+    """Prepare a listing and return a function fetching one of its pages by token.
+
+    :raises ValueError: When input was invalid.
+    """
+    model, params, is_pageable, resource_identifier = _prepare_listing(
+        name, resource_id, issuer_id
+    )
+    if fields:
+        if _validate_partial_response_fields(fields, name):
+            params["fields"] = ",".join(fields)
+    params.update(_setup_pagination_params(is_pageable, page_size, None))
+    url = client_pool.url(name)
+
+    async def send_page(member: dict | None, page_params: dict) -> httpx.Response:
+        client = client_pool.async_client(credentials=member)
+        response = await Retrying(
+            "list", name, resource_identifier, deadline=deadline
+        ).asend(
+            lambda timeout: client.get(url=url, params=page_params, timeout=timeout)
+        )
+        handle_response_errors(response, "list", name, resource_identifier)
+        return response
+
+    async def fetch_page(token: str | None) -> tuple[list[Model], str | None]:
+        page_params = {**params, "token": token} if token else params
+        response = await _aon_account(
+            credentials, lambda member: send_page(member, page_params)
+        )
+        validated_models, pagination = _parse_listing_page(
+            response.content, model, partial="fields" in params
+        )
+        if not is_pageable or not pagination:
+            return validated_models, None
+        return validated_models, pagination.nextPageToken
+
+    return fetch_page
+
+
+def alisting_cursor(
+    name: str,
+    *,
+    resource_id: str | None = None,
+    issuer_id: str | None = None,
+    page_size: int = 0,
+    next_page_token: str | None = None,
+    prefetch: int = 1,
+    max_pages: int | None = None,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> AsyncListingCursor:
+    """Lists wallet related resources asynchronously with a cursor prefetching the next pages.
+
+    Same as `alisting`, but while the consumer processes a page, the next ``prefetch``
+    pages are fetched in a background task. Iterating the cursor with ``async for`` yields
+    model instances only, the token to continue the listing is available as
+    ``cursor.next_page_token``. Use ``cursor.pages()`` to iterate page by page.
+
+    :param name:                    Registered name to base the listing on.
+    :param resource_id:             Id of the class to list objects of.
+                                    Only for object listings.
+                                    Mutually exclusive with issuer_id.
+    :param issuer_id:               Identifier of the issuer to list classes of.
+                                    Only for class listings.
+                                    Mutually exclusive with resource_id.
+    :param page_size:               Number of results per page to fetch, defaults to 100.
+    :param next_page_token:         Token of the first page to fetch.
+    :param prefetch:                Number of pages to fetch ahead of the page being consumed.
+    :param max_pages:               Stop after this number of pages, by default all pages are fetched.
+    :param credentials:             Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:                  Optional list of fields to include in the response for partial responses.
+    :param timeout:                 Optional timeout of fetching all pages in seconds, or a `Deadline`.
+    :raises ValueError:             When input was invalid.
+    :return:                        The cursor. Errors of the requests are raised while iterating,
+                                    see `alisting`.
+    """
+    fetch_page = _alisting_page_fetcher(
+        name,
+        resource_id=resource_id,
+        issuer_id=issuer_id,
+        page_size=page_size,
+        credentials=credentials,
+        fields=fields,
+        deadline=resolve_deadline(timeout),
+    )
+    return AsyncListingCursor(
+        fetch_page,
+        next_page_token=next_page_token,
+        prefetch=prefetch,
+        max_pages=max_pages,
+    )
+
+
+# Bulk API
+
+
+def _check_concurrency(concurrency: int | AdaptiveConcurrencyLimiter) -> None:
+    """Check the concurrency of a ``*_many`` call before its generator is returned."""
+    if isinstance(concurrency, AdaptiveConcurrencyLimiter):
+        return
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be >= 1, got {concurrency}")
+
+
+def _future_outcome(future: Future) -> Model | Exception:
+    """Return the result of a finished future, or the exception it raised."""
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def _run_many(
+    func: Callable[[_T], Model],
+    items: Iterable[_T],
+    concurrency: int,
+) -> Generator[Model | Exception, None, None]:
+    """Apply *func* to each item in a thread pool and yield the outcomes in order.
+
+    At most ``2 * concurrency`` items are taken from *items* ahead of the
+    consumer, so memory stays bounded for large or lazy inputs.
+    """
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="wallet-google-bulk"
+    ) as executor:
+        pending: deque[Future] = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= 2 * concurrency:
+                    yield _future_outcome(pending.popleft())
+            while pending:
+                yield _future_outcome(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def _aiterate(
+    items: Iterable[_T] | AsyncIterable[_T],
+) -> AsyncGenerator[_T, None]:
+    """Iterate over a sync or an async iterable."""
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _task_outcome(task: asyncio.Task) -> Model | Exception:
+    """Await a task and return its result, or the exception it raised."""
+    try:
+        return await task
+    except Exception as e:
+        return e
+
+
+def _concurrency_slots(
+    concurrency: int | AdaptiveConcurrencyLimiter,
+) -> tuple[Callable[[], AbstractAsyncContextManager], int]:
+    """Return a function making the context managers limiting the requests in flight,
+    and the maximum number of requests in flight.
+    """
+    if isinstance(concurrency, AdaptiveConcurrencyLimiter):
+        return concurrency.slot, concurrency.max_limit
+    semaphore = asyncio.Semaphore(concurrency)
+    return lambda: semaphore, concurrency
+
+
+async def _arun_many(
+    func: Callable[[_T], Awaitable[Model]],
+    items: Iterable[_T] | AsyncIterable[_T],
+    concurrency: int | AdaptiveConcurrencyLimiter,
+) -> AsyncGenerator[Model | Exception, None]:
+    """Apply *func* to each item concurrently and yield the outcomes in order.
+
+    The number of requests in flight is limited by a semaphore or by an adaptive
+    limiter, and at most twice their maximum are taken from *items* ahead of the
+    consumer.
+    """
+    slot, max_concurrency = _concurrency_slots(concurrency)
+
+    async def guarded(item: _T) -> Model:
+        async with slot():
+            return await func(item)
+
+    pending: deque[asyncio.Task] = deque()
+    try:
+        async for item in _aiterate(items):
+            pending.append(asyncio.ensure_future(guarded(item)))
+            if len(pending) >= 2 * max_concurrency:
+                yield await _task_outcome(pending.popleft())
+        while pending:
+            yield await _task_outcome(pending.popleft())
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def create_many(
+    items: Iterable[Model],
+    *,
+    concurrency: int = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> Generator[Model | Exception, None, None]:
+    """
+    Creates many Google Wallet items concurrently, see `create`.
+
+    :param items:       Iterable of model instances to create, may be a generator.
+    :param concurrency: Maximum number of requests in flight.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param timeout:     Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError: When concurrency is lower than 1.
+    :return:            Generator of the created model instances, in the order of *items*.
+                        If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _run_many(
+        lambda data: create(
+            data, credentials=credentials, fields=fields, timeout=deadline
+        ),
+        items,
+        concurrency,
+    )
+
+
+def update_many(
+    items: Iterable[Model],
+    *,
+    concurrency: int = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    partial: bool = True,
+    timeout: float | Deadline | None = None,
+) -> Generator[Model | Exception, None, None]:
+    """
+    Updates many Google Wallet Classes or Objects concurrently, see `update`.
+
+    :param items:       Iterable of model instances to update, may be a generator.
+    :param concurrency: Maximum number of requests in flight.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param partial:     Optional Flag, whether a partial update is executed or a full replacement.
+    :param timeout:     Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError: When concurrency is lower than 1.
+    :return:            Generator of the updated model instances, in the order of *items*.
+                        If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _run_many(
+        lambda data: update(
+            data,
+            credentials=credentials,
+            fields=fields,
+            partial=partial,
+            timeout=deadline,
+        ),
+        items,
+        concurrency,
+    )
+
+
+def message_many(
+    name: str,
+    items: Iterable[tuple[str, dict[str, typing.Any] | Message]],
+    *,
+    concurrency: int = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> Generator[Model | Exception, None, None]:
+    """
+    Sends messages to many Google Wallet Classes or Objects concurrently, see `message`.
+
+    :param name:        Registered name of the model to use
+    :param items:       Iterable of (resource_id, message) tuples, may be a generator.
+    :param concurrency: Maximum number of requests in flight.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param timeout:     Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError: When concurrency is lower than 1.
+    :return:            Generator of the model instances, in the order of *items*.
+                        If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _run_many(
+        lambda item: message(
+            name,
+            item[0],
+            item[1],
+            credentials=credentials,
+            fields=fields,
+            timeout=deadline,
+        ),
+        items,
+        concurrency,
+    )
+
+
+def upsert_many(
+    items: Iterable[Model],
+    *,
+    concurrency: int = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    update_first: bool = False,
+    timeout: float | Deadline | None = None,
+) -> Generator[Model | Exception, None, None]:
+    """
+    Creates or updates many Google Wallet Classes or Objects concurrently, see `upsert`.
+
+    :param items:        Iterable of model instances to upsert, may be a generator.
+    :param concurrency:  Maximum number of items in progress.
+    :param credentials:  Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:       Optional list of fields to include in the response for partial responses.
+    :param update_first: Optional Flag, whether to try the update before the create.
+    :param timeout:      Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError:  When concurrency is lower than 1.
+    :return:             Generator of the created or updated model instances, in the order of *items*.
+                         If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _run_many(
+        lambda data: upsert(
+            data,
+            credentials=credentials,
+            fields=fields,
+            update_first=update_first,
+            timeout=deadline,
+        ),
+        items,
+        concurrency,
+    )
+
+
+def acreate_many(
+    items: Iterable[Model] | AsyncIterable[Model],
+    *,
+    concurrency: int | AdaptiveConcurrencyLimiter = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> AsyncGenerator[Model | Exception, None]:
+    """
+    Creates many Google Wallet items concurrently, see `acreate`.
+
+    :param items:       Iterable or async iterable of model instances to create.
+    :param concurrency: Maximum number of requests in flight, or an `AdaptiveConcurrencyLimiter`.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param timeout:     Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError: When concurrency is lower than 1.
+    :return:            AsyncGenerator of the created model instances, in the order of *items*.
+                        If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _arun_many(
+        lambda data: acreate(
+            data, credentials=credentials, fields=fields, timeout=deadline
+        ),
+        items,
+        concurrency,
+    )
+
+
+def aupdate_many(
+    items: Iterable[Model] | AsyncIterable[Model],
+    *,
+    concurrency: int | AdaptiveConcurrencyLimiter = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    partial: bool = True,
+    timeout: float | Deadline | None = None,
+) -> AsyncGenerator[Model | Exception, None]:
+    """
+    Updates many Google Wallet Classes or Objects concurrently, see `aupdate`.
+
+    :param items:       Iterable or async iterable of model instances to update.
+    :param concurrency: Maximum number of requests in flight, or an `AdaptiveConcurrencyLimiter`.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param partial:     Optional Flag, whether a partial update is executed or a full replacement.
+    :param timeout:     Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError: When concurrency is lower than 1.
+    :return:            AsyncGenerator of the updated model instances, in the order of *items*.
+                        If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _arun_many(
+        lambda data: aupdate(
+            data,
+            credentials=credentials,
+            fields=fields,
+            partial=partial,
+            timeout=deadline,
+        ),
+        items,
+        concurrency,
+    )
+
+
+def amessage_many(
+    name: str,
+    items: Iterable[tuple[str, dict[str, typing.Any] | Message]]
+    | AsyncIterable[tuple[str, dict[str, typing.Any] | Message]],
+    *,
+    concurrency: int | AdaptiveConcurrencyLimiter = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> AsyncGenerator[Model | Exception, None]:
+    """
+    Sends messages to many Google Wallet Classes or Objects concurrently, see `amessage`.
+
+    :param name:        Registered name of the model to use
+    :param items:       Iterable or async iterable of (resource_id, message) tuples.
+    :param concurrency: Maximum number of requests in flight, or an `AdaptiveConcurrencyLimiter`.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param timeout:     Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError: When concurrency is lower than 1.
+    :return:            AsyncGenerator of the model instances, in the order of *items*.
+                        If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _arun_many(
+        lambda item: amessage(
+            name,
+            item[0],
+            item[1],
+            credentials=credentials,
+            fields=fields,
+            timeout=deadline,
+        ),
+        items,
+        concurrency,
+    )
+
+
+def aupsert_many(
+    items: Iterable[Model] | AsyncIterable[Model],
+    *,
+    concurrency: int | AdaptiveConcurrencyLimiter = 10,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    update_first: bool = False,
+    timeout: float | Deadline | None = None,
+) -> AsyncGenerator[Model | Exception, None]:
+    """
+    Creates or updates many Google Wallet Classes or Objects concurrently, see `aupsert`.
+
+    :param items:        Iterable or async iterable of model instances to upsert.
+    :param concurrency:  Maximum number of items in progress, or an `AdaptiveConcurrencyLimiter`.
+    :param credentials:  Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:       Optional list of fields to include in the response for partial responses.
+    :param update_first: Optional Flag, whether to try the update before the create.
+    :param timeout:      Optional timeout of all calls together in seconds, or a `Deadline`.
+    :raises ValueError:  When concurrency is lower than 1.
+    :return:             AsyncGenerator of the created or updated model instances, in the order of *items*.
+                         If an item failed, the exception raised for it is yielded instead.
+    """
+    _check_concurrency(concurrency)
+    deadline = resolve_deadline(timeout)
+    return _arun_many(
+        lambda data: aupsert(
+            data,
+            credentials=credentials,
+            fields=fields,
+            update_first=update_first,
+            timeout=deadline,
+        ),
+        items,
+        concurrency,
+    )
+
+
+async def _alisting_many(
+    name: str,
+    class_ids: Iterable[str] | AsyncIterable[str],
+    concurrency: int | AdaptiveConcurrencyLimiter,
+    bucket: TokenBucket | None,
+    page_size: int,
+    credentials: dict | CredentialsGroup | None,
+    fields: list[str] | None,
+    deadline: Deadline | None,
+) -> AsyncGenerator[tuple[str, Model | Exception], None]:
+    """List the objects of classes in *concurrency* workers and merge their pages.
+
+    Each worker takes the next class id and fetches its pages one after the other.
+    Pages are handed to the consumer through a queue of *concurrency* pages, so
+    workers wait while the consumer is behind. With an adaptive limiter, there is
+    a worker per maximum request in flight, and each page request takes a slot.
+    """
+    if isinstance(concurrency, AdaptiveConcurrencyLimiter):
+        slot, concurrency = concurrency.slot, concurrency.max_limit
+    else:
+        slot = contextlib.nullcontext
+    pages: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    ids = _aiterate(class_ids)
+    # an async generator must not be advanced concurrently
+    ids_lock = asyncio.Lock()
+
+    async def next_class_id() -> str | None:
+        async with ids_lock:
+            return await anext(ids, None)
+
+    async def list_class(class_id: str) -> None:
+        fetch_page = _alisting_page_fetcher(
+            name,
+            resource_id=class_id,
+            issuer_id=None,
+            page_size=page_size,
+            credentials=credentials,
+            fields=fields,
+            deadline=deadline,
+        )
+        token = None
+        while True:
+            if bucket is not None:
+                await bucket.aacquire()
+            async with slot():
+                models, token = await fetch_page(token)
+            await pages.put((class_id, models))
+            if token is None:
+                return
+
+    async def work() -> None:
+        try:
+            while (class_id := await next_class_id()) is not None:
+                try:
+                    await list_class(class_id)
+                except Exception as e:
+                    await pages.put((class_id, [e]))
+        except Exception as e:
+            # the iterable of class ids failed
+            await pages.put(e)
+        await pages.put(None)
+
+    workers = [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    running = len(workers)
+    try:
+        while running:
+            page = await pages.get()
+            if page is None:
+                running -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+            class_id, models = page
+            for model in models:
+                yield class_id, model
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+
+def alisting_many(
+    name: str,
+    class_ids: Iterable[str] | AsyncIterable[str],
+    *,
+    concurrency: int | AdaptiveConcurrencyLimiter = 10,
+    rate: float | TokenBucket | None = None,
+    page_size: int = 0,
+    credentials: dict | CredentialsGroup | None = None,
+    fields: list[str] | None = None,
+    timeout: float | Deadline | None = None,
+) -> AsyncGenerator[tuple[str, Model | Exception], None]:
+    """
+    Lists the objects of many Google Wallet Classes concurrently, see `alisting`.
+
+    The objects of all classes are merged into one stream, each tagged with the id of its class.
+    Objects of one class keep their order, objects of different classes are interleaved.
+
+    :param name:        Registered name of the object model to list, e.g. "GenericObject".
+    :param class_ids:   Iterable or async iterable of the ids of the classes to list the objects of.
+    :param concurrency: Maximum number of classes listed at the same time, which is also the
+                        maximum number of requests in flight. Or an `AdaptiveConcurrencyLimiter`
+                        adjusting the requests in flight, up to its maximum classes are listed
+                        at the same time.
+    :param rate:        Optional maximum number of page requests per second, or a `TokenBucket`
+                        to share the budget with other calls.
+    :param page_size:   Number of results per page to fetch, defaults to 100.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param fields:      Optional list of fields to include in the response for partial responses.
+    :param timeout:     Optional timeout of listing all classes in seconds, or a `Deadline`.
+    :raises ValueError: When input was invalid or concurrency is lower than 1.
+    :return:            AsyncGenerator of (class id, model instance) tuples.
+                        If listing a class failed, (class id, exception) is yielded instead
+                        and the other classes are listed on.
+    """
+    _check_concurrency(concurrency)
+    raise_when_operation_not_allowed(name, "list")
+    if not name.endswith("Object"):
+        raise ValueError(f"alisting_many lists objects, got {name}")
+    if fields:
+        _validate_partial_response_fields(fields, name)
+    bucket = TokenBucket(rate) if isinstance(rate, (int, float)) else rate
+    return _alisting_many(
+        name,
+        class_ids,
+        concurrency,
+        bucket,
+        page_size,
+        credentials,
+        fields,
+        resolve_deadline(timeout),
+    )
+
+
+# Batch API
+
+
+def batch(
+    *, credentials: dict | CredentialsGroup | None = None, max_parts: int = 50
+) -> "Batch":
+    """
+    Creates a batch to send many calls as multipart batch requests.
+
+    The batch collects calls with the same signature as `create`, `read`, `update`
+    and `message` (without credentials). Each returns a `BatchResult`.
+    All calls are sent when the batch is used as context manager and the block is left,
+    or when `Batch.execute` is called.
+
+    .. code-block:: python
+
+        with api.batch() as batch:
+            results = [batch.create(obj) for obj in objects]
+        created = [result.result() for result in results]
+
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param max_parts:   Maximum number of calls per HTTP request, Google allows up to 1000.
+    :raises ValueError: When max_parts is out of range.
+    :return:            The batch.
+    """
+    from .batch import Batch
+
+    return Batch(credentials=credentials, max_parts=max_parts)
+
+
+def abatch(
+    *, credentials: dict | CredentialsGroup | None = None, max_parts: int = 50
+) -> "AsyncBatch":
+    """
+    Creates a batch to send many calls asynchronously as multipart batch requests.
+
+    Same as `batch`, but used as async context manager and executed with
+    ``await batch.execute()``.
+
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :param max_parts:   Maximum number of calls per HTTP request, Google allows up to 1000.
+    :raises ValueError: When max_parts is out of range.
+    :return:            The async batch.
+    """
+    from .batch import AsyncBatch
+
+    return AsyncBatch(credentials=credentials, max_parts=max_parts)
@@ -0,0 +1,433 @@
+"""Batch requests for the Google Wallet API.
+
+Google's REST APIs accept ``multipart/mixed`` batch requests, where each part
+is a complete HTTP sub-request. This packs many small inserts, reads, patches
+and messages into one round trip.
+
+Calls are collected on a `Batch` (or `AsyncBatch`) and sent when the batch is
+executed, at the latest when the ``with`` block is left.
+Each collected call returns a `BatchResult`, which holds the model instance or
+the exception of the call after execution:
+
+.. code-block:: python
+
+    from edutap.wallet_google import api
+
+    with api.batch() as batch:
+        created = [batch.create(obj) for obj in objects]
+        existing = batch.read("GenericClass", class_id)
+    print(existing.result())
+"""
+
+from .api import _cache_written
+from .api import _parse_message_response
+from .api import _prepare_create
+from .api import _prepare_message
+from .api import _prepare_read
+from .api import _prepare_update
+from .api import _validate_partial_response_fields
+from .clientpool import client_pool
+from .credentialsgroup import CredentialsGroup
+from .exceptions import WalletException
+from .models.bases import Model
+from .models.datatypes.message import Message
+from .utils import handle_response_errors
+from .utils import parse_response_json
+from collections.abc import Callable
+
+import httpx
+import logging
+import re
+import typing
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+CRLF = b"\r\n"
+_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_CONTENT_ID_RE = re.compile(r"<(?:response-)?item(\d+)>", re.IGNORECASE)
+_NOT_EXECUTED = object()
+
+
+class BatchResult:
+    """Outcome of a single call collected in a batch.
+
+    Available after the batch was executed.
+    """
+
+    def __init__(self, operation: str, name: str, resource_id: str):
+        self.operation = operation
+        self.name = name
+        self.resource_id = resource_id
+        self._result: typing.Any = _NOT_EXECUTED
+        self._exception: Exception | None = None
+
+    def __repr__(self) -> str:
+        return f"<BatchResult {self.operation} {self.name} {self.resource_id}>"
+
+    @property
+    def done(self) -> bool:
+        """Whether the batch containing this call was executed."""
+        return self._exception is not None or self._result is not _NOT_EXECUTED
+
+    def exception(self) -> Exception | None:
+        """Return the exception of the call, or None if it succeeded.
+
+        :raises RuntimeError: When the batch was not executed yet.
+        """
+        if not self.done:
+            raise RuntimeError(f"{self!r} was not executed yet")
+        return self._exception
+
+    def result(self) -> Model:
+        """Return the model instance returned by the call.
+
+        :raises RuntimeError: When the batch was not executed yet.
+        :raises Exception:    The exception of the call, as the single-item API function would raise it.
+        """
+        if exception := self.exception():
+            raise exception
+        return self._result
+
+
+class _BatchCall:
+    """A collected sub-request and how to parse its response."""
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, str] | None,
+        body: bytes | None,
+        parse: Callable[[httpx.Response], Model],
+        result: BatchResult,
+    ):
+        self.request = httpx.Request(
+            method,
+            url,
+            params=params,
+            content=body,
+            headers={"Content-Type": "application/json"} if body else None,
+        )
+        self.parse = parse
+        self.result = result
+
+    def resolve(self, response: httpx.Response) -> None:
+        try:
+            self.result._result = self.parse(response)
+        except Exception as e:
+            self.result._exception = e
+
+    def fail(self, exception: Exception) -> None:
+        self.result._exception = exception
+
+
+def encode_batch_request(requests: list[httpx.Request], boundary: str) -> bytes:
+    """Encode requests as a multipart/mixed batch body.
+
+    :param requests: Sub-requests to encode. Their index is used as Content-ID.
+    :param boundary: Multipart boundary.
+    :return:         The batch request body.
+    """
+    body = bytearray()
+    for index, request in enumerate(requests):
+        body += f"--{boundary}".encode() + CRLF
+        body += b"Content-Type: application/http" + CRLF
+        body += b"Content-Transfer-Encoding: binary" + CRLF
+        body += f"Content-ID: <item{index}>".encode() + CRLF + CRLF
+        body += f"{request.method} ".encode() + request.url.raw_path + b" HTTP/1.1"
+        body += CRLF
+        if content_type := request.headers.get("Content-Type"):
+            body += f"Content-Type: {content_type}".encode() + CRLF
+        body += CRLF
+        body += request.content + CRLF
+    body += f"--{boundary}--".encode() + CRLF
+    return bytes(body)
+
+
+def _split_head(data: bytes) -> tuple[list[str], bytes]:
+    """Split a header block from its body, return header lines and body."""
+    match = re.search(rb"\r?\n\r?\n", data)
+    if match is None:
+        return data.decode("latin-1").splitlines(), b""
+    head = data[: match.start()].decode("latin-1").splitlines()
+    return head, data[match.end() :]
+
+
+def decode_batch_response(response: httpx.Response) -> dict[int, httpx.Response]:
+    """Decode a multipart/mixed batch response into its sub-responses.
+
+    :param response: The batch response.
+    :return:         Mapping of the sub-request index to its response.
+    :raises WalletException: When the response is not a multipart response.
+    """
+    match = _BOUNDARY_RE.search(response.headers.get("Content-Type", ""))
+    if match is None:
+        raise WalletException(
+            f"Batch response is not multipart: {response.headers.get('Content-Type')}"
+        )
+    delimiter = b"--" + match.group(1).encode()
+    responses = {}
+    for position, part in enumerate(response.content.split(delimiter)[1:]):
+        if part.startswith(b"--"):
+            break
+        part_headers, http_message = _split_head(part.lstrip(b"\r\n"))
+        index = position
+        for header in part_headers:
+            name, _, value = header.partition(":")
+            if name.strip().lower() == "content-id":
+                if id_match := _CONTENT_ID_RE.search(value):
+                    index = int(id_match.group(1))
+        lines, content = _split_head(http_message)
+        status_code = int(lines[0].split()[1])
+        headers = [
+            (name.strip(), value.strip())
+            for name, _, value in (line.partition(":") for line in lines[1:])
+        ]
+        responses[index] = httpx.Response(
+            status_code, headers=headers, content=content.rstrip(b"\r\n")
+        )
+    return responses
+
+
+class _BatchBase:
+    def __init__(
+        self,
+        *,
+        credentials: dict | CredentialsGroup | None = None,
+        max_parts: int = 50,
+    ):
+        if not 1 <= max_parts <= 1000:
+            raise ValueError(f"max_parts must be between 1 and 1000, got {max_parts}")
+        if isinstance(credentials, CredentialsGroup):
+            # one request, one account
+            credentials = client_pool.select_credentials(credentials)
+        self.credentials = credentials
+        self.max_parts = max_parts
+        self._calls: list[_BatchCall] = []
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _fields_params(self, name: str, fields: list[str] | None) -> dict | None:
+        if fields and _validate_partial_response_fields(fields, name):
+            return {"fields": ",".join(fields)}
+        return None
+
+    def _add(self, call: _BatchCall) -> BatchResult:
+        self._calls.append(call)
+        return call.result
+
+    def create(self, data: Model, *, fields: list[str] | None = None) -> BatchResult:
+        """Collects a create call, see `api.create`."""
+        name, verified_json, model, _ = _prepare_create(data)
+        params = self._fields_params(name, fields)
+        resource_id = getattr(data, "id", "No ID")
+
+        def parse(response: httpx.Response) -> Model:
+            handle_response_errors(response, "create", name, resource_id)
+            result = parse_response_json(response, model, partial=params is not None)
+            return _cache_written(
+                self.credentials, name, result, partial=params is not None
+            )
+
+        return self._add(
+            _BatchCall(
+                "POST",
+                client_pool.url(name),
+                params,
+                verified_json.encode("utf-8"),
+                parse,
+                BatchResult("create", name, resource_id),
+            )
+        )
+
+    def read(
+        self, name: str, resource_id: str, *, fields: list[str] | None = None
+    ) -> BatchResult:
+        """Collects a read call, see `api.read`."""
+        (model,) = _prepare_read(name, resource_id)
+        params = self._fields_params(name, fields)
+
+        def parse(response: httpx.Response) -> Model:
+            handle_response_errors(response, "read", name, resource_id)
+            return parse_response_json(response, model, partial=params is not None)
+
+        return self._add(
+            _BatchCall(
+                "GET",
+                client_pool.url(name, f"/{resource_id}"),
+                params,
+                None,
+                parse,
+                BatchResult("read", name, resource_id),
+            )
+        )
+
+    def update(
+        self,
+        data: Model,
+        *,
+        fields: list[str] | None = None,
+        partial: bool = True,
+    ) -> BatchResult:
+        """Collects an update call, see `api.update`."""
+        name, resource_id, verified_json, model = _prepare_update(data)
+        params = self._fields_params(name, fields)
+
+        def parse(response: httpx.Response) -> Model:
+            handle_response_errors(response, "update", name, resource_id)
+            result = parse_response_json(response, model, partial=params is not None)
+            return _cache_written(
+                self.credentials,
+                name,
+                result,
+                partial=params is not None,
+                resource_id=resource_id,
+            )
+
+        return self._add(
+            _BatchCall(
+                "PATCH" if partial else "PUT",
+                client_pool.url(name, f"/{resource_id}"),
+                params,
+                verified_json.encode("utf-8"),
+                parse,
+                BatchResult("update", name, resource_id),
+            )
+        )
+
+    def message(
+        self,
+        name: str,
+        resource_id: str,
+        message: dict[str, typing.Any] | Message,
+        *,
+        fields: list[str] | None = None,
+    ) -> BatchResult:
+        """Collects a message call, see `api.message`."""
+        model, verified_json = _prepare_message(name, message)
+        params = self._fields_params(name, fields)
+
+        def parse(response: httpx.Response) -> Model:
+            handle_response_errors(response, "send message to", name, resource_id)
+            result = _parse_message_response(
+                response, model, partial=params is not None
+            )
+            return _cache_written(
+                self.credentials,
+                name,
+                result,
+                partial=params is not None,
+                resource_id=resource_id,
+            )
+
+        return self._add(
+            _BatchCall(
+                "POST",
+                client_pool.url(name, f"/{resource_id}/addMessage"),
+                params,
+                verified_json.encode("utf-8"),
+                parse,
+                BatchResult("message", name, resource_id),
+            )
+        )
+
+    def _take_chunk(self) -> tuple[list[_BatchCall], str, bytes]:
+        """Remove the next chunk of calls and encode it as batch body."""
+        chunk = self._calls[: self.max_parts]
+        del self._calls[: self.max_parts]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        body = encode_batch_request([call.request for call in chunk], boundary)
+        return chunk, boundary, body
+
+    @staticmethod
+    def _fail(chunk: list[_BatchCall], exception: Exception) -> None:
+        """Fail the calls of a batch request with an exception."""
+        for call in chunk:
+            call.fail(exception)
+
+    def _dispatch(self, chunk: list[_BatchCall], response: httpx.Response) -> None:
+        """Hand the sub-responses of a batch response to the collected calls."""
+        try:
+            handle_response_errors(response, "execute", "batch")
+            responses = decode_batch_response(response)
+        except Exception as e:
+            self._fail(chunk, e)
+            return
+        for index, call in enumerate(chunk):
+            if (part := responses.get(index)) is None:
+                call.fail(WalletException(f"No response in batch for {call.result!r}"))
+            else:
+                call.resolve(part)
+
+
+class Batch(_BatchBase):
+    """Collects calls and sends them as multipart batch requests.
+
+    Use `api.batch` to create one.
+    """
+
+    def execute(self) -> None:
+        """Sends all collected calls, up to ``max_parts`` per HTTP request.
+
+        :raises Exception: When sending a batch request failed, e.g. with a
+                           transport error or `CircuitOpenException`. The calls
+                           of that request fail with it, later calls stay collected.
+        """
+        client = client_pool.client(credentials=self.credentials)
+        while self._calls:
+            chunk, boundary, body = self._take_chunk()
+            logger.debug(f"Sending batch with {len(chunk)} parts")
+            try:
+                response = client.post(
+                    url=str(client_pool.settings.batch_url),
+                    content=body,
+                    headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+                )
+            except Exception as e:
+                self._fail(chunk, e)
+                raise
+            self._dispatch(chunk, response)
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.execute()
+
+
+class AsyncBatch(_BatchBase):
+    """Collects calls and sends them asynchronously as multipart batch requests.
+
+    Use `api.abatch` to create one.
+    """
+
+    async def execute(self) -> None:
+        """Sends all collected calls, up to ``max_parts`` per HTTP request.
+
+        :raises Exception: When sending a batch request failed, see `Batch.execute`.
+        """
+        client = client_pool.async_client(credentials=self.credentials)
+        while self._calls:
+            chunk, boundary, body = self._take_chunk()
+            logger.debug(f"Sending batch with {len(chunk)} parts")
+            try:
+                response = await client.post(
+                    url=str(client_pool.settings.batch_url),
+                    content=body,
+                    headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+                )
+            except Exception as e:
+                self._fail(chunk, e)
+                raise
+            self._dispatch(chunk, response)
+
+    async def __aenter__(self) -> "AsyncBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            await self.execute()
@@ -0,0 +1,296 @@
+"""Read-through cache and request coalescing for the read API functions.
+
+Classes and objects are read much more often than they change.
+When enabled, `api.read` and `api.aread` return a cached model instance until its
+time-to-live is over, and create, update and message calls of this process
+refresh or drop the affected entries.
+
+The cache is disabled by default, set ``EDUTAP_WALLET_GOOGLE_READ_CACHE_SIZE`` to enable it.
+
+Independent of the cache, concurrent identical `api.aread` calls share one
+in-flight request (see `AsyncSingleFlight`).
+
+Cached and coalesced model instances are shared between callers and must be treated as read-only.
+"""
+
+from .clientpool import client_pool
+from .credentialsgroup import CredentialsGroup
+from .deadline import Deadline
+from .deadline import wait_for_deadline
+from .exceptions import DeadlineExceededException
+from .models.bases import Model
+from collections import OrderedDict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+
+import asyncio
+import threading
+import time
+import typing
+import weakref
+
+
+CacheKey = tuple[str, str, str, str | None]
+ResourceKey = tuple[str, str, str]
+_T = typing.TypeVar("_T")
+
+
+def read_key(
+    credentials: dict | CredentialsGroup | None,
+    name: str,
+    resource_id: str,
+    fields: str | None = None,
+) -> CacheKey:
+    """Build the key identifying a read.
+
+    The reads of a `CredentialsGroup` share their key whatever account served them,
+    so a write on another account of the group drops them.
+
+    :param credentials: Session credentials as passed to the API function, or a group.
+    :param name:        Registered name of the model.
+    :param resource_id: Identifier of the resource.
+    :param fields:      The fields mask as sent to Google, if any.
+    """
+    if isinstance(credentials, CredentialsGroup):
+        return (credentials.key, name, resource_id, fields)
+    credentials = client_pool._get_credentials(credentials)
+    return (client_pool._get_credentials_key(credentials), name, resource_id, fields)
+
+
+class ReadCache:
+    """Bounded LRU cache with a time-to-live per registered model name.
+
+    Entries are keyed by (credentials key, registered name, resource id, fields mask).
+    The entries of a resource are indexed by their first three parts, so a write drops them
+    without scanning the cache. Each write is numbered, and a read passes the generation of
+    the resource taken before it was sent to `put`. A read overtaken by a write is not stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        ttl: float = 300.0,
+        ttls: dict[str, float] | None = None,
+    ):
+        """
+        :param maxsize: Maximum number of entries, 0 disables the cache.
+        :param ttl:     Default time-to-live of an entry in seconds.
+        :param ttls:    Time-to-live in seconds by registered model name.
+                        A time-to-live of 0 disables caching for the model.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self._entries: OrderedDict[CacheKey, tuple[float, Model]] = OrderedDict()
+        self._keys: dict[ResourceKey, set[CacheKey]] = {}
+        # number of the last write by resource, bounded like the entries; resources
+        # dropped from it count as written at the floor
+        self._writes = 0
+        self._written: OrderedDict[ResourceKey, int] = OrderedDict()
+        self._written_floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def key(
+        self,
+        credentials: dict | CredentialsGroup | None,
+        name: str,
+        resource_id: str,
+        fields: str | None = None,
+    ) -> CacheKey | None:
+        """Build the key of a read, or None if the model is not cached.
+
+        :param credentials: Session credentials as passed to the API function, or a group.
+        :param name:        Registered name of the model.
+        :param resource_id: Identifier of the resource.
+        :param fields:      The fields mask as sent to Google, if any.
+        """
+        if not self.enabled or self.ttls.get(name, self.ttl) <= 0:
+            return None
+        return read_key(credentials, name, resource_id, fields)
+
+    def get(self, key: CacheKey | None) -> Model | None:
+        """Return the cached model instance, or None on a miss."""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, key: CacheKey | None) -> int:
+        """Return the generation of the resource of key, to pass to `put` after the read."""
+        if key is None:
+            return 0
+        with self._lock:
+            return self._written.get(key[:3], self._written_floor)
+
+    def put(
+        self, key: CacheKey | None, value: Model, generation: int | None = None
+    ) -> None:
+        """Store a model instance, evict the least recently used entries if full.
+
+        :param key:        Key of the read, see `key`.
+        :param value:      The model instance read.
+        :param generation: Generation of the resource before the read was sent, see `generation`.
+                           The instance is not stored if the resource was written since.
+        """
+        if key is None:
+            return
+        with self._lock:
+            if generation is not None and generation != self._written.get(
+                key[:3], self._written_floor
+            ):
+                return
+            self._store(key, value)
+
+    def _store(self, key: CacheKey, value: Model) -> None:
+        expires = time.monotonic() + self.ttls.get(key[1], self.ttl)
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        self._keys.setdefault(key[:3], set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        del self._entries[key]
+        keys = self._keys[key[:3]]
+        keys.discard(key)
+        if not keys:
+            del self._keys[key[:3]]
+
+    def written(
+        self,
+        credentials: dict | CredentialsGroup | None,
+        name: str,
+        resource_id: str | None,
+        value: Model | None = None,
+    ) -> None:
+        """Drop all entries of a resource after a write, and cache its new state.
+
+        :param credentials: Session credentials as passed to the API function, or a group.
+        :param name:        Registered name of the model.
+        :param resource_id: Identifier of the written resource.
+        :param value:       Complete model instance returned by the write, if any.
+                            Partial responses must not be passed.
+        """
+        if not self.enabled or resource_id is None:
+            return
+        key = self.key(credentials, name, resource_id)
+        if key is None:
+            return
+        resource = key[:3]
+        with self._lock:
+            self._writes += 1
+            self._written[resource] = self._writes
+            self._written.move_to_end(resource)
+            while len(self._written) > self.maxsize:
+                _, self._written_floor = self._written.popitem(last=False)
+            for stale in self._keys.pop(resource, ()):
+                del self._entries[stale]
+            if value is not None:
+                self._store(key, value)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            # reads in flight must not be stored
+            self._writes += 1
+            self._written.clear()
+            self._written_floor = self._writes
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return the counters and the current number of entries."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+            }
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent identical async calls into one.
+
+    The first caller of a key starts the call as a task, later callers with the same key
+    wait for that task while it is in flight. Its result or exception is handed to all of them.
+    A cancelled waiter, or one whose deadline passed, does not cancel the shared task.
+    In-flight calls are tracked per event loop.
+    """
+
+    def __init__(self):
+        self._flights: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[Hashable, asyncio.Task]
+        ] = weakref.WeakKeyDictionary()
+
+    def in_flight(self) -> int:
+        """Return the number of calls in flight on the running event loop."""
+        return len(self._flights.get(asyncio.get_running_loop(), {}))
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[_T]],
+        deadline: Deadline | None = None,
+    ) -> _T:
+        """Await the call in flight for key, or start it with func.
+
+        :param key:      Identifies identical calls.
+        :param func:     Starts the call, only used if no call with key is in flight.
+        :param deadline: Deadline of this waiter, if any.
+        :raises DeadlineExceededException: When the deadline passed before the call finished.
+        :return:         The result of the shared call.
+        """
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceededException(
+                f"Deadline exceeded by {-deadline.remaining():.3f}s before {key}"
+            )
+        loop = asyncio.get_running_loop()
+        flights = self._flights.setdefault(loop, {})
+        task = flights.get(key)
+        if task is None:
+            task = loop.create_task(func())
+            flights[key] = task
+
+            def done(finished: asyncio.Task) -> None:
+                if flights.get(key) is finished:
+                    del flights[key]
+                if not finished.cancelled():
+                    # mark the exception as retrieved if all waiters are gone
+                    finished.exception()
+
+            task.add_done_callback(done)
+        return await wait_for_deadline(asyncio.shield(task), deadline, "coalesced read")
+
+
+# Singleton instances used by the API functions
+read_flights = AsyncSingleFlight()
+read_cache = ReadCache(
+    maxsize=client_pool.settings.read_cache_size,
+    ttl=client_pool.settings.read_cache_ttl,
+    ttls=client_pool.settings.read_cache_ttls,
+)
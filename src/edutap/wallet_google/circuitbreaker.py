@@ -0,0 +1,145 @@
+"""Circuit breakers shedding load from failing Google Wallet API endpoints.
+
+During an outage of an endpoint, every request waits for its full timeout,
+tying up connections and tasks. A `CircuitBreaker` opens after a number of
+consecutive failures (5xx responses or failed connections) and fails the
+requests fast with `CircuitOpenException` then. After a cool-down, one probe
+request is let through: if it succeeds the breaker closes again, otherwise it
+stays open for another cool-down.
+
+The pooled clients of `ClientPoolManager` have a breaker per set of credentials,
+model URL part (e.g. ``genericObject``) and operation (e.g. ``read``).
+Circuit breaking is disabled by default, see the
+``EDUTAP_WALLET_GOOGLE_CIRCUIT_BREAKER_*`` settings, and
+`ClientPoolManager.circuit_breaker_states` reports the states for health checks.
+"""
+
+from .exceptions import CircuitOpenException
+
+import threading
+import time
+import typing
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Circuit breaker of one endpoint, shared safely by threads and event loops."""
+
+    def __init__(self, name: str, threshold: int, cooldown: float):
+        """
+        :param name:      Name of the endpoint, for error messages.
+        :param threshold: Number of consecutive failures opening the breaker.
+        :param cooldown:  Seconds to fail fast before letting a probe request through.
+        """
+        if threshold < 1:
+            raise ValueError(f"threshold must be >= 1, got {threshold}")
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._state = CLOSED
+        self._opened = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """One of "closed", "open" and "half-open"."""
+        return self._state
+
+    def before_request(self) -> None:
+        """Check if a request may be sent, call before sending it.
+
+        :raises CircuitOpenException: When the breaker is open, or a probe request
+                                      is in progress.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN:
+                if (retry_in := self._opened + self.cooldown - time.monotonic()) > 0:
+                    raise CircuitOpenException(
+                        f"Circuit breaker of {self.name} is open after "
+                        f"{self.failures} failures, retry in {retry_in:.1f}s"
+                    )
+                self._state = HALF_OPEN
+                return
+            raise CircuitOpenException(
+                f"Circuit breaker of {self.name} is waiting for a probe request"
+            )
+
+    def record_success(self) -> None:
+        """Record a request that got a response, which closes the breaker."""
+        with self._lock:
+            self.failures = 0
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        """Record a failed request, which opens the breaker after too many of them."""
+        with self._lock:
+            self.failures += 1
+            if self._state == OPEN:
+                # sent before the breaker opened, the cool-down goes on
+                return
+            if self._state == HALF_OPEN or self.failures >= self.threshold:
+                self._state = OPEN
+                self._opened = time.monotonic()
+
+    def release(self) -> None:
+        """Record a request that was aborted, like by cancellation, without an outcome.
+
+        An aborted probe request lets the next request probe.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = OPEN
+
+    def stats(self) -> dict[str, typing.Any]:
+        """Return the current state, for health checks."""
+        with self._lock:
+            retry_in = 0.0
+            if self._state == OPEN:
+                retry_in = max(0.0, self._opened + self.cooldown - time.monotonic())
+            return {
+                "state": self._state,
+                "failures": self.failures,
+                "retry_in": retry_in,
+            }
+
+
+class CircuitBreakers:
+    """The circuit breakers of one set of credentials, by URL part and operation."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        """
+        :param threshold: Number of consecutive failures opening a breaker.
+        :param cooldown:  Seconds an open breaker fails fast before letting a probe request through.
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url_part: str, operation: str) -> CircuitBreaker:
+        """Get or create the breaker of an endpoint."""
+        key = (url_part, operation)
+        if (breaker := self._breakers.get(key)) is not None:
+            return breaker
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(
+                    f"{operation} {url_part}", self.threshold, self.cooldown
+                )
+            return self._breakers[key]
+
+    def states(self) -> list[dict[str, typing.Any]]:
+        """Return the states of the breakers used so far."""
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return [
+            {"url_part": url_part, "operation": operation, **breaker.stats()}
+            for (url_part, operation), breaker in breakers
+        ]
@@ -0,0 +1,177 @@
+"""Bounded cache of the pooled clients.
+
+Serving many sets of credentials, e.g. one per institution, the pool would grow
+without limit and keep the connections of clients used once open forever.
+A `ClientCache` keeps at most ``max_size`` clients and evicts the least
+recently used one beyond that, and clients not used for ``idle_timeout``
+seconds.
+
+Callers keep using the client they got, e.g. for all pages of a listing, so
+an evicted client is not closed while it is referenced. Its connections are
+closed once it is garbage collected. A client is created under a lock of its
+key only, concurrent first calls for the same key share it and calls for other
+keys don't wait.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+
+import threading
+import time
+import typing
+import weakref
+
+
+_C = typing.TypeVar("_C")
+
+
+class _Entry(typing.Generic[_C]):
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client: _C, last_used: float):
+        self.client = client
+        self.last_used = last_used
+
+
+class ClientCache(typing.Generic[_C]):
+    """LRU cache of clients, evicting idle ones, shared safely by threads."""
+
+    def __init__(
+        self,
+        max_size: int,
+        idle_timeout: float | None,
+        release: Callable[[_C], Callable[[], None]],
+    ):
+        """
+        :param max_size:     Maximum number of clients, 0 for no limit.
+        :param idle_timeout: Seconds after its last use a client is evicted, None to keep it.
+        :param release:      Function returning the function closing the connections of
+                             an evicted client, called once the client is garbage collected.
+                             The returned function must not reference the client.
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._release = release
+        self._entries: OrderedDict[Hashable, _Entry[_C]] = OrderedDict()
+        # evicted clients still referenced
+        self._retired: weakref.WeakKeyDictionary[_C, weakref.finalize] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.idle_evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def peek(self, key: Hashable) -> _C | None:
+        """Return the client of a key without marking it used."""
+        entry = self._entries.get(key)
+        return entry.client if entry is not None else None
+
+    def clients(self) -> list[_C]:
+        """Return the cached clients."""
+        with self._lock:
+            return [entry.client for entry in self._entries.values()]
+
+    def _lookup(self, key: Hashable, now: float) -> _C | None:
+        """Return the client of a key and mark it used. Must be called with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.last_used = now
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.client
+
+    def get_or_create(self, key: Hashable, create: Callable[[], _C]) -> _C:
+        """Return the client of a key, create it if it is not cached.
+
+        :param key:    Key of the client.
+        :param create: Function creating the client.
+        :return:       The client.
+        """
+        now = time.monotonic()
+        with self._lock:
+            client = self._lookup(key, now)
+            sweep = now >= self._next_sweep
+        if sweep:
+            self.sweep()
+        if client is not None:
+            return client
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                # created by a concurrent call meanwhile
+                if (client := self._lookup(key, now)) is not None:
+                    return client
+            client = create()
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = _Entry(client, time.monotonic())
+                while self.max_size and len(self._entries) > self.max_size:
+                    evicted_key, evicted = self._entries.popitem(last=False)
+                    self._retire(evicted_key, evicted.client)
+                    self.evictions += 1
+        return client
+
+    def _retire(self, key: Hashable, client: _C) -> None:
+        """Release an evicted client once it is garbage collected. Must be called with the lock held."""
+        finalizer = weakref.finalize(client, self._release(client))
+        # at exit the pool closes its clients, or their connections are gone anyway
+        finalizer.atexit = False
+        self._retired[client] = finalizer
+        self._key_locks.pop(key, None)
+
+    def sweep(self) -> None:
+        """Evict the idle clients."""
+        now = time.monotonic()
+        with self._lock:
+            if self.idle_timeout is not None:
+                self._next_sweep = now + min(self.idle_timeout, 1.0)
+                while self._entries:
+                    key, entry = next(iter(self._entries.items()))
+                    if now - entry.last_used < self.idle_timeout:
+                        break
+                    del self._entries[key]
+                    self._retire(key, entry.client)
+                    self.idle_evictions += 1
+            else:
+                self._next_sweep = float("inf")
+
+    def clear(self) -> list[_C]:
+        """Remove all clients, also the evicted ones still referenced.
+
+        :return: The removed clients, to be closed by the caller.
+        """
+        with self._lock:
+            clients = [entry.client for entry in self._entries.values()]
+            for client, finalizer in list(self._retired.items()):
+                finalizer.detach()
+                clients.append(client)
+            self._entries.clear()
+            self._retired.clear()
+            self._key_locks.clear()
+        return clients
+
+    def stats(self) -> dict[str, int]:
+        """Return the size and the counters, for monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "idle_evictions": self.idle_evictions,
+                "retired": len(self._retired),
+            }
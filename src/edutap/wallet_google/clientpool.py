@@ -1,44 +1,165 @@
+from .circuitbreaker import CircuitBreakers
+from .clientcache import ClientCache
 from .credentials import credentials_manager
+from .credentialsgroup import credentials_key
+from .credentialsgroup import CredentialsGroup
+from .protocols import TokenStore
+from .ratelimit import RateLimiter
 from .registry import lookup_metadata_by_name
 from .settings import Settings
+from .tokenstore import AsyncStoredTokenAssertionClient
+from .tokenstore import FileTokenStore
+from .tokenstore import MemoryTokenStore
+from .tokenstore import StoredTokenAssertionClient
+from .transports import AsyncPoolTransport
+from .transports import PoolTransport
 from authlib.integrations.httpx_client import AssertionClient
 from authlib.integrations.httpx_client import AsyncAssertionClient
+from collections.abc import Callable
+from collections.abc import Iterable
+from pathlib import Path
 
+import asyncio
 import atexit
+import httpx
+import logging
+import os
+import tempfile
 import threading
+import weakref
+
+
+logger = logging.getLogger(__name__)
+
+
+def _default_token_directory() -> Path:
+    """Return the directory of the file token store if the settings name none.
+
+    The runtime directory of the user if there is one, private to the user and
+    cleaned up at logout, otherwise one per user in the temporary directory.
+    """
+    if runtime := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(runtime, "edutap-wallet-google-tokens")
+    return Path(tempfile.gettempdir(), f"edutap-wallet-google-tokens-{os.getuid()}")
 
 
 class ClientPoolManager:
     """Manages HTTP client pool for the Google Wallet API.
 
     Maintains persistent, pooled clients for efficient connection reuse:
-    - client() returns cached AssertionClient (sync) - one per credentials set
-    - async_client() returns cached AsyncAssertionClient (async) - one per credentials set
+    - client() returns cached AssertionClient (sync) - one per credentials set,
+      shared by all threads
+    - async_client() returns cached AsyncAssertionClient (async) - one per credentials
+      set and event loop, shared by the tasks of the loop
 
     Clients are reused across multiple API calls for optimal connection pooling.
     All API functions in api.py reuse these persistent clients automatically.
 
+    Serving many credentials sets, the clients are bounded: beyond
+    ``client_pool_max_clients`` the least recently used client is evicted, and
+    clients unused for ``client_pool_idle_timeout`` seconds are, see the settings.
+    Evicted clients are not closed while they are referenced, by a listing in
+    progress for example, their connections are closed once they are garbage
+    collected and their requests finished. See pool_stats() for the size and
+    the evictions.
+
+    Async clients are bound to the event loop they were created on, as their
+    connections are. Each loop of the process, like the loops of threads running
+    their own ones, gets its own clients. The clients of a closed loop are
+    dropped on the next call of async_client(), aclose_loop_clients() closes the
+    ones of the running loop before it ends.
+
+    If a rate limit is configured in the settings, requests wait for it in the
+    transport of the clients. Sync and async clients of the same credentials
+    share one limiter, see rate_limit_tokens() for the current levels.
+    Likewise, if circuit breaking is configured, requests to an endpoint failing
+    repeatedly fail fast, see circuit_breaker_states() for health checks.
+
+    Credentials may be a CredentialsGroup of several service accounts of one
+    issuer, select_credentials() picks the account of each request then.
+
+    Connection limits, keep-alive, timeouts and HTTP/2 of the async clients are
+    configured in the settings too.
+
+    Clients fetch their OAuth access token on their first request and again after
+    it expired, which delays these requests. warmup() and awarmup() fetch the
+    tokens at application startup, start_token_refresher() and
+    start_async_token_refresher() renew them in the background before they expire.
+    The sync and async clients of the same credentials share their token through
+    the token_store, which may be shared between processes too.
+
     Call close_all_clients() or aclose_all_clients() at application shutdown.
     """
 
     def __init__(self):
         self.settings = Settings()
-        self._sync_clients = {}  # {credentials_key: AssertionClient}
-        self._async_clients = {}  # {credentials_key: AsyncAssertionClient}
-        self._lock = threading.Lock()  # Thread-safe client creation
+        self._sync_clients: ClientCache[AssertionClient] = ClientCache(
+            0, None, release=_release
+        )
+        # {event_loop: ClientCache of AsyncAssertionClient}
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, ClientCache[AsyncAssertionClient]
+        ] = weakref.WeakKeyDictionary()
+        self._closing: set[asyncio.Task] = set()  # closing evicted async clients
+        self._limiters = {}  # {credentials_key: RateLimiter}
+        self._breakers = {}  # {credentials_key: CircuitBreakers}
+        self._lock = threading.Lock()  # Thread-safe shared state
+        self._refresher: threading.Thread | None = None
+        self._refresher_stop = threading.Event()
+        self._async_refreshers: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Task
+        ] = weakref.WeakKeyDictionary()
+        self._token_store: TokenStore | None = None
         # Register cleanup handler to close sync clients on process exit
         atexit.register(self.close_all_clients)
 
-    def _get_credentials(self, credentials: dict | None) -> dict:
-        """Get credentials from parameter or load from file.
+    def _get_credentials(self, credentials: dict | CredentialsGroup | None) -> dict:
+        """Get credentials from parameter, select them from a group, or load from file.
 
-        :param credentials: Optional credentials dict.
+        :param credentials: Optional credentials dict or group.
         :return:            Credentials dict.
         """
+        if isinstance(credentials, CredentialsGroup):
+            return self.select_credentials(credentials)
         if not credentials:
             credentials = credentials_manager.credentials_from_file()
         return credentials
 
+    def select_credentials(
+        self, group: CredentialsGroup, affinity: str | None = None
+    ) -> dict:
+        """Select the service account of a group for the next request.
+
+        The load of the accounts is the number of requests in flight of their
+        pooled clients, for the "quota-aware" strategy the tokens left of their
+        rate limiters if rate limiting is configured.
+
+        :param group:    The credentials group.
+        :param affinity: Id of the object of the request, see `CredentialsGroup.select`.
+        :return:         Credentials dict of the account.
+        """
+        load = self._in_flight
+        if group.strategy == "quota-aware":
+            load = self._quota_load
+        return group.select(affinity, load)
+
+    def _in_flight(self, key: str) -> float:
+        """Return the number of requests in flight of the pooled clients of a credentials key."""
+        with self._lock:
+            caches = [self._sync_clients, *self._async_clients.values()]
+        return sum(
+            _in_flight(client)
+            for cache in caches
+            if (client := cache.peek(key)) is not None
+        )
+
+    def _quota_load(self, key: str) -> float:
+        """Return the negative rate limit tokens left of a credentials key, or its requests in flight."""
+        limiter = self._limiters.get(key)
+        if limiter is None or not (levels := limiter.tokens()):
+            return self._in_flight(key)
+        return -min(levels.values())
+
     def _get_credentials_key(self, credentials: dict) -> str:
         """Create a hashable key from credentials for client caching.
 
@@ -48,7 +169,31 @@ class ClientPoolManager:
         :param credentials: Credentials dict.
         :return:            String key for caching.
         """
-        return f"{credentials['client_email']}:{credentials['private_key_id']}"
+        return credentials_key(credentials)
+
+    @property
+    def token_store(self) -> TokenStore:
+        """The store of the access tokens, created from the settings on first use.
+
+        Assign another store before the first client is created.
+        """
+        if self._token_store is None:
+            if self.settings.token_store == "file":
+                directory = (
+                    self.settings.token_store_directory or _default_token_directory()
+                )
+                self._token_store = FileTokenStore(directory)
+            else:
+                self._token_store = MemoryTokenStore()
+        return self._token_store
+
+    @token_store.setter
+    def token_store(self, store: TokenStore) -> None:
+        self._token_store = store
+
+    def _token_key(self, key: str) -> str:
+        """Create the key of the access token of a credentials key."""
+        return f"{key}:{' '.join(self.settings.credentials_scopes)}"
 
     def _build_client_config(self, credentials: dict) -> dict:
         """Build common client configuration for both sync and async clients.
@@ -68,9 +213,95 @@ class ClientPoolManager:
             "key": credentials["private_key"],
             "key_id": credentials["private_key_id"],
             "header": {"alg": "RS256", "typ": "JWT"},
+            "timeout": httpx.Timeout(
+                connect=self.settings.http_timeout_connect,
+                read=self.settings.http_timeout_read,
+                write=self.settings.http_timeout_write,
+                pool=self.settings.http_timeout_pool,
+            ),
         }
 
-    def client(self, credentials: dict | None = None) -> AssertionClient:
+    def _build_limits(self) -> httpx.Limits:
+        """Build the connection pool limits of the clients.
+
+        The limits are passed to the transports, as the clients ignore them
+        when a transport is given.
+        """
+        return httpx.Limits(
+            max_connections=self.settings.http_max_connections,
+            max_keepalive_connections=self.settings.http_max_keepalive_connections,
+            keepalive_expiry=self.settings.http_keepalive_expiry,
+        )
+
+    def _get_limiter(self, key: str) -> RateLimiter | None:
+        """Get or create the rate limiter of a credentials key, if rate limiting is configured.
+
+        Must be called with the lock held.
+        """
+        if key not in self._limiters:
+            limiter = RateLimiter(
+                rate=self.settings.rate_limit_rps,
+                burst=self.settings.rate_limit_burst,
+                operation_rates=self.settings.rate_limit_operations,
+            )
+            self._limiters[key] = limiter if limiter.enabled else None
+        return self._limiters[key]
+
+    def _get_breakers(self, key: str) -> CircuitBreakers | None:
+        """Get or create the circuit breakers of a credentials key, if circuit breaking is configured.
+
+        Must be called with the lock held.
+        """
+        if self.settings.circuit_breaker_threshold < 1:
+            return None
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreakers(
+                threshold=self.settings.circuit_breaker_threshold,
+                cooldown=self.settings.circuit_breaker_cooldown,
+            )
+        return self._breakers[key]
+
+    def _transport_config(self, key: str) -> dict:
+        """Build the configuration shared by the sync and async pool transports."""
+        return {
+            "limiter": self._get_limiter(key),
+            "breakers": self._get_breakers(key),
+            "api_url": str(self.settings.api_url),
+            "batch_url": str(self.settings.batch_url),
+        }
+
+    def rate_limit_tokens(self) -> dict[str, dict[str, float]]:
+        """Return the current token levels of the rate limiters, for monitoring.
+
+        :return: Token levels by credentials key, overall as "*" and by operation.
+                 Negative levels are requests waiting for their turn.
+        """
+        with self._lock:
+            return {
+                key: limiter.tokens()
+                for key, limiter in self._limiters.items()
+                if limiter is not None
+            }
+
+    def circuit_breaker_states(self) -> list[dict]:
+        """Return the states of the circuit breakers, for health checks.
+
+        :return: A dict per endpoint used so far, with the keys "credentials",
+                 "url_part", "operation", "state" ("closed", "open" or "half-open"),
+                 "failures" (consecutive failures) and "retry_in" (seconds until
+                 an open breaker lets a probe request through).
+        """
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return [
+            {"credentials": key, **state}
+            for key, key_breakers in breakers
+            for state in key_breakers.states()
+        ]
+
+    def client(
+        self, credentials: dict | CredentialsGroup | None = None
+    ) -> AssertionClient:
         """Get or create a persistent sync HTTP client from the pool.
 
         Returns a cached AssertionClient for the given credentials. The same client
@@ -78,46 +309,305 @@ class ClientPoolManager:
 
         The client is thread-safe and can be shared across threads.
 
-        :param credentials: Client credentials as dict. If not given, credentials
+        :param credentials: Client credentials as dict, or a `CredentialsGroup` to
+                            select them from. If not given, credentials
                             are read from file defined in settings.
         :return:            The assertion client (httpx-based, persistent).
         """
         credentials = self._get_credentials(credentials)
         key = self._get_credentials_key(credentials)
-        if client := self._sync_clients.get(key, None):
-            return client
+        return self._bounded(self._sync_clients).get_or_create(
+            key, lambda: self._create_client(credentials, key)
+        )
 
-        # Thread-safe client creation (only create once per credentials)
+    def _create_client(self, credentials: dict, key: str) -> AssertionClient:
+        config = self._build_client_config(credentials)
         with self._lock:
-            config = self._build_client_config(credentials)
-            client = AssertionClient(**config)
-            self._sync_clients[key] = client
-        return client
-
-    def async_client(self, credentials: dict | None = None) -> AsyncAssertionClient:
+            transport_config = self._transport_config(key)
+            token_store = self.token_store
+        transport = PoolTransport(
+            httpx.HTTPTransport(limits=self._build_limits()), **transport_config
+        )
+        return StoredTokenAssertionClient(
+            **config,
+            transport=transport,
+            token_store=token_store,
+            token_key=self._token_key(key),
+        )
+
+    def async_client(
+        self, credentials: dict | CredentialsGroup | None = None
+    ) -> AsyncAssertionClient:
         """Get or create a persistent async HTTP client from the pool.
 
-        Returns a cached AsyncAssertionClient for the given credentials. The same client
-        instance is reused across multiple API calls for optimal connection pooling.
+        Returns a cached AsyncAssertionClient for the given credentials and the running
+        event loop. The same client instance is reused across multiple API calls on the
+        loop for optimal connection pooling.
 
-        The client is task-safe and can be shared across async tasks (within same event loop).
+        The client is task-safe and can be shared across the async tasks of the loop.
 
-        :param credentials: Client credentials as dict. If not given, credentials
+        :param credentials: Client credentials as dict, or a `CredentialsGroup` to
+                            select them from. If not given, credentials
                             are read from file defined in settings.
+        :raises RuntimeError: When no event loop is running.
         :return:            The async assertion client (persistent).
         """
         credentials = self._get_credentials(credentials)
         key = self._get_credentials_key(credentials)
-        if client := self._async_clients.get(key, None):
-            return client
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.get(loop)
+        if clients is None:
+            with self._lock:
+                self._drop_closed_loops()
+                clients = self._async_clients.get(loop)
+                if clients is None:
+                    # a weak reference, the cache must not keep its loop alive
+                    loop_ref = weakref.ref(loop)
+
+                    def release(client: AsyncAssertionClient) -> Callable[[], None]:
+                        transport = client._transport
+                        return lambda: transport.when_idle(
+                            lambda: self._aclose_later(loop_ref(), transport)
+                        )
+
+                    clients = self._async_clients[loop] = ClientCache(
+                        0, None, release=release
+                    )
+        return self._bounded(clients).get_or_create(
+            key, lambda: self._create_async_client(credentials, key)
+        )
+
+    def _create_async_client(self, credentials: dict, key: str) -> AsyncAssertionClient:
+        config = self._build_client_config(credentials)
+        with self._lock:
+            transport_config = self._transport_config(key)
+            token_store = self.token_store
+        transport = AsyncPoolTransport(
+            httpx.AsyncHTTPTransport(
+                limits=self._build_limits(), http2=self.settings.http2
+            ),
+            **transport_config,
+        )
+        # Note: AsyncAssertionClient doesn't support client_cls parameter for custom clients
+        return AsyncStoredTokenAssertionClient(
+            **config,
+            transport=transport,
+            token_store=token_store,
+            token_key=self._token_key(key),
+        )
+
+    def _bounded(self, cache: ClientCache) -> ClientCache:
+        """Apply the bounds of the settings to a client cache."""
+        cache.max_size = self.settings.client_pool_max_clients
+        cache.idle_timeout = self.settings.client_pool_idle_timeout
+        return cache
+
+    def _aclose_later(
+        self,
+        loop: asyncio.AbstractEventLoop | None,
+        transport: httpx.AsyncBaseTransport,
+    ) -> None:
+        """Close the transport of an evicted async client on its event loop, without waiting for it."""
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            task = loop.create_task(transport.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(transport.aclose(), loop)
+
+    def _drop_closed_loops(self) -> None:
+        """Drop the async clients of closed event loops.
+
+        They cannot be closed anymore, their connections are closed when they are
+        garbage collected. Must be called with the lock held.
+        """
+        for loop in [loop for loop in self._async_clients if loop.is_closed()]:
+            del self._async_clients[loop]
 
-        # Thread-safe client creation (only create once per credentials)
+    def _loop_clients(
+        self, loop: asyncio.AbstractEventLoop
+    ) -> list[AsyncAssertionClient]:
+        """Return the async clients of an event loop, after evicting the idle ones."""
+        with self._lock:
+            clients = self._async_clients.get(loop)
+        if clients is None:
+            return []
+        clients.sweep()
+        return clients.clients()
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        """Return the sizes and evictions of the client pool, for monitoring.
+
+        :return: Dicts of the "sync" clients and the "async" clients of all event
+                 loops, with the keys "size" (cached clients), "hits", "misses"
+                 (clients created), "evictions" (least recently used clients
+                 evicted beyond the limit), "idle_evictions" and "retired"
+                 (evicted clients still referenced).
+                 The async dict has the number of "loops" too.
+        """
+        with self._lock:
+            caches = list(self._async_clients.values())
+        async_stats = {"loops": len(caches)}
+        for cache in caches:
+            for name, value in cache.stats().items():
+                async_stats[name] = async_stats.get(name, 0) + value
+        for name in (
+            "size",
+            "hits",
+            "misses",
+            "evictions",
+            "idle_evictions",
+            "retired",
+        ):
+            async_stats.setdefault(name, 0)
+        return {"sync": self._sync_clients.stats(), "async": async_stats}
+
+    def _token_due(self, client: AssertionClient | AsyncAssertionClient) -> bool:
+        """Check if the access token of a client is missing or expires within the refresh margin."""
+        token = client.token
+        return not token or bool(
+            token.is_expired(leeway=self.settings.token_refresh_margin)
+        )
+
+    def warmup(self, credentials: Iterable[dict] | None = None) -> int:
+        """Create the sync clients and fetch their access tokens eagerly.
+
+        Call at application startup, so the first API calls don't wait for a token.
+
+        :param credentials: Credentials dicts of the clients, defaults to the
+                            credentials file defined in settings.
+        :return:            Number of tokens fetched, tokens still valid are kept.
+        """
+        fetched = 0
+        for item in [None] if credentials is None else credentials:
+            client = self.client(item)
+            if self._token_due(client):
+                client.refresh_token()
+                fetched += 1
+        return fetched
+
+    async def awarmup(self, credentials: Iterable[dict] | None = None) -> int:
+        """Create the async clients and fetch their access tokens eagerly and concurrently.
+
+        :param credentials: Credentials dicts of the clients, defaults to the
+                            credentials file defined in settings.
+        :return:            Number of tokens fetched, tokens still valid are kept.
+        """
+        clients = [
+            self.async_client(item)
+            for item in ([None] if credentials is None else credentials)
+        ]
+        due = [client for client in clients if self._token_due(client)]
+        await asyncio.gather(*(client.refresh_token() for client in due))
+        return len(due)
+
+    def refresh_due_tokens(self) -> int:
+        """Renew the access tokens of the sync clients expiring within the refresh margin.
+
+        :return: Number of tokens renewed. Failures are logged, the clients fetch
+                 their token on their next request then.
+        """
+        self._sync_clients.sweep()
+        clients = self._sync_clients.clients()
+        renewed = 0
+        for client in clients:
+            if not self._token_due(client):
+                continue
+            try:
+                client.refresh_token(leeway=self.settings.token_refresh_margin)
+                renewed += 1
+            except Exception:
+                logger.exception(f"Renewing the access token of {client.issuer} failed")
+        return renewed
+
+    async def arefresh_due_tokens(self) -> int:
+        """Renew the access tokens of the async clients of the running event loop
+        expiring within the refresh margin.
+
+        :return: Number of tokens renewed, see `refresh_due_tokens`.
+        """
+        due = [
+            client
+            for client in self._loop_clients(asyncio.get_running_loop())
+            if self._token_due(client)
+        ]
+        results = await asyncio.gather(
+            *(
+                client.refresh_token(leeway=self.settings.token_refresh_margin)
+                for client in due
+            ),
+            return_exceptions=True,
+        )
+        for client, result in zip(due, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Renewing the access token of {client.issuer} failed: {result!r}"
+                )
+        return sum(not isinstance(result, Exception) for result in results)
+
+    def start_token_refresher(self) -> None:
+        """Start a daemon thread renewing the access tokens of the sync clients before they expire.
+
+        Every ``token_refresh_interval`` seconds, tokens expiring within
+        ``token_refresh_margin`` seconds are renewed, see the settings.
+        Does nothing if the refresher is running already.
+        """
         with self._lock:
-            config = self._build_client_config(credentials)
-            # Note: AsyncAssertionClient doesn't support client_cls parameter for custom clients
-            client = AsyncAssertionClient(**config)
-            self._async_clients[key] = client
-        return client
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher_stop = threading.Event()
+            self._refresher = threading.Thread(
+                target=self._run_token_refresher,
+                args=(self._refresher_stop,),
+                name="wallet-google-token-refresher",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def _run_token_refresher(self, stop: threading.Event) -> None:
+        while not stop.wait(self.settings.token_refresh_interval):
+            self.refresh_due_tokens()
+
+    def stop_token_refresher(self) -> None:
+        """Stop the thread started by `start_token_refresher`, if any."""
+        self._refresher_stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def start_async_token_refresher(self) -> asyncio.Task:
+        """Start a task renewing the access tokens of the async clients of the running
+        event loop before they expire.
+
+        See `start_token_refresher` for the schedule.
+
+        :return: The task, already running one of the loop is returned as is.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._async_refreshers.get(loop)
+        if task is None or task.done():
+            task = self._async_refreshers[loop] = loop.create_task(
+                self._arun_token_refresher()
+            )
+        return task
+
+    async def _arun_token_refresher(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.token_refresh_interval)
+            await self.arefresh_due_tokens()
+
+    async def astop_token_refresher(self) -> None:
+        """Stop the task started by `start_async_token_refresher` on the running event loop, if any."""
+        task = self._async_refreshers.pop(asyncio.get_running_loop(), None)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
     def close_all_clients(self):
         """Close all cached sync clients.
@@ -127,11 +617,25 @@ class ClientPoolManager:
 
         This method is synchronous and closes only sync clients.
         For async clients, use aclose_all_clients().
+        The token refresher thread is stopped.
         """
+        self.stop_token_refresher()
+        for client in self._sync_clients.clear():
+            client.close()
+
+    async def aclose_loop_clients(self):
+        """Close the cached async clients of the running event loop.
+
+        Call this method before an event loop ends, which is not the last one
+        using the pool, like the loop of a thread. The token refresher task of
+        the loop is stopped.
+        """
+        await self.astop_token_refresher()
+        loop = asyncio.get_running_loop()
         with self._lock:
-            for client in self._sync_clients.values():
-                client.close()
-            self._sync_clients.clear()
+            clients = self._async_clients.pop(loop, None)
+        for client in clients.clear() if clients is not None else []:
+            await client.aclose()
 
     async def aclose_all_clients(self):
         """Close all cached async clients.
@@ -141,11 +645,23 @@ class ClientPoolManager:
 
         This method must be called from an async context.
         For sync clients, use close_all_clients().
+        The clients of the running event loop are closed, the ones of other
+        running loops are closed on their loops without waiting for them.
+        The token refresher tasks are stopped.
         """
-        # Don't need lock here since we're in async context
-        for client in list(self._async_clients.values()):
-            await client.aclose()
-        self._async_clients.clear()
+        await self.aclose_loop_clients()
+        with self._lock:
+            other_loops = list(self._async_clients.items())
+            self._async_clients.clear()
+            refreshers = list(self._async_refreshers.items())
+            self._async_refreshers.clear()
+        for loop, task in refreshers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+        for loop, clients in other_loops:
+            if loop.is_running():
+                for client in clients.clear():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
 
     def url(self, name: str, additional_path: str = "") -> str:
         """
@@ -162,5 +678,16 @@ class ClientPoolManager:
         return f"{self.settings.api_url}/{model_metadata['url_part']}{additional_path}"
 
 
+def _release(client: AssertionClient) -> Callable[[], None]:
+    """Return the function closing the connections of an evicted sync client."""
+    transport = client._transport
+    return lambda: transport.when_idle(transport.close)
+
+
+def _in_flight(client: AssertionClient | AsyncAssertionClient) -> int:
+    """Return the number of requests in flight of a pooled client."""
+    return getattr(client._transport, "in_flight", 0)
+
+
 # Singleton instance for both sync and async operations
 client_pool = ClientPoolManager()
@@ -0,0 +1,170 @@
+"""Adaptive concurrency for bulk and fan-out async workloads.
+
+A fixed concurrency is either too slow or runs into quota errors, depending on
+the time of day and on the quota of the issuer. `AdaptiveConcurrencyLimiter`
+adjusts the number of requests in flight with AIMD (additive increase,
+multiplicative decrease): it grows by one request per round of successful
+requests, and is cut by a factor on a sign of overload, which is a quota error,
+a 429 or 5xx response, a timeout, or a latency spike.
+
+Pass it as ``concurrency`` to the async bulk helpers, like `api.acreate_many`,
+or to `api.alisting_many`. One limiter may be shared by several calls.
+"""
+
+from .exceptions import QuotaExceededException
+from .exceptions import WalletException
+from collections.abc import AsyncIterator
+
+import asyncio
+import contextlib
+import httpx
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload(error: BaseException) -> bool:
+    """Check if an exception is a sign of overloading the API."""
+    if isinstance(error, QuotaExceededException | httpx.TimeoutException):
+        return True
+    if isinstance(error, WalletException) and error.status_code is not None:
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the requests in flight, adjusting the limit with AIMD.
+
+    Latency is healthy up to ``latency_tolerance`` times its moving average.
+    The limit is cut at most once per round: requests started before a cut
+    don't cut it again, as they were sent with the old limit.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        """
+        :param initial:           Initial limit of requests in flight.
+        :param min_limit:         The limit is never cut below this.
+        :param max_limit:         The limit never grows above this.
+        :param increase:          Requests added to the limit per round of successful requests.
+        :param decrease:          Factor to cut the limit with on overload, between 0 and 1.
+        :param latency_tolerance: Latencies above this times the average latency are spikes.
+        """
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError(
+                f"limits must satisfy 1 <= min_limit <= initial <= max_limit, "
+                f"got {min_limit}, {initial}, {max_limit}"
+            )
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be between 0 and 1, got {decrease}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._latency: float | None = None
+        # number of cuts, to tell requests started before the last cut
+        self._epoch = 0
+        self._changed: asyncio.Condition | None = None
+
+    @property
+    def limit(self) -> int:
+        """The current limit of requests in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests in flight."""
+        return self._in_flight
+
+    def stats(self) -> dict[str, float | int | None]:
+        """Return the current state, for monitoring and tuning."""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "latency": self._latency,
+            "decreases": self._epoch,
+        }
+
+    def _condition(self) -> asyncio.Condition:
+        # created lazily, to bind it to the running event loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    async def acquire(self) -> int:
+        """Wait for a free slot and take it.
+
+        :return: Token to pass to `release`.
+        """
+        changed = self._condition()
+        async with changed:
+            await changed.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self._epoch
+
+    async def release(
+        self, token: int, latency: float, error: BaseException | None = None
+    ) -> None:
+        """Give back a slot and adjust the limit by the outcome of its request.
+
+        :param token:   Token returned by `acquire`.
+        :param latency: Seconds the request took.
+        :param error:   Exception the request raised, if any.
+        """
+        changed = self._condition()
+        async with changed:
+            self._in_flight -= 1
+            if error is not None and is_overload(error):
+                self._decrease(token, type(error).__name__)
+            elif error is None:
+                self._record_latency(token, latency)
+            changed.notify_all()
+
+    def _record_latency(self, token: int, latency: float) -> None:
+        spike = (
+            self._latency is not None
+            and latency > self.latency_tolerance * self._latency
+        )
+        # spikes are averaged in too, so a lasting change of latency is accepted
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += 0.1 * (latency - self._latency)
+        if spike:
+            self._decrease(token, f"latency {latency:.3f}s")
+        else:
+            self._limit = min(
+                float(self.max_limit), self._limit + self.increase / self._limit
+            )
+
+    def _decrease(self, token: int, reason: str) -> None:
+        if token != self._epoch:
+            return
+        self._epoch += 1
+        self._limit = max(float(self.min_limit), self._limit * self.decrease)
+        logger.info(f"Concurrency limit cut to {self.limit} on {reason}")
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot while running a request, adjusting the limit by its outcome."""
+        token = await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            await self.release(token, time.monotonic() - started, e)
+            raise
+        await self.release(token, time.monotonic() - started)
@@ -1,7 +1,9 @@
 from .settings import Settings
+from joserfc.jwk import RSAKey
 
 import functools
 import json
+import threading
 
 
 class CredentialsManager:
@@ -9,8 +11,16 @@ class CredentialsManager:
 
     This class provides credential loading functionality without depending on
     google-auth or authlib. It simply reads and caches credentials from a file.
+
+    It also caches the parsed signing keys of the credentials, parsing a PEM
+    encoded RSA private key is the bulk of the cost of signing a save link.
     """
 
+    def __init__(self):
+        # {private_key_id: (PEM, parsed key)}
+        self._signing_keys: dict[str, tuple[str, RSAKey]] = {}
+        self._signing_keys_lock = threading.Lock()
+
     @property
     def settings(self) -> Settings:
         settings = getattr(self, "_settings", None)
@@ -31,6 +41,30 @@ class CredentialsManager:
         with credentials_file.open() as fd:
             return json.loads(fd.read())
 
+    def signing_key(self, credentials: dict) -> RSAKey:
+        """Return the parsed private key of credentials, cached by its key id.
+
+        A cached key is only used for the same PEM, a key id with another key,
+        e.g. after rotating the credentials in place, is parsed again.
+
+        :param credentials: Credentials dict with "private_key_id" and "private_key".
+        :return:            The RSA private key.
+        """
+        key_id = credentials["private_key_id"]
+        pem = credentials["private_key"]
+        cached = self._signing_keys.get(key_id)
+        if cached is not None and cached[0] == pem:
+            return cached[1]
+        key = RSAKey.import_key(pem)
+        with self._signing_keys_lock:
+            self._signing_keys[key_id] = (pem, key)
+        return key
+
+    def clear_signing_keys(self) -> None:
+        """Drop the cached signing keys."""
+        with self._signing_keys_lock:
+            self._signing_keys.clear()
+
 
 # Singleton instance
 credentials_manager = CredentialsManager()
@@ -0,0 +1,166 @@
+"""Groups of service accounts sharing the load of one issuer.
+
+The quota of a single service account limits the throughput of bulk issuance.
+Several service accounts authorised for the same issuer form a
+`CredentialsGroup`, passed as ``credentials`` to the API functions, which
+spread their requests over the accounts of the group:
+
+- ``"round-robin"`` takes the accounts in turn,
+- ``"least-loaded"`` takes the account with the fewest requests in flight,
+- ``"quota-aware"`` takes the account with the most rate limit tokens left,
+  see the ``EDUTAP_WALLET_GOOGLE_RATE_LIMIT_*`` settings, or the least loaded
+  one without rate limiting.
+
+Operations on one object, like creating and then updating it, stay on one
+account, chosen by rendezvous hashing of the object id, so they reach Google
+in order. An account getting a `QuotaExceededException` is drained: it gets no
+requests for ``drain_time`` seconds, and the call is repeated on another
+account. The objects of a drained account move to the others meanwhile.
+"""
+
+from collections.abc import Callable
+from collections.abc import Sequence
+
+import hashlib
+import itertools
+import threading
+import time
+import typing
+
+
+Strategy = typing.Literal["round-robin", "least-loaded", "quota-aware"]
+
+
+def credentials_key(credentials: dict) -> str:
+    """Return the key of a service account, see `ClientPoolManager._get_credentials_key`."""
+    return f"{credentials['client_email']}:{credentials['private_key_id']}"
+
+
+class CredentialsGroup:
+    """Service accounts of one issuer, shared safely by threads and event loops."""
+
+    def __init__(
+        self,
+        credentials: Sequence[dict],
+        *,
+        strategy: Strategy = "round-robin",
+        drain_time: float = 60.0,
+    ):
+        """
+        :param credentials: Credentials dicts of the service accounts.
+        :param strategy:    How to spread requests without an object id, see the module.
+        :param drain_time:  Seconds an account exceeding its quota gets no requests.
+        :raises ValueError: When no credentials or an unknown strategy is given.
+        """
+        if not credentials:
+            raise ValueError("A credentials group needs at least one service account")
+        if strategy not in typing.get_args(Strategy):
+            raise ValueError(f"Unknown strategy {strategy!r}")
+        self.members = list(credentials)
+        self.strategy = strategy
+        self.drain_time = drain_time
+        self._keys = [credentials_key(member) for member in self.members]
+        self._drained: dict[str, float] = {}  # {credentials_key: monotonic time}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, credentials: dict) -> bool:
+        return credentials_key(credentials) in self._keys
+
+    def __repr__(self) -> str:
+        return f"<CredentialsGroup of {len(self)} {self.strategy}>"
+
+    @property
+    def key(self) -> str:
+        """Key of the group, identifying its accounts."""
+        return "group:" + ",".join(sorted(self._keys))
+
+    def _available(self) -> list[int]:
+        """Return the indexes of the accounts not drained, all if all are drained."""
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, until in self._drained.items() if until <= now]:
+                del self._drained[key]
+            available = [
+                index
+                for index, key in enumerate(self._keys)
+                if key not in self._drained
+            ]
+            if not available:
+                # the account back first
+                key = min(self._drained, key=self._drained.__getitem__)
+                available = [self._keys.index(key)]
+        return available
+
+    def select(
+        self,
+        affinity: str | None = None,
+        load: Callable[[str], float] | None = None,
+    ) -> dict:
+        """Return the credentials of the account for the next request.
+
+        :param affinity: Id of the object of the request, requests of one object
+                         go to one account while it is not drained.
+        :param load:     Function returning the load of an account by its key,
+                         lower is preferred by the "least-loaded" and "quota-aware"
+                         strategies. Provided by the client pool.
+        :return:         Credentials dict of the account.
+        """
+        available = self._available()
+        if affinity:
+            index = max(
+                available,
+                key=lambda index: hashlib.sha256(
+                    f"{self._keys[index]}/{affinity}".encode()
+                ).digest(),
+            )
+        elif self.strategy == "round-robin" or load is None or len(available) == 1:
+            index = available[next(self._turn) % len(available)]
+        else:
+            # ties in turn, so equally loaded accounts share the requests
+            offset = next(self._turn)
+            index = min(
+                (
+                    available[(offset + i) % len(available)]
+                    for i in range(len(available))
+                ),
+                key=lambda index: load(self._keys[index]),
+            )
+        return self.members[index]
+
+    def drain(self, credentials: dict, duration: float | None = None) -> None:
+        """Give an account no requests for a while, e.g. after it exceeded its quota.
+
+        :param credentials: Credentials dict of the account.
+        :param duration:    Seconds, defaults to ``drain_time``.
+        """
+        until = time.monotonic() + (self.drain_time if duration is None else duration)
+        with self._lock:
+            self._drained[credentials_key(credentials)] = until
+
+    def restore(self, credentials: dict) -> None:
+        """Give a drained account requests again."""
+        with self._lock:
+            self._drained.pop(credentials_key(credentials), None)
+
+    def states(self) -> list[dict]:
+        """Return the states of the accounts, for monitoring.
+
+        :return: A dict per account, with the keys "credentials" (key of the
+                 account), "drained" and "back_in" (seconds until a drained
+                 account gets requests again).
+        """
+        now = time.monotonic()
+        with self._lock:
+            drained = dict(self._drained)
+        return [
+            {
+                "credentials": key,
+                "drained": drained.get(key, now) > now,
+                "back_in": max(0.0, drained.get(key, now) - now),
+            }
+            for key in self._keys
+        ]
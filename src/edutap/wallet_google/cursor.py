@@ -0,0 +1,216 @@
+"""Listing cursors that fetch the next pages while the current one is consumed.
+
+`api.listing` fetches page N+1 only after the consumer drained page N.
+A cursor fetches up to ``prefetch`` pages ahead in the background (a thread for
+`ListingCursor`, a task for `AsyncListingCursor`), so network I/O overlaps with
+the processing of the consumer.
+
+Cursors are created with `api.listing_cursor` and `api.alisting_cursor`:
+
+.. code-block:: python
+
+    cursor = api.alisting_cursor("GenericObject", resource_id=class_id, prefetch=2)
+    async for obj in cursor:
+        ...
+
+    # or page by page, e.g. to persist the position
+    async for page in cursor.pages():
+        ...
+        save(cursor.next_page_token)
+"""
+
+from .models.bases import Model
+from collections.abc import AsyncGenerator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Generator
+
+import asyncio
+import queue
+import threading
+
+
+# fetches the page for a token, returns its models and the token of the next page
+Page = tuple[list[Model], str | None]
+FetchPage = Callable[[str | None], Page]
+AsyncFetchPage = Callable[[str | None], Awaitable[Page]]
+
+_DONE = object()
+
+
+class _CursorBase:
+    def __init__(
+        self,
+        *,
+        next_page_token: str | None = None,
+        prefetch: int = 1,
+        max_pages: int | None = None,
+    ):
+        if prefetch < 0:
+            raise ValueError(f"prefetch must be >= 0, got {prefetch}")
+        self.next_page_token = next_page_token
+        self.prefetch = prefetch
+        self.max_pages = max_pages
+        self.pages_consumed = 0
+        self.exhausted = False
+        self._started = False
+
+    def _start(self) -> None:
+        if self._started:
+            raise RuntimeError("A cursor can be iterated only once")
+        self._started = True
+
+    def _take(self, page: Page) -> list[Model]:
+        models, self.next_page_token = page
+        self.pages_consumed += 1
+        if self.next_page_token is None:
+            self.exhausted = True
+        return models
+
+
+class ListingCursor(_CursorBase):
+    """Iterates over listing results, prefetching pages in a background thread.
+
+    :ivar next_page_token: Token of the page after the one handed out last,
+                           None when all pages were handed out.
+                           Use it to continue the listing later.
+    """
+
+    def __init__(
+        self,
+        fetch_page: FetchPage,
+        *,
+        next_page_token: str | None = None,
+        prefetch: int = 1,
+        max_pages: int | None = None,
+    ):
+        """
+        :param fetch_page:      Fetches the page for a token.
+        :param next_page_token: Token of the first page to fetch.
+        :param prefetch:        Number of pages fetched ahead of the page being consumed.
+        :param max_pages:       Stop after this number of pages.
+        """
+        super().__init__(
+            next_page_token=next_page_token, prefetch=prefetch, max_pages=max_pages
+        )
+        self._fetch_page = fetch_page
+
+    def _produce(
+        self,
+        pages: queue.Queue,
+        slots: threading.Semaphore,
+        stop: threading.Event,
+    ) -> None:
+        token = self.next_page_token
+        count = 0
+        try:
+            while not stop.is_set():
+                slots.acquire()
+                if stop.is_set():
+                    break
+                page = self._fetch_page(token)
+                pages.put(page)
+                count += 1
+                token = page[1]
+                if token is None or count == self.max_pages:
+                    break
+        except Exception as e:
+            pages.put(e)
+        pages.put(_DONE)
+
+    def pages(self) -> Generator[list[Model], None, None]:
+        """Yield the validated models page by page."""
+        self._start()
+        if self.max_pages == 0:
+            return
+        pages: queue.Queue = queue.Queue()
+        # the consumer holds one slot for the page being consumed
+        slots = threading.Semaphore(self.prefetch + 1)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(pages, slots, stop),
+            name="wallet-google-listing-cursor",
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while (page := pages.get()) is not _DONE:
+                if isinstance(page, Exception):
+                    raise page
+                yield self._take(page)
+                slots.release()
+        finally:
+            stop.set()
+            slots.release()
+
+    def __iter__(self) -> Generator[Model, None, None]:
+        for page in self.pages():
+            yield from page
+
+
+class AsyncListingCursor(_CursorBase):
+    """Iterates asynchronously over listing results, prefetching pages in a background task.
+
+    :ivar next_page_token: Token of the page after the one handed out last,
+                           None when all pages were handed out.
+                           Use it to continue the listing later.
+    """
+
+    def __init__(
+        self,
+        fetch_page: AsyncFetchPage,
+        *,
+        next_page_token: str | None = None,
+        prefetch: int = 1,
+        max_pages: int | None = None,
+    ):
+        """
+        :param fetch_page:      Fetches the page for a token.
+        :param next_page_token: Token of the first page to fetch.
+        :param prefetch:        Number of pages fetched ahead of the page being consumed.
+        :param max_pages:       Stop after this number of pages.
+        """
+        super().__init__(
+            next_page_token=next_page_token, prefetch=prefetch, max_pages=max_pages
+        )
+        self._fetch_page = fetch_page
+
+    async def _produce(self, pages: asyncio.Queue, slots: asyncio.Semaphore) -> None:
+        token = self.next_page_token
+        count = 0
+        try:
+            while True:
+                await slots.acquire()
+                page = await self._fetch_page(token)
+                pages.put_nowait(page)
+                count += 1
+                token = page[1]
+                if token is None or count == self.max_pages:
+                    break
+        except Exception as e:
+            pages.put_nowait(e)
+        pages.put_nowait(_DONE)
+
+    async def pages(self) -> AsyncGenerator[list[Model], None]:
+        """Yield the validated models page by page."""
+        self._start()
+        if self.max_pages == 0:
+            return
+        pages: asyncio.Queue = asyncio.Queue()
+        # the consumer holds one slot for the page being consumed
+        slots = asyncio.Semaphore(self.prefetch + 1)
+        producer = asyncio.ensure_future(self._produce(pages, slots))
+        try:
+            while (page := await pages.get()) is not _DONE:
+                if isinstance(page, Exception):
+                    raise page
+                yield self._take(page)
+                slots.release()
+        finally:
+            producer.cancel()
+
+    async def __aiter__(self) -> AsyncGenerator[Model, None]:
+        async for page in self.pages():
+            for model in page:
+                yield model
@@ -0,0 +1,164 @@
+"""Deadlines and per-operation timeouts of API calls.
+
+A request handler with an end-to-end budget sets a deadline for everything it
+calls, e.g.::
+
+    with deadline(0.8):
+        link = api.save_link([obj])
+        obj = await api.aread("GenericObject", object_id)
+
+API functions and bulk helpers also take a ``timeout`` in seconds or a
+`Deadline`, the earlier of it and the deadline of the context applies.
+The remaining budget is passed on through retries and pagination: every
+round trip gets at most the remaining time as its timeout, and no round trip
+is started once the deadline passed, `DeadlineExceededException` is raised
+instead.
+
+The deadline bounds the wait for the rate limiter too, and async calls are
+cancelled when it passes, as the timeouts of httpx apply to each phase and
+each chunk of a round trip only.
+
+Independent of deadlines, the ``EDUTAP_WALLET_GOOGLE_OPERATION_TIMEOUTS``
+setting limits the round trips of each operation, e.g. ``{"read": 2}``.
+"""
+
+from .exceptions import DeadlineExceededException
+from collections.abc import Awaitable
+from collections.abc import Iterator
+from contextvars import ContextVar
+
+import asyncio
+import contextlib
+import httpx
+import sys
+import time
+import typing
+
+
+_T = typing.TypeVar("_T")
+
+
+class Deadline:
+    """A point in time by which a call has to be finished."""
+
+    __slots__ = ("expires",)
+
+    def __init__(self, timeout: float):
+        """
+        :param timeout: Seconds from now.
+        """
+        self.expires = time.monotonic() + timeout
+
+    def __repr__(self) -> str:
+        return f"<Deadline in {self.remaining():.3f}s>"
+
+    def remaining(self) -> float:
+        """Return the seconds left, negative once the deadline passed."""
+        return self.expires - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar(
+    "edutap_wallet_google_deadline", default=None
+)
+
+
+def current_deadline() -> Deadline | None:
+    """Return the deadline of the current context, if any."""
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def deadline(timeout: float | Deadline) -> Iterator[Deadline]:
+    """Set the deadline of the API calls within the context.
+
+    An earlier deadline of an enclosing context is kept. Tasks created within
+    the context inherit the deadline, threads do not.
+
+    :param timeout: Seconds from now, or a `Deadline`.
+    :return:        The deadline in effect.
+    """
+    effective = resolve_deadline(timeout)
+    token = _current_deadline.set(effective)
+    try:
+        yield typing.cast(Deadline, effective)
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextlib.contextmanager
+def attempt_deadline(deadline: Deadline | None) -> Iterator[None]:
+    """Set the deadline of one attempt of a call, for the transports of the pool.
+
+    Unlike `deadline`, the given deadline replaces the one of the context, also by None.
+    """
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def resolve_deadline(timeout: float | Deadline | None) -> Deadline | None:
+    """Return the deadline of a call, the earlier of its timeout and the one of the context.
+
+    :param timeout: Seconds from now, a `Deadline`, or None.
+    """
+    if timeout is not None and not isinstance(timeout, Deadline):
+        timeout = Deadline(timeout)
+    current = _current_deadline.get()
+    if current is None or (timeout is not None and timeout.expires < current.expires):
+        return timeout
+    return current
+
+
+def request_timeout(
+    operation: str, deadline: Deadline | None
+) -> httpx.Timeout | typing.Any:
+    """Return the timeout of the next round trip of an operation.
+
+    :param operation: Operation of the call, e.g. "read" or "list".
+    :param deadline:  Deadline of the call, if any.
+    :raises DeadlineExceededException: When the deadline passed.
+    :return:          The smaller of the operation timeout of the settings and the
+                      remaining time, the timeout of the client if there is neither.
+    """
+    # imported here, as the transports of the client pool import this module
+    from .clientpool import client_pool
+
+    timeout = client_pool.settings.operation_timeouts.get(operation)
+    if deadline is not None:
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededException(
+                f"Deadline exceeded by {-remaining:.3f}s before {operation}"
+            )
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    if timeout is None:
+        return httpx.USE_CLIENT_DEFAULT
+    return httpx.Timeout(timeout)
+
+
+async def wait_for_deadline(
+    awaitable: Awaitable[_T], deadline: Deadline | None, what: str
+) -> _T:
+    """Await something, cancelling it when the deadline passes.
+
+    :param awaitable: The awaitable, e.g. the coroutine sending a request.
+    :param deadline:  Deadline of the call, if any.
+    :param what:      Description of the awaitable for the exception, e.g. "read".
+    :raises DeadlineExceededException: When the deadline passed before it finished.
+    :return:          The result of the awaitable.
+    """
+    if deadline is None:
+        return await awaitable
+    try:
+        if sys.version_info >= (3, 11):
+            async with asyncio.timeout(deadline.remaining()):
+                return await awaitable
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceededException(f"Deadline exceeded during {what}") from e
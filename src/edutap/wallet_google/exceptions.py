@@ -4,7 +4,12 @@
 class WalletException(Exception):
     """Base exception for Google Wallet API errors."""
 
-    pass
+    def __init__(self, *args, status_code: int | None = None):
+        """
+        :param status_code: HTTP status code of the failed response, if any.
+        """
+        super().__init__(*args)
+        self.status_code = status_code
 
 
 class ObjectAlreadyExistsException(WalletException):
@@ -17,3 +22,15 @@ class QuotaExceededException(WalletException):
     """Raised when API quota has been exceeded."""
 
     pass
+
+
+class CircuitOpenException(WalletException):
+    """Raised instead of sending a request to an endpoint that failed repeatedly."""
+
+    pass
+
+
+class DeadlineExceededException(WalletException):
+    """Raised when the deadline of a call passed before it finished."""
+
+    pass
@@ -0,0 +1,452 @@
+"""Issuer-wide export of classes and objects to NDJSON files.
+
+The export directory is laid out like this::
+
+    checkpoint.json
+    classes/GenericClass.ndjson
+    objects/GenericObject/<class id>.ndjson
+
+Each line is one class or object as JSON. With ``compress=True`` the files end
+with ``.ndjson.gz`` and each page is appended as a gzip member of its own,
+readable with `gzip.open`.
+
+Pages are written as they arrive, so memory is bounded by a few pages per worker.
+The objects of ``concurrency`` classes are listed in parallel.
+After each page, its next page token and the size of the file are recorded in
+``checkpoint.json``. Running an interrupted export again on the same directory
+resumes it: complete files are skipped, incomplete files are truncated to the
+recorded size and continued from the recorded page token.
+
+.. code-block:: python
+
+    from edutap.wallet_google.export import aexport
+
+    stats = await aexport("/backup/wallet", issuer_id, compress=True)
+"""
+
+from .api import alisting_cursor
+from .api import listing_cursor
+from .credentialsgroup import CredentialsGroup
+from .models.bases import Model
+from .registry import _MODEL_REGISTRY_BY_NAME
+from collections.abc import Generator
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from pathlib import Path
+from urllib.parse import quote
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+
+
+def _object_name(class_name: str) -> str:
+    return class_name.removesuffix("Class") + "Object"
+
+
+def exportable_class_names() -> list[str]:
+    """Return the registered class names that can be listed together with their objects."""
+    return [
+        name
+        for name, metadata in _MODEL_REGISTRY_BY_NAME.items()
+        if name.endswith("Class")
+        and metadata["can_list"]
+        and _MODEL_REGISTRY_BY_NAME.get(_object_name(name), {}).get("can_list")
+    ]
+
+
+class Checkpoint:
+    """Progress of an export, one entry per file.
+
+    Saved atomically after every update, so it always matches completely written pages.
+    """
+
+    def __init__(self, path: Path, issuer_id: str):
+        """
+        :param path:        Path of the checkpoint file, loaded if it exists.
+        :param issuer_id:   Issuer of the export.
+        :raises ValueError: When the existing checkpoint belongs to another export.
+        """
+        self.path = path
+        self.issuer_id = issuer_id
+        self.files: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            data = json.loads(path.read_text())
+            if data.get("version") != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version in {path}")
+            if data.get("issuer_id") != issuer_id:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to issuer {data.get('issuer_id')}"
+                )
+            self.files = data["files"]
+
+    def get(self, unit: str) -> dict:
+        """Return the progress of a file: token, offset and whether it is done."""
+        with self._lock:
+            return dict(
+                self.files.get(unit, {"token": None, "offset": 0, "done": False})
+            )
+
+    def update(self, unit: str, *, token: str | None, offset: int, done: bool) -> None:
+        """Record the progress of a file and save the checkpoint."""
+        with self._lock:
+            self.files[unit] = {"token": token, "offset": offset, "done": done}
+            data = {
+                "version": CHECKPOINT_VERSION,
+                "issuer_id": self.issuer_id,
+                "files": self.files,
+            }
+            temporary = self.path.with_name(f"{self.path.name}.tmp")
+            temporary.write_text(json.dumps(data))
+            os.replace(temporary, self.path)
+
+
+class _ExportFile:
+    """An NDJSON file of the export, continued at the offset of the checkpoint."""
+
+    def __init__(self, path: Path, offset: int, compress: bool):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.compress = compress
+        self._file = open(path, "r+b" if path.exists() else "wb")
+        # drop what was written after the last checkpoint
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write_page(self, models: list[Model]) -> int:
+        """Append the models of a page, return the new size of the file."""
+        data = b"".join(
+            model.model_dump_json(exclude_unset=True, by_alias=True).encode("utf-8")
+            + b"\n"
+            for model in models
+        )
+        if data:
+            if self.compress:
+                data = gzip.compress(data)
+            self._file.write(data)
+            self._file.flush()
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _read_ids(path: Path, compress: bool) -> Generator[str, None, None]:
+    """Read the ids of the records already written to a file."""
+    if not path.exists():
+        return
+    opener = gzip.open if compress else open
+    with opener(path, "rb") as file:
+        for line in file:
+            yield json.loads(line)["id"]
+
+
+class _ExportBase:
+    def __init__(
+        self,
+        directory: str | Path,
+        issuer_id: str,
+        *,
+        names: list[str] | None = None,
+        compress: bool = False,
+        concurrency: int = 4,
+        page_size: int = 0,
+        credentials: dict | CredentialsGroup | None = None,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be >= 1, got {concurrency}")
+        self.names = names if names is not None else exportable_class_names()
+        for name in self.names:
+            if name not in exportable_class_names():
+                raise ValueError(f"{name} is not an exportable class name")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.issuer_id = issuer_id
+        self.compress = compress
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.credentials = credentials
+        self.checkpoint = Checkpoint(self.directory / CHECKPOINT_NAME, issuer_id)
+        self.stats = {"classes": 0, "objects": 0, "pages": 0}
+        self._stats_lock = threading.Lock()
+
+    def _path(self, unit: str) -> Path:
+        return self.directory / f"{unit}.ndjson{'.gz' if self.compress else ''}"
+
+    def _open(self, unit: str, offset: int) -> _ExportFile:
+        if offset:
+            logger.info(f"Resuming export of {unit} at byte {offset}")
+        return _ExportFile(self._path(unit), offset, self.compress)
+
+    def _page_written(
+        self,
+        unit: str,
+        file: _ExportFile,
+        models: list[Model],
+        token: str | None,
+        kind: str,
+    ) -> None:
+        """Write a page and record the progress of its file."""
+        offset = file.write_page(models)
+        self.checkpoint.update(unit, token=token, offset=offset, done=token is None)
+        with self._stats_lock:
+            self.stats[kind] += len(models)
+            self.stats["pages"] += 1
+
+
+def _class_unit(name: str) -> str:
+    return f"classes/{name}"
+
+
+def _object_unit(name: str, class_id: str) -> str:
+    return f"objects/{name}/{quote(class_id, safe='')}"
+
+
+class Export(_ExportBase):
+    """Exports the classes and objects of an issuer, see `export`."""
+
+    def _export_classes(self, name: str) -> Generator[str, None, None]:
+        """Export the classes of a type, yield the ids of all its exported classes."""
+        unit = _class_unit(name)
+        state = self.checkpoint.get(unit)
+        if state["done"]:
+            yield from _read_ids(self._path(unit), self.compress)
+            return
+        file = self._open(unit, state["offset"])
+        try:
+            yield from _read_ids(self._path(unit), self.compress)
+            cursor = listing_cursor(
+                name,
+                issuer_id=self.issuer_id,
+                page_size=self.page_size,
+                next_page_token=state["token"],
+                credentials=self.credentials,
+            )
+            for page in cursor.pages():
+                self._page_written(unit, file, page, cursor.next_page_token, "classes")
+                for model in page:
+                    yield model.id
+        finally:
+            file.close()
+
+    def _export_objects(self, name: str, class_id: str) -> None:
+        unit = _object_unit(name, class_id)
+        state = self.checkpoint.get(unit)
+        if state["done"]:
+            return
+        file = self._open(unit, state["offset"])
+        try:
+            cursor = listing_cursor(
+                name,
+                resource_id=class_id,
+                page_size=self.page_size,
+                next_page_token=state["token"],
+                credentials=self.credentials,
+            )
+            for page in cursor.pages():
+                self._page_written(unit, file, page, cursor.next_page_token, "objects")
+        finally:
+            file.close()
+
+    def run(self) -> dict[str, int]:
+        """Run the export.
+
+        :return: Number of classes, objects and pages written by this run.
+        """
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="wallet-google-export"
+        ) as executor:
+            pending: set[Future] = set()
+            try:
+                for name in self.names:
+                    for class_id in self._export_classes(name):
+                        pending.add(
+                            executor.submit(
+                                self._export_objects, _object_name(name), class_id
+                            )
+                        )
+                        if len(pending) >= 2 * self.concurrency:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                future.result()
+                for future in pending:
+                    future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+        return self.stats
+
+
+class AsyncExport(_ExportBase):
+    """Exports the classes and objects of an issuer asynchronously, see `aexport`."""
+
+    async def _export_classes(self, name: str, queue: asyncio.Queue) -> None:
+        """Export the classes of a type, queue the ids of all its exported classes."""
+        object_name = _object_name(name)
+        unit = _class_unit(name)
+        path = self._path(unit)
+        state = self.checkpoint.get(unit)
+        file = None
+        if not state["done"]:
+            file = await asyncio.to_thread(self._open, unit, state["offset"])
+        try:
+            class_ids = await asyncio.to_thread(list, _read_ids(path, self.compress))
+            for class_id in class_ids:
+                await queue.put((object_name, class_id))
+            if file is None:
+                return
+            cursor = alisting_cursor(
+                name,
+                issuer_id=self.issuer_id,
+                page_size=self.page_size,
+                next_page_token=state["token"],
+                credentials=self.credentials,
+            )
+            async for page in cursor.pages():
+                await asyncio.to_thread(
+                    self._page_written,
+                    unit,
+                    file,
+                    page,
+                    cursor.next_page_token,
+                    "classes",
+                )
+                for model in page:
+                    await queue.put((object_name, model.id))
+        finally:
+            if file is not None:
+                file.close()
+
+    async def _export_objects(self, name: str, class_id: str) -> None:
+        unit = _object_unit(name, class_id)
+        state = self.checkpoint.get(unit)
+        if state["done"]:
+            return
+        file = await asyncio.to_thread(self._open, unit, state["offset"])
+        try:
+            cursor = alisting_cursor(
+                name,
+                resource_id=class_id,
+                page_size=self.page_size,
+                next_page_token=state["token"],
+                credentials=self.credentials,
+            )
+            async for page in cursor.pages():
+                await asyncio.to_thread(
+                    self._page_written,
+                    unit,
+                    file,
+                    page,
+                    cursor.next_page_token,
+                    "objects",
+                )
+        finally:
+            file.close()
+
+    async def _produce(self, queue: asyncio.Queue) -> None:
+        for name in self.names:
+            await self._export_classes(name, queue)
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while (item := await queue.get()) is not None:
+            await self._export_objects(*item)
+
+    async def run(self) -> dict[str, int]:
+        """Run the export.
+
+        :return: Number of classes, objects and pages written by this run.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2 * self.concurrency)
+        tasks = [asyncio.ensure_future(self._produce(queue))]
+        tasks += [
+            asyncio.ensure_future(self._work(queue)) for _ in range(self.concurrency)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return self.stats
+
+
+def export(
+    directory: str | Path,
+    issuer_id: str,
+    *,
+    names: list[str] | None = None,
+    compress: bool = False,
+    concurrency: int = 4,
+    page_size: int = 0,
+    credentials: dict | CredentialsGroup | None = None,
+) -> dict[str, int]:
+    """Exports all classes and their objects of an issuer to NDJSON files.
+
+    Resumes an interrupted export to the same directory.
+
+    :param directory:   Directory to write the export and its checkpoint to.
+    :param issuer_id:   Identifier of the issuer to export.
+    :param names:       Registered class names to export, defaults to all, see `exportable_class_names`.
+    :param compress:    Write gzip compressed files.
+    :param concurrency: Number of classes to export objects of in parallel.
+    :param page_size:   Number of results per page to fetch, defaults to 100.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :raises ValueError: When input was invalid or the checkpoint belongs to another issuer.
+    :return:            Number of classes, objects and pages written by this run.
+    """
+    return Export(
+        directory,
+        issuer_id,
+        names=names,
+        compress=compress,
+        concurrency=concurrency,
+        page_size=page_size,
+        credentials=credentials,
+    ).run()
+
+
+async def aexport(
+    directory: str | Path,
+    issuer_id: str,
+    *,
+    names: list[str] | None = None,
+    compress: bool = False,
+    concurrency: int = 4,
+    page_size: int = 0,
+    credentials: dict | CredentialsGroup | None = None,
+) -> dict[str, int]:
+    """Exports all classes and their objects of an issuer asynchronously to NDJSON files.
+
+    Resumes an interrupted export to the same directory.
+
+    :param directory:   Directory to write the export and its checkpoint to.
+    :param issuer_id:   Identifier of the issuer to export.
+    :param names:       Registered class names to export, defaults to all, see `exportable_class_names`.
+    :param compress:    Write gzip compressed files.
+    :param concurrency: Number of classes to export objects of in parallel.
+    :param page_size:   Number of results per page to fetch, defaults to 100.
+    :param credentials: Optional session credentials as dict, or a `CredentialsGroup`.
+    :raises ValueError: When input was invalid or the checkpoint belongs to another issuer.
+    :return:            Number of classes, objects and pages written by this run.
+    """
+    return await AsyncExport(
+        directory,
+        issuer_id,
+        names=names,
+        compress=compress,
+        concurrency=concurrency,
+        page_size=page_size,
+        credentials=credentials,
+    ).run()
@@ -0,0 +1,86 @@
+"""Lazy read-only views over listing records.
+
+Validating a record builds the complete pydantic tree of all its nested fields.
+Jobs looking at a few fields only, like ``id``, ``state`` and ``hasUsers``,
+can list with ``lazy=True`` and get a `LazyRecord` per record instead.
+It keeps the raw JSON data and validates a field on its first access.
+`LazyRecord.materialize` returns the complete model instance.
+"""
+
+from .models.bases import Model
+from pydantic import TypeAdapter
+from pydantic import ValidationError
+from typing import Annotated
+
+import functools
+import typing
+
+
+@functools.cache
+def _field_adapter(model: type[Model], name: str) -> TypeAdapter:
+    """Return an adapter validating a single field of model, cached per field."""
+    field_info = model.model_fields[name]
+    return TypeAdapter(Annotated[field_info.annotation, field_info])
+
+
+class LazyRecord:
+    """Read-only view over the raw data of a record.
+
+    Fields of the model are accessed as attributes, each one is validated on
+    its first access and cached. Validators spanning several fields only run on
+    `materialize`.
+    """
+
+    __slots__ = ("_model", "_data", "_values")
+
+    def __init__(self, model: type[Model], data: dict[str, typing.Any]):
+        """
+        :param model: Model of the record.
+        :param data:  Raw JSON data of the record.
+        """
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_values", {})
+
+    @property
+    def model(self) -> type[Model]:
+        """The model of the record."""
+        return self._model
+
+    @property
+    def raw(self) -> dict[str, typing.Any]:
+        """The raw JSON data of the record, must not be modified."""
+        return self._data
+
+    def __getattr__(self, name: str) -> typing.Any:
+        field_info = self._model.model_fields.get(name)
+        if field_info is None:
+            raise AttributeError(f"{self._model.__name__} record has no field {name!r}")
+        if name in self._values:
+            return self._values[name]
+        key = field_info.alias or name
+        if key in self._data:
+            value = _field_adapter(self._model, name).validate_python(self._data[key])
+        elif field_info.is_required():
+            raise ValidationError.from_exception_data(
+                self._model.__name__,
+                [{"type": "missing", "loc": (key,), "input": self._data}],
+            )
+        else:
+            value = field_info.get_default(call_default_factory=True)
+        self._values[name] = value
+        return value
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"<LazyRecord {self._model.__name__} {self._data.get('id')}>"
+
+    def materialize(self) -> Model:
+        """Validate the complete record.
+
+        :raises ValidationError: When the record does not validate.
+        :return:                 The model instance of the record.
+        """
+        return self._model.model_validate(self._data)
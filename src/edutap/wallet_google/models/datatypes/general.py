@@ -8,12 +8,16 @@ from pydantic import AnyHttpUrl
 from pydantic import AnyUrl
 from pydantic import Field
 from typing import Annotated
+from typing import Generic
+from typing import TypeVar
 from typing_extensions import deprecated
 
 
 # Attribute order as in Google's documentation to make future updates easier!
 # last check: 2025-01-22
 
+ResourceT = TypeVar("ResourceT")
+
 
 class Uri(DeprecatedKindFieldMixin, Model):
     """
@@ -108,7 +112,7 @@ class Pagination(DeprecatedKindFieldMixin, Model):
     nextPageToken: str | None = None
 
 
-class PaginatedResponse(Model):
+class PaginatedResponse(Model, Generic[ResourceT]):
     """All Class and Object List Responses are paginated.
     see: https://developers.google.com/wallet/reference/rest/v1/loyaltyclass/list
          https://developers.google.com/wallet/reference/rest/v1/loyaltyobject/list
@@ -120,9 +124,12 @@ class PaginatedResponse(Model):
 
     The List Response for Issuer is not paginated (see: https://developers.google.com/wallet/reference/rest/v1/issuer/list),
     therefore the pagination attribute is optional.
+
+    Parametrize it with the model of the resources, e.g. ``PaginatedResponse[GenericObject]``,
+    to decode and validate a whole page in one pass. Unparametrized, the resources stay plain dicts.
     """
 
-    resources: list = []
+    resources: list[ResourceT] = []
     pagination: Pagination | None = None
 
 
@@ -35,3 +35,37 @@ class CallbackHandler(Protocol):
 
         :raises: ValueError
         """
+
+
+@runtime_checkable
+class TokenStore(Protocol):
+    """Storage of OAuth access tokens, shared by the pooled clients.
+
+    A client needing a new token locks its key first, so only one client at a
+    time fetches it, the others wait and take the stored one.
+    """
+
+    def get(self, key: str) -> dict | None:
+        """
+        :param key: Key of the credentials and scopes of the token.
+        :return: The token as dict with "access_token" and "expires_at", None if not stored.
+        """
+
+    def set(self, key: str, token: dict) -> None:
+        """
+        :param key: Key of the credentials and scopes of the token.
+        :param token: The token as dict.
+        """
+
+    def try_lock(self, key: str) -> bool:
+        """Acquire the lock of a key for fetching its token, without waiting.
+
+        :param key: Key of the credentials and scopes of the token.
+        :return: True if acquired, False if held by another client.
+        """
+
+    def unlock(self, key: str) -> None:
+        """Release a lock acquired with `try_lock`.
+
+        :param key: Key of the credentials and scopes of the token.
+        """
@@ -0,0 +1,165 @@
+"""Client-side rate limiting."""
+
+from .deadline import Deadline
+from .exceptions import DeadlineExceededException
+
+import asyncio
+import threading
+import time
+import typing
+
+
+class TokenBucket:
+    """Token bucket rate limiter, shared safely by threads and event loops.
+
+    Tokens are refilled continuously at ``rate`` per second up to ``burst``.
+    Acquiring reserves a token right away and then waits until it is due,
+    so waiters are served in the order they arrived. A waiter cancelled
+    while waiting does not give its token back.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        """
+        :param rate:  Tokens refilled per second.
+        :param burst: Maximum number of tokens, defaults to rate (at least 1).
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0, got {rate}")
+        if burst is None:
+            burst = max(rate, 1.0)
+        if burst < 1:
+            raise ValueError(f"burst must be >= 1, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        """Number of tokens available now, negative while waiters are queued."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens, return the seconds to wait until they are due.
+
+        :param tokens: Number of tokens to take.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def give_back(self, tokens: float = 1.0) -> None:
+        """Return tokens reserved but not used.
+
+        :param tokens: Number of tokens to return.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.burst, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Take tokens, blocking until they are due."""
+        if delay := self.reserve(tokens):
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: float = 1.0) -> None:
+        """Take tokens, waiting asynchronously until they are due."""
+        if delay := self.reserve(tokens):
+            await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """Limits the requests of one set of credentials, overall and per operation.
+
+    Operations are the names used by `transports.operation_of`, e.g. "list" or "update".
+    """
+
+    def __init__(
+        self,
+        rate: float = 0,
+        burst: float = 0,
+        operation_rates: dict[str, float] | None = None,
+    ):
+        """
+        :param rate:            Requests per second of all operations, 0 for no overall limit.
+        :param burst:           Maximum burst of all operations, 0 defaults to rate.
+        :param operation_rates: Requests per second by operation.
+        """
+        self.bucket = TokenBucket(rate, burst or None) if rate > 0 else None
+        self.operation_buckets = {
+            operation: TokenBucket(operation_rate)
+            for operation, operation_rate in (operation_rates or {}).items()
+            if operation_rate > 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.bucket is not None or bool(self.operation_buckets)
+
+    def reserve(self, operation: str | None) -> float:
+        """Take a token for a request, return the seconds to wait until it is due.
+
+        :param operation: Operation of the request, None if not rate limited.
+        """
+        if operation is None:
+            return 0.0
+        delays = [0.0]
+        if self.bucket is not None:
+            delays.append(self.bucket.reserve())
+        if (bucket := self.operation_buckets.get(operation)) is not None:
+            delays.append(bucket.reserve())
+        return max(delays)
+
+    def _give_back(self, operation: str) -> None:
+        if self.bucket is not None:
+            self.bucket.give_back()
+        if (bucket := self.operation_buckets.get(operation)) is not None:
+            bucket.give_back()
+
+    def _reserve_before(
+        self, operation: str | None, deadline: Deadline | None
+    ) -> float:
+        """Take a token for a request, return the seconds to wait until it is due.
+
+        :param operation: Operation of the request, None if not rate limited.
+        :param deadline:  Deadline of the request, if any.
+        :raises DeadlineExceededException: When the token is not due before the
+                          deadline, the token is given back then.
+        """
+        delay = self.reserve(operation)
+        if delay and deadline is not None and delay >= deadline.remaining():
+            self._give_back(typing.cast(str, operation))
+            raise DeadlineExceededException(
+                f"Deadline exceeded waiting {delay:.3f}s for the rate limit of {operation}"
+            )
+        return delay
+
+    def acquire(self, operation: str | None, deadline: Deadline | None = None) -> None:
+        """Take a token for a request, blocking until it is due, see `_reserve_before`."""
+        if delay := self._reserve_before(operation, deadline):
+            time.sleep(delay)
+
+    async def aacquire(
+        self, operation: str | None, deadline: Deadline | None = None
+    ) -> None:
+        """Take a token for a request, waiting asynchronously until it is due, see `_reserve_before`."""
+        if delay := self._reserve_before(operation, deadline):
+            await asyncio.sleep(delay)
+
+    def tokens(self) -> dict[str, float]:
+        """Return the current token levels, overall as "*" and by operation."""
+        levels = {}
+        if self.bucket is not None:
+            levels["*"] = self.bucket.tokens
+        for operation, bucket in self.operation_buckets.items():
+            levels[operation] = bucket.tokens
+        return levels
@@ -0,0 +1,282 @@
+"""Retries with exponential backoff for overloaded or failing API calls.
+
+Google answers with 429, a 403 quota error or a 5xx status when it is overloaded
+or failing temporarily, and connections may break. The API functions retry these
+cases with exponential backoff, so callers don't need their own retry loops.
+Random jitter spreads the retries of concurrent callers, a ``Retry-After``
+header of the response is honoured.
+
+Only safe calls are retried: reads, listing pages and creates of resources with
+an id. The response of a create may get lost after the object was created, its retry then gets a 409.
+`api.create` and `api.acreate` read the object in that case instead of raising.
+
+Retries are disabled by default, see the ``EDUTAP_WALLET_GOOGLE_RETRY_*`` settings.
+A retry is not made when its backoff would end after the deadline of the call.
+Register a hook with `add_retry_hook` to monitor the retries and their backoff time.
+"""
+
+from .clientpool import client_pool
+from .deadline import attempt_deadline
+from .deadline import Deadline
+from .deadline import request_timeout
+from .deadline import wait_for_deadline
+from .exceptions import DeadlineExceededException
+from .settings import Settings
+from .utils import is_quota_error
+from collections.abc import Awaitable
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+
+import asyncio
+import datetime
+import httpx
+import logging
+import random
+import time
+import typing
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetryEvent(typing.NamedTuple):
+    """A retry about to be made, passed to the retry hooks."""
+
+    operation: str
+    """Operation of the call, e.g. "read" or "list"."""
+    name: str
+    """Registered name of the model."""
+    resource_id: str
+    """Identifier of the resource, if any."""
+    attempt: int
+    """Number of the failed attempt, starting at 1."""
+    delay: float
+    """Seconds to wait before the next attempt."""
+    reason: str
+    """Status code or exception type of the failed attempt."""
+
+
+RetryHook = Callable[[RetryEvent], None]
+
+_RETRY_HOOKS: list[RetryHook] = []
+
+
+def add_retry_hook(hook: RetryHook) -> None:
+    """Register a function called with a `RetryEvent` before each retry."""
+    _RETRY_HOOKS.append(hook)
+
+
+def remove_retry_hook(hook: RetryHook) -> None:
+    """Unregister a function registered with `add_retry_hook`."""
+    _RETRY_HOOKS.remove(hook)
+
+
+def _notify(event: RetryEvent) -> None:
+    logger.info(
+        f"Retrying {event.operation} {event.name} {event.resource_id} "
+        f"after attempt {event.attempt} failed with {event.reason}, "
+        f"waiting {event.delay:.2f}s"
+    )
+    for hook in _RETRY_HOOKS:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception(f"Retry hook {hook!r} failed")
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a call."""
+
+    def __init__(
+        self,
+        max_attempts: int = 1,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: bool = True,
+        respect_retry_after: bool = True,
+    ):
+        """
+        :param max_attempts:        Maximum number of attempts per call, 1 disables retries.
+        :param base_delay:          Seconds to wait before the first retry, doubled for each further one.
+        :param max_delay:           Maximum seconds to wait before a retry.
+        :param jitter:              If True, wait a random time up to the backoff delay.
+        :param respect_retry_after: If True, wait as long as a Retry-After header asks for.
+        """
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be >= 1, got {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RetryPolicy":
+        return cls(
+            max_attempts=settings.retry_max_attempts,
+            base_delay=settings.retry_base_delay,
+            max_delay=settings.retry_max_delay,
+            jitter=settings.retry_jitter,
+            respect_retry_after=settings.retry_respect_retry_after,
+        )
+
+    def is_retryable(self, response: httpx.Response) -> bool:
+        """Check if the response is a temporary failure worth retrying."""
+        status = response.status_code
+        if status == 429 or status >= 500:
+            return True
+        return status == 403 and is_quota_error(response)
+
+    def delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """Return the seconds to wait after a failed attempt.
+
+        :param attempt:  Number of the failed attempt, starting at 1.
+        :param response: Response of the failed attempt, None if it raised.
+        """
+        if (
+            self.respect_retry_after
+            and response is not None
+            and (retry_after := _retry_after(response)) is not None
+        ):
+            return min(retry_after, self.max_delay)
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        if self.jitter:
+            return random.uniform(0, backoff)
+        return backoff
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """Return the seconds a Retry-After header asks to wait, if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (date - now).total_seconds())
+
+
+class Retrying:
+    """Sends the request of one call, retrying it according to the retry policy.
+
+    The policy is read from the settings when it is not given. Every attempt
+    gets the timeout of the operation, capped at the time left until the deadline,
+    async attempts are cancelled when the deadline passes.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        name: str,
+        resource_id: str = "",
+        policy: RetryPolicy | None = None,
+        deadline: Deadline | None = None,
+        retry: bool = True,
+    ):
+        """
+        :param operation:   Operation of the call, e.g. "read" or "list".
+        :param name:        Registered name of the model.
+        :param resource_id: Identifier of the resource, if any.
+        :param policy:      The retry policy, defaults to the one of the settings.
+        :param deadline:    Deadline of the call, if any.
+        :param retry:       If False, send the request once, for calls not safe to retry.
+        """
+        self.operation = operation
+        self.name = name
+        self.resource_id = resource_id
+        if not retry:
+            policy = RetryPolicy(max_attempts=1)
+        self.policy = policy or RetryPolicy.from_settings(client_pool.settings)
+        self.deadline = deadline
+        self.attempts = 0
+
+    def _next_delay(
+        self,
+        response: httpx.Response | None,
+        error: httpx.TransportError | None = None,
+    ) -> float | None:
+        """Return the delay before the next attempt, None if not to retry."""
+        if self.attempts >= self.policy.max_attempts:
+            return None
+        if response is not None and not self.policy.is_retryable(response):
+            return None
+        delay = self.policy.delay(self.attempts, response)
+        if self.deadline is not None and delay >= self.deadline.remaining():
+            return None
+        reason = (
+            str(response.status_code) if response is not None else type(error).__name__
+        )
+        _notify(
+            RetryEvent(
+                self.operation,
+                self.name,
+                self.resource_id,
+                self.attempts,
+                delay,
+                reason,
+            )
+        )
+        return delay
+
+    def _check_deadline(self, error: httpx.TransportError) -> None:
+        """Raise `DeadlineExceededException` when an attempt failed as the deadline passed."""
+        if self.deadline is not None and self.deadline.expired:
+            raise DeadlineExceededException(
+                f"Deadline exceeded during {self.operation} {self.name} "
+                f"{self.resource_id}: {error}"
+            ) from error
+
+    def send(self, request: Callable[[typing.Any], httpx.Response]) -> httpx.Response:
+        """Send a request, retrying it on temporary failures.
+
+        :param request: Function sending the request with the given timeout and
+                        returning its response.
+        :raises httpx.TransportError: When the last attempt failed to connect or to receive the response.
+        :raises DeadlineExceededException: When the deadline passed before or during an attempt.
+        :return:        The response of the last attempt.
+        """
+        while True:
+            self.attempts += 1
+            timeout = request_timeout(self.operation, self.deadline)
+            try:
+                with attempt_deadline(self.deadline):
+                    response = request(timeout)
+            except httpx.TransportError as error:
+                self._check_deadline(error)
+                if (delay := self._next_delay(None, error)) is None:
+                    raise
+            else:
+                if (delay := self._next_delay(response)) is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+
+    async def asend(
+        self, request: Callable[[typing.Any], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Send a request asynchronously, retrying it on temporary failures, see `send`."""
+        while True:
+            self.attempts += 1
+            timeout = request_timeout(self.operation, self.deadline)
+            try:
+                with attempt_deadline(self.deadline):
+                    response = await wait_for_deadline(
+                        request(timeout),
+                        self.deadline,
+                        f"{self.operation} {self.name} {self.resource_id}",
+                    )
+            except httpx.TransportError as error:
+                self._check_deadline(error)
+                if (delay := self._next_delay(None, error)) is None:
+                    raise
+            else:
+                if (delay := self._next_delay(response)) is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
@@ -12,6 +12,7 @@ ENV_PREFIX = "EDUTAP_WALLET_GOOGLE_"
 ROOT_DIR = Path(__file__).parent.parent.parent.parent.resolve()
 API_URL = "https://walletobjects.googleapis.com/walletobjects/v1"
 SAVE_URL = "https://pay.google.com/gp/v/save"
+BATCH_URL = "https://walletobjects.googleapis.com/batch"
 SCOPES = ["https://www.googleapis.com/auth/wallet_object.issuer"]
 
 
@@ -34,6 +35,7 @@ class Settings(BaseSettings):
 
     api_url: AnyHttpUrl = AnyHttpUrl(API_URL)
     save_url: AnyHttpUrl = AnyHttpUrl(SAVE_URL)
+    batch_url: AnyHttpUrl = AnyHttpUrl(BATCH_URL)
 
     handler_prefix: str = "/wallet/google"
     handler_prefix_callback: str = ""
@@ -55,6 +57,64 @@ class Settings(BaseSettings):
 
     fernet_encryption_key: str = ""
 
+    read_cache_size: int = 0  # 0 disables the read cache
+    read_cache_ttl: float = 300.0
+    # time-to-live by registered name, e.g. {"GenericClass": 3600}
+    read_cache_ttls: dict[str, float] = {}
+    read_coalescing: bool = True  # concurrent identical aread calls share one request
+
+    rate_limit_rps: float = 0  # requests per second per credentials, 0 disables
+    rate_limit_burst: float = 0  # 0 uses rate_limit_rps
+    # requests per second per credentials by operation, e.g. {"update": 5}
+    rate_limit_operations: dict[str, float] = {}
+
+    retry_max_attempts: int = (
+        1  # attempts of reads, listing pages and creates, 1 disables retries
+    )
+    retry_base_delay: float = 0.5  # doubled on each further retry
+    retry_max_delay: float = 30.0
+    retry_jitter: bool = True  # wait a random time up to the backoff delay
+    retry_respect_retry_after: bool = True
+
+    # consecutive 5xx or connection failures opening a circuit breaker, 0 disables
+    circuit_breaker_threshold: int = 0
+    circuit_breaker_cooldown: float = (
+        30.0  # seconds until a probe request is let through
+    )
+
+    # connection pool of each pooled client, None for no limit
+    http_max_connections: int | None = 100
+    http_max_keepalive_connections: int | None = 20
+    http_keepalive_expiry: float | None = 5.0  # seconds an idle connection is kept
+    http2: bool = False  # HTTP/2 for the async clients, needs the http2 extra
+    # timeouts in seconds, None for no timeout
+    http_timeout_connect: float | None = 5.0
+    http_timeout_read: float | None = 5.0
+    http_timeout_write: float | None = 5.0
+    http_timeout_pool: float | None = 5.0  # waiting for a connection from the pool
+
+    # bounds of the cached clients, see ClientPoolManager.pool_stats
+    # sync clients, and async clients per event loop, 0 for no limit
+    client_pool_max_clients: int = 100
+    client_pool_idle_timeout: float | None = 600.0  # seconds an unused client is kept
+
+    # timeouts in seconds of the round trips by operation, e.g. {"read": 2, "list": 10}
+    operation_timeouts: dict[str, float] = {}
+
+    # background renewal of the access tokens, see ClientPoolManager.start_token_refresher
+    token_refresh_margin: float = 300.0  # seconds before expiry a token is renewed
+    token_refresh_interval: float = 30.0  # seconds between checks of the tokens
+    # where the clients share their access tokens: "memory" within the process,
+    # "file" between the processes of a host, in token_store_directory
+    token_store: Literal["memory", "file"] = "memory"
+    token_store_directory: Path | None = (
+        None  # defaults to one in $XDG_RUNTIME_DIR or /tmp
+    )
+
+    # executor of api.asave_link signing the links off the event loop
+    save_link_executor: Literal["thread", "process"] = "thread"
+    save_link_workers: int | None = None  # defaults to the number of CPUs
+
     google_environment: Literal["production", "testing"] = "testing"
 
     cached_credentials_info: dict[str, str] = {}
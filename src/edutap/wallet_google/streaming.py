@@ -0,0 +1,155 @@
+"""Incremental decoding of listing responses.
+
+A listing page is a JSON object like ``{"resources": [...], "pagination": {...}}``.
+`ListingPageDecoder` is fed the response body chunk by chunk, cuts out each
+complete element of the ``resources`` array as soon as its closing bracket
+arrived and validates it into a model instance. Only the element being
+received is buffered, so peak memory is about one record instead of one page,
+and the first record is available before the whole page arrived.
+
+Used by `api.listing` and `api.alisting` with ``stream=True``.
+"""
+
+from .lazy import LazyRecord
+from .models.bases import make_partial_model
+from .models.bases import Model
+from .models.datatypes.general import PaginatedResponse
+from .models.datatypes.general import Pagination
+from pydantic import ValidationError
+from pydantic_core import from_json
+
+import json
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+# brackets and the start of a string, everything else is skipped
+_TOKEN_RE = re.compile(rb'[{}\[\]"]')
+# rest of a string after its opening quote
+_STRING_END_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# first character after a string, a colon if the string is a key
+_AFTER_STRING_RE = re.compile(rb"\s*(\S)")
+_OPENING = frozenset(b"{[")
+_QUOTE = ord('"')
+
+
+class ListingPageDecoder:
+    """Decodes the records of a listing page while the body arrives.
+
+    Feed the chunks of the body with `feed`, which returns the model instances
+    of the records completed by the chunk. After the last chunk, `close` checks
+    the body was complete and returns its pagination.
+    """
+
+    def __init__(
+        self, model: type[Model], *, partial: bool = False, lazy: bool = False
+    ):
+        """
+        :param model:   Model to validate the records with.
+        :param partial: If True, relax required fields for partial responses.
+        :param lazy:    If True, return lazy record views instead of model instances.
+        """
+        self.model = make_partial_model(model) if partial else model
+        self.lazy = lazy
+        self.count = 0
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._key: bytes | None = None
+        self._in_resources = False
+        self._record_start: int | None = None
+        # the body without the records, to read the pagination from
+        self._rest = bytearray()
+        self._rest_start = 0
+
+    def feed(self, chunk: bytes) -> list[Model] | list[LazyRecord]:
+        """Consume the next chunk of the body.
+
+        :param chunk: Next bytes of the body.
+        :return:      Model instances of the records completed by this chunk.
+        """
+        buffer = self._buffer
+        buffer += chunk
+        records = []
+        while match := _TOKEN_RE.search(buffer, self._pos):
+            char = buffer[match.start()]
+            if char == _QUOTE:
+                end = _STRING_END_RE.match(buffer, match.end())
+                if end is None:
+                    # incomplete string, wait for the next chunk
+                    self._pos = match.start()
+                    break
+                if self._depth == 1:
+                    after = _AFTER_STRING_RE.match(buffer, end.end())
+                    if after is None:
+                        # key or value, wait for the next chunk
+                        self._pos = match.start()
+                        break
+                    if after.group(1) == b":":
+                        self._key = bytes(buffer[match.end() : end.end() - 1])
+                self._pos = end.end()
+                continue
+            self._pos = match.end()
+            if char in _OPENING:
+                self._depth += 1
+                if self._in_resources and self._depth == 3:
+                    self._record_start = match.start()
+                elif self._depth == 2 and self._key == b"resources":
+                    self._in_resources = True
+                    self._rest += buffer[self._rest_start : self._pos]
+                continue
+            self._depth -= 1
+            if self._in_resources and self._depth == 2:
+                records.append(self._validate(buffer[self._record_start : self._pos]))
+                self._record_start = None
+            elif self._in_resources and self._depth == 1:
+                self._in_resources = False
+                self._rest_start = match.start()
+        else:
+            self._pos = len(buffer)
+        self._compact()
+        return records
+
+    def _validate(self, record: bytearray) -> Model | LazyRecord:
+        try:
+            if self.lazy:
+                instance = LazyRecord(self.model, from_json(record))
+            else:
+                instance = self.model.model_validate_json(record)
+        except ValidationError:
+            logger.exception(f"Error validating record {self.count}:\n{record!r}")
+            raise
+        self.count += 1
+        return instance
+
+    def _compact(self) -> None:
+        """Drop the consumed part of the buffer."""
+        if self._in_resources:
+            keep = self._pos if self._record_start is None else self._record_start
+        else:
+            self._rest += self._buffer[self._rest_start : self._pos]
+            keep = self._pos
+        del self._buffer[:keep]
+        self._pos -= keep
+        self._rest_start = self._pos
+        if self._record_start is not None:
+            self._record_start -= keep
+
+    def close(self) -> Pagination | None:
+        """Finish decoding after the last chunk.
+
+        :raises ValueError: When the body was incomplete or not a listing response.
+        :return:            The pagination of the page, if any.
+        """
+        if self._depth or self._in_resources or self._buffer.strip():
+            raise ValueError("Listing response ended unexpectedly")
+        pagination = PaginatedResponse.model_validate(json.loads(self._rest)).pagination
+        if self.count == 0:
+            logger.warning("Response does not contain 'resources'")
+            if pagination and pagination.resultsPerPage == 0:
+                logger.warning(
+                    "No results per page set, this might be an error in the API response."
+                )
+        return pagination
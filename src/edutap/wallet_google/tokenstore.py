@@ -0,0 +1,258 @@
+"""Access tokens shared by the pooled clients, in a process and across processes.
+
+Every pooled client fetches its OAuth access token with a signed assertion and
+a round trip to Google's token endpoint. The clients of `ClientPoolManager`
+take their tokens from a `TokenStore` instead, and only the client finding no
+valid token there fetches a new one, under the lock of the store:
+
+- `MemoryTokenStore`, the default, shares the tokens of the sync and async
+  clients within a process.
+- `FileTokenStore` shares them between all processes on a host, like the
+  workers of a gunicorn or uvicorn server, with files and ``fcntl`` locks.
+
+See the ``EDUTAP_WALLET_GOOGLE_TOKEN_STORE*`` settings, or assign a store,
+e.g. one implementing `TokenStore` on Redis, to ``client_pool.token_store``.
+"""
+
+from .protocols import TokenStore
+from authlib.integrations.httpx_client import AssertionClient
+from authlib.integrations.httpx_client import AsyncAssertionClient
+from authlib.oauth2.rfc6749 import OAuth2Token
+from collections.abc import Awaitable
+from collections.abc import Callable
+from pathlib import Path
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+
+# seconds to wait for another client fetching the token, before fetching it anyway
+LOCK_TIMEOUT = 10.0
+POLL_INTERVAL = 0.05
+
+
+class MemoryTokenStore:
+    """Tokens in memory, shared by the clients of a process."""
+
+    def __init__(self):
+        self._tokens: dict[str, dict] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        return self._tokens.get(key)
+
+    def set(self, key: str, token: dict) -> None:
+        self._tokens[key] = token
+
+    def try_lock(self, key: str) -> bool:
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        return lock.acquire(blocking=False)
+
+    def unlock(self, key: str) -> None:
+        self._locks[key].release()
+
+
+class FileTokenStore:
+    """Tokens in files of a directory, shared by the processes of a host.
+
+    Each key has a token file, replaced atomically, and a lock file locked with
+    ``flock``. A lock is released when its process dies, so a crashed worker
+    does not block the others. Files are readable by the owner only, and the
+    directory has to be accessible by its owner only, so other users of the
+    host can neither read the tokens nor plant files or symlinks in it.
+    """
+
+    def __init__(self, directory: str | Path):
+        """
+        :param directory:        Directory of the files, created if missing.
+        :raises RuntimeError:    When the platform has no ``fcntl``.
+        :raises PermissionError: When the directory is not owned by the user of the process,
+                                 accessible by others, or a symlink.
+        """
+        if fcntl is None:
+            raise RuntimeError("FileTokenStore needs fcntl, not available here")
+        self.directory = Path(directory)
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _check_private(self.directory)
+        self._fds: dict[str, int] = {}
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}{suffix}"
+
+    def get(self, key: str) -> dict | None:
+        try:
+            with self._path(key, ".json").open() as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key: str, token: dict) -> None:
+        path = self._path(key, ".json")
+        # a new file with a random name, readable by the owner only
+        fd, temporary = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(token, file)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def try_lock(self, key: str) -> bool:
+        # each attempt opens the file, locks of other open files conflict
+        # also within this process
+        fd = os.open(
+            self._path(key, ".lock"), os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600
+        )
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fds[key] = fd
+        return True
+
+    def unlock(self, key: str) -> None:
+        fd = self._fds.pop(key)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _check_private(directory: Path) -> None:
+    """Check that a directory is owned by the user of the process and accessible by it only.
+
+    :raises PermissionError: When it is not.
+    """
+    status = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode):
+        raise PermissionError(f"Token store directory {directory} is not a directory")
+    if status.st_uid != os.getuid():
+        raise PermissionError(
+            f"Token store directory {directory} is owned by another user"
+        )
+    if stat.S_IMODE(status.st_mode) & 0o077:
+        raise PermissionError(
+            f"Token store directory {directory} is accessible by other users, "
+            f"mode {stat.S_IMODE(status.st_mode):o}, expected 700"
+        )
+
+
+def _valid(token: dict, leeway: float) -> bool:
+    """Check if a token does not expire within leeway seconds."""
+    return not OAuth2Token.from_dict(token).is_expired(leeway=leeway)
+
+
+def obtain_token(
+    store: TokenStore, key: str, fetch: Callable[[], dict], leeway: float = 60
+) -> dict:
+    """Return the stored token of a key, fetch and store a new one if it is missing or expiring.
+
+    Only one caller at a time fetches, the others wait for the stored token.
+
+    :param store:  The token store.
+    :param key:    Key of the credentials and scopes of the token.
+    :param fetch:  Function fetching a new token.
+    :param leeway: Seconds before its expiry a token is renewed.
+    :return:       The token.
+    """
+    waited = 0.0
+    while True:
+        if (token := store.get(key)) is not None and _valid(token, leeway):
+            return token
+        if store.try_lock(key):
+            try:
+                if (token := store.get(key)) is not None and _valid(token, leeway):
+                    return token
+                token = dict(fetch())
+                store.set(key, token)
+                return token
+            finally:
+                store.unlock(key)
+        if waited >= LOCK_TIMEOUT:
+            # the lock holder is stuck
+            token = dict(fetch())
+            store.set(key, token)
+            return token
+        time.sleep(POLL_INTERVAL)
+        waited += POLL_INTERVAL
+
+
+async def aobtain_token(
+    store: TokenStore,
+    key: str,
+    fetch: Callable[[], Awaitable[dict]],
+    leeway: float = 60,
+) -> dict:
+    """Return the stored token of a key asynchronously, see `obtain_token`."""
+    waited = 0.0
+    while True:
+        if (token := store.get(key)) is not None and _valid(token, leeway):
+            return token
+        if store.try_lock(key):
+            try:
+                if (token := store.get(key)) is not None and _valid(token, leeway):
+                    return token
+                token = dict(await fetch())
+                store.set(key, token)
+                return token
+            finally:
+                store.unlock(key)
+        if waited >= LOCK_TIMEOUT:
+            token = dict(await fetch())
+            store.set(key, token)
+            return token
+        await asyncio.sleep(POLL_INTERVAL)
+        waited += POLL_INTERVAL
+
+
+class StoredTokenAssertionClient(AssertionClient):
+    """`AssertionClient` taking its access token from a `TokenStore`."""
+
+    def __init__(self, *args, token_store: TokenStore, token_key: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.token_store = token_store
+        self.token_key = token_key
+
+    def refresh_token(self, leeway: float = 60) -> OAuth2Token:
+        """Take the stored token, or fetch a new one if it expires within leeway seconds."""
+        self.token = obtain_token(
+            self.token_store,
+            self.token_key,
+            functools.partial(AssertionClient.refresh_token, self),
+            leeway,
+        )
+        return self.token
+
+
+class AsyncStoredTokenAssertionClient(AsyncAssertionClient):
+    """`AsyncAssertionClient` taking its access token from a `TokenStore`."""
+
+    def __init__(self, *args, token_store: TokenStore, token_key: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.token_store = token_store
+        self.token_key = token_key
+
+    async def refresh_token(self, leeway: float = 60) -> OAuth2Token:
+        """Take the stored token, or fetch a new one if it expires within leeway seconds."""
+        self.token = await aobtain_token(
+            self.token_store,
+            self.token_key,
+            functools.partial(AsyncAssertionClient.refresh_token, self),
+            leeway,
+        )
+        return self.token
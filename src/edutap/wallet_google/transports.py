@@ -0,0 +1,268 @@
+"""HTTP transports of the pooled clients.
+
+`PoolTransport` and `AsyncPoolTransport` wrap the httpx transport of the clients
+created by the `ClientPoolManager`. Every request to the Google Wallet API passes
+them, which makes them the place for client-side traffic control, like failing
+fast while the circuit breaker of an endpoint is open and waiting for the rate
+limiter before a request is sent, at most until the deadline of the call.
+They count the requests in flight too, until their responses are closed, for
+the load of the credentials groups, and so the connections of an evicted client
+are closed only after its requests finished.
+"""
+
+from .circuitbreaker import CircuitBreaker
+from .circuitbreaker import CircuitBreakers
+from .deadline import current_deadline
+from .ratelimit import RateLimiter
+from collections.abc import Callable
+
+import httpx
+import threading
+
+
+OPERATIONS = ("list", "create", "read", "update", "message", "batch")
+
+
+def endpoint_of(
+    request: httpx.Request, api_url: str, batch_url: str
+) -> tuple[str, str] | None:
+    """Return the URL part of the model and the API operation of a request.
+
+    :param request:   The request.
+    :param api_url:   Base URL of the Google Wallet API.
+    :param batch_url: URL of the batch endpoint.
+    :return:          Tuple of URL part, like "genericObject", and one of `OPERATIONS`,
+                      or None for requests not to the API, like the ones fetching access tokens.
+    """
+    url = str(request.url.copy_with(query=None))
+    if url == batch_url:
+        return ("batch", "batch")
+    if not url.startswith(f"{api_url}/"):
+        return None
+    parts = url[len(api_url) + 1 :].split("/")
+    if request.method == "GET":
+        return (parts[0], "list" if len(parts) == 1 else "read")
+    if request.method in ("PATCH", "PUT"):
+        return (parts[0], "update")
+    if request.method == "POST":
+        if len(parts) == 1:
+            return (parts[0], "create")
+        if parts[-1] == "addMessage":
+            return (parts[0], "message")
+    return None
+
+
+def operation_of(request: httpx.Request, api_url: str, batch_url: str) -> str | None:
+    """Return the API operation of a request.
+
+    :param request:   The request.
+    :param api_url:   Base URL of the Google Wallet API.
+    :param batch_url: URL of the batch endpoint.
+    :return:          One of `OPERATIONS`, or None for requests not to the API,
+                      like the ones fetching access tokens.
+    """
+    endpoint = endpoint_of(request, api_url, batch_url)
+    return endpoint[1] if endpoint else None
+
+
+class _PoolTransportBase:
+    def __init__(
+        self,
+        *,
+        limiter: RateLimiter | None = None,
+        breakers: CircuitBreakers | None = None,
+        api_url: str,
+        batch_url: str,
+    ):
+        self.limiter = limiter
+        self.breakers = breakers
+        self.api_url = api_url.rstrip("/")
+        self.batch_url = batch_url
+        self.in_flight = 0
+        # reentrant, when_idle may be called by the garbage collector within _end
+        self._in_flight_lock = threading.RLock()
+        self._on_idle: Callable[[], None] | None = None
+
+    def _begin(self) -> None:
+        with self._in_flight_lock:
+            self.in_flight += 1
+
+    def _end(self) -> None:
+        with self._in_flight_lock:
+            self.in_flight -= 1
+            on_idle = None
+            if not self.in_flight:
+                on_idle, self._on_idle = self._on_idle, None
+        if on_idle is not None:
+            on_idle()
+
+    def when_idle(self, func: Callable[[], None]) -> None:
+        """Call a function once no request is in flight, right away if none is.
+
+        Used to close the transport of an evicted client.
+        """
+        with self._in_flight_lock:
+            if self.in_flight:
+                self._on_idle = func
+                return
+        func()
+
+    def _prepare(
+        self, request: httpx.Request
+    ) -> tuple[str | None, CircuitBreaker | None]:
+        """Return the operation and the circuit breaker of a request.
+
+        :raises CircuitOpenException: When the circuit breaker is open.
+        """
+        endpoint = endpoint_of(request, self.api_url, self.batch_url)
+        if endpoint is None:
+            return None, None
+        url_part, operation = endpoint
+        breaker = None
+        if self.breakers is not None:
+            breaker = self.breakers.get(url_part, operation)
+            breaker.before_request()
+        return operation, breaker
+
+    @staticmethod
+    def _record(
+        breaker: CircuitBreaker | None,
+        response: httpx.Response | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        """Record the outcome of a request at its circuit breaker, if any."""
+        if breaker is None:
+            return
+        if isinstance(error, httpx.TransportError) or (
+            response is not None and response.status_code >= 500
+        ):
+            breaker.record_failure()
+        elif error is not None:
+            breaker.release()
+        else:
+            breaker.record_success()
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """Response stream calling a function once when it is closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    """Async response stream calling a function once when it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class PoolTransport(_PoolTransportBase, httpx.BaseTransport):
+    """Transport of the pooled sync clients, wrapping the actual transport."""
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        *,
+        limiter: RateLimiter | None = None,
+        breakers: CircuitBreakers | None = None,
+        api_url: str,
+        batch_url: str,
+    ):
+        """
+        :param transport: The transport sending the requests.
+        :param limiter:   Rate limiter to wait for before sending a request.
+        :param breakers:  Circuit breakers to check before sending a request.
+        :param api_url:   Base URL of the Google Wallet API.
+        :param batch_url: URL of the batch endpoint.
+        """
+        super().__init__(
+            limiter=limiter, breakers=breakers, api_url=api_url, batch_url=batch_url
+        )
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        operation, breaker = self._prepare(request)
+        self._begin()
+        try:
+            if self.limiter is not None:
+                self.limiter.acquire(operation, current_deadline())
+            response = self.transport.handle_request(request)
+        except BaseException as e:
+            self._end()
+            self._record(breaker, error=e)
+            raise
+        self._record(breaker, response)
+        response.stream = _TrackedStream(response.stream, self._end)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncPoolTransport(_PoolTransportBase, httpx.AsyncBaseTransport):
+    """Transport of the pooled async clients, wrapping the actual transport."""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        *,
+        limiter: RateLimiter | None = None,
+        breakers: CircuitBreakers | None = None,
+        api_url: str,
+        batch_url: str,
+    ):
+        """
+        :param transport: The transport sending the requests.
+        :param limiter:   Rate limiter to wait for before sending a request.
+        :param breakers:  Circuit breakers to check before sending a request.
+        :param api_url:   Base URL of the Google Wallet API.
+        :param batch_url: URL of the batch endpoint.
+        """
+        super().__init__(
+            limiter=limiter, breakers=breakers, api_url=api_url, batch_url=batch_url
+        )
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        operation, breaker = self._prepare(request)
+        self._begin()
+        try:
+            if self.limiter is not None:
+                await self.limiter.aacquire(operation, current_deadline())
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            self._end()
+            self._record(breaker, error=e)
+            raise
+        self._record(breaker, response)
+        response.stream = _AsyncTrackedStream(response.stream, self._end)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
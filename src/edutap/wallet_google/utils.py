@@ -107,6 +107,17 @@ def validate_data_and_convert_to_json(
 
 # Response handling utilities
 
+# Use word boundaries to avoid false positives like "accurate", "separate"
+_QUOTA_ERROR_RE = re.compile(r"\b(quota|rate limit|rate-limit)\b")
+
+
+def is_quota_error(response) -> bool:
+    """Check if a 403 response is about an exceeded quota.
+
+    :param response: HTTP response object (from requests or httpx)
+    """
+    return bool(_QUOTA_ERROR_RE.search(response.text.lower()))
+
 
 def handle_response_errors(
     response,
@@ -135,14 +146,14 @@ def handle_response_errors(
         return
 
     if response.status_code == 403:
-        response_lower = response.text.lower()
-        # Use word boundaries to avoid false positives like "accurate", "separate"
-        if re.search(r"\b(quota|rate limit|rate-limit)\b", response_lower):
+        if is_quota_error(response):
             raise QuotaExceededException(
-                f"Quota exceeded while trying to {operation} {name} {resource_id}"
+                f"Quota exceeded while trying to {operation} {name} {resource_id}",
+                status_code=403,
             )
         raise WalletException(
-            f"Access denied while trying to {operation} {name} {resource_id}: {response.text}"
+            f"Access denied while trying to {operation} {name} {resource_id}: {response.text}",
+            status_code=403,
         )
 
     elif response.status_code == 404:
@@ -152,9 +163,12 @@ def handle_response_errors(
         if allow_409:
             return
         raise ObjectAlreadyExistsException(
-            f"{name} {resource_id} already exists\n{response.text}"
+            f"{name} {resource_id} already exists\n{response.text}", status_code=409
         )
-    raise WalletException(f"Error: {response.status_code} - {response.text}")
+    raise WalletException(
+        f"Error: {response.status_code} - {response.text}",
+        status_code=response.status_code,
+    )
 
 
 def parse_response_json(
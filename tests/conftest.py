@@ -115,3 +115,26 @@ def mock_async_session(monkeypatch):
 @pytest.fixture
 def mock_fernet_encryption_key(mock_settings):
     mock_settings.fernet_encryption_key = "TDTPJVv24gha-jRX0apPgPpMDN2wX1kVSNNZdWXcz8E="
+
+
+@pytest.fixture
+def clock(request, monkeypatch):
+    """Let time pass only when the test advances it.
+
+    Patches ``time.monotonic``, shared by all modules of the package, so the
+    deadlines, caches, circuit breakers and credentials groups see the same time.
+    Starts at 100 seconds, parametrize the fixture indirectly for another start.
+    """
+    now = [getattr(request, "param", 100.0)]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def object_data():
+    """Return a function building the data of an active object of a test class."""
+
+    def build(object_id="test.object.123", class_id="test.class.123"):
+        return {"id": object_id, "classId": class_id, "state": "ACTIVE"}
+
+    return build
@@ -0,0 +1,219 @@
+"""Tests for multipart batch requests (api.batch / api.abatch)."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.batch import decode_batch_response
+from edutap.wallet_google.batch import encode_batch_request
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.exceptions import ObjectAlreadyExistsException
+from edutap.wallet_google.exceptions import WalletException
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import httpx
+import json
+import pytest
+import respx
+
+
+class StandInBatchServer:
+    """Speaks Google's multipart/mixed batch format, backed by a dict."""
+
+    def __init__(self):
+        self.objects = {
+            "test.object.existing": {"id": "test.object.existing", "classId": "c"}
+        }
+        self.batch_requests = 0
+
+    def handle_part(self, method, path, body):
+        parts = path.split("?")[0].split("/")[3:]
+        if method == "POST" and len(parts) == 1:
+            data = json.loads(body)
+            if data["id"] in self.objects:
+                return 409, {"error": {"code": 409, "message": "exists"}}
+            self.objects[data["id"]] = data
+            return 200, data
+        if len(parts) == 3 and parts[2] == "addMessage":
+            return 200, {"resource": self.objects[parts[1]]}
+        if parts[1] not in self.objects:
+            return 404, {"error": {"code": 404, "message": "not found"}}
+        if method == "PATCH":
+            self.objects[parts[1]].update(json.loads(body))
+        return 200, self.objects[parts[1]]
+
+    def __call__(self, request):
+        self.batch_requests += 1
+        head = f"Content-Type: {request.headers['Content-Type']}\r\n\r\n".encode()
+        message = BytesParser(policy=HTTP).parsebytes(head + request.content)
+        boundary = "response_boundary"
+        body = b""
+        for part in message.iter_parts():
+            http_request = part.get_payload(decode=True)
+            request_head, _, content = http_request.partition(b"\r\n\r\n")
+            method, path, _ = request_head.split(b"\r\n")[0].decode().split(" ")
+            status, data = self.handle_part(method, path, content)
+            content_id = part["Content-ID"].replace("<", "<response-")
+            body += (
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} Whatever\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(data)}\r\n"
+            ).encode()
+        body += f"--{boundary}--\r\n".encode()
+        return httpx.Response(
+            200,
+            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+            content=body,
+        )
+
+
+@respx.mock
+def test_batch(mock_session, object_data):
+    server = StandInBatchServer()
+    respx.post(str(client_pool.settings.batch_url)).mock(side_effect=server)
+
+    with api.batch(max_parts=2) as batch:
+        created = batch.create(api.new("GenericObject", object_data("test.object.new")))
+        conflict = batch.create(
+            api.new("GenericObject", object_data("test.object.existing"))
+        )
+        read = batch.read("GenericObject", "test.object.existing")
+        missing = batch.read("GenericObject", "test.object.missing")
+        updated = batch.update(
+            api.new("GenericObject", object_data("test.object.existing"))
+        )
+        messaged = batch.message(
+            "GenericObject", "test.object.new", {"header": "H", "body": "B"}
+        )
+        assert not created.done
+        with pytest.raises(RuntimeError):
+            created.result()
+
+    assert server.batch_requests == 3
+    assert created.result().id == "test.object.new"
+    assert isinstance(conflict.exception(), ObjectAlreadyExistsException)
+    with pytest.raises(ObjectAlreadyExistsException):
+        conflict.result()
+    assert read.result().id == "test.object.existing"
+    assert isinstance(missing.exception(), LookupError)
+    assert updated.result().state == "ACTIVE"
+    assert messaged.result().id == "test.object.new"
+
+
+@respx.mock
+def test_batch_not_executed_on_error(mock_session):
+    route = respx.post(str(client_pool.settings.batch_url))
+
+    with pytest.raises(KeyError):
+        with api.batch() as batch:
+            result = batch.read("GenericObject", "test.object.existing")
+            raise KeyError()
+
+    assert not route.called
+    assert not result.done
+
+
+@respx.mock
+def test_batch_outer_error_fails_all_calls(mock_session):
+    respx.post(str(client_pool.settings.batch_url)).mock(
+        return_value=httpx.Response(500, text="Backend Error")
+    )
+
+    with api.batch() as batch:
+        results = [batch.read("GenericObject", f"id.{num}") for num in range(3)]
+
+    for result in results:
+        assert isinstance(result.exception(), WalletException)
+
+
+@respx.mock
+def test_batch_transport_error_fails_its_calls(mock_session):
+    respx.post(str(client_pool.settings.batch_url)).mock(
+        side_effect=httpx.ConnectError("Connection refused")
+    )
+    batch = api.batch(max_parts=2)
+    results = [batch.read("GenericObject", f"id.{num}") for num in range(3)]
+
+    with pytest.raises(httpx.ConnectError):
+        batch.execute()
+
+    assert [type(result.exception()) for result in results[:2]] == [
+        httpx.ConnectError,
+        httpx.ConnectError,
+    ]
+    assert not results[2].done
+
+
+def test_batch_max_parts_out_of_range():
+    with pytest.raises(ValueError):
+        api.batch(max_parts=0)
+    with pytest.raises(ValueError):
+        api.batch(max_parts=1001)
+
+
+def test_encode_decode_roundtrip():
+    requests = [
+        httpx.Request("GET", "https://example.com/walletobjects/v1/a/b?fields=id"),
+        httpx.Request(
+            "POST",
+            "https://example.com/walletobjects/v1/a",
+            content=b'{"id": "b"}',
+            headers={"Content-Type": "application/json"},
+        ),
+    ]
+    body = encode_batch_request(requests, "xyz")
+    assert b"GET /walletobjects/v1/a/b?fields=id HTTP/1.1\r\n" in body
+    assert (
+        b'POST /walletobjects/v1/a HTTP/1.1\r\nContent-Type: application/json\r\n\r\n{"id": "b"}'
+        in body
+    )
+    assert body.endswith(b"--xyz--\r\n")
+
+    response = httpx.Response(
+        200,
+        headers={"Content-Type": 'multipart/mixed; boundary="b1"'},
+        content=(
+            b"--b1\r\nContent-Type: application/http\r\nContent-ID: <response-item1>\r\n\r\n"
+            b"HTTP/1.1 404 Not Found\r\nContent-Type: application/json\r\n\r\n{}\r\n"
+            b"--b1\r\nContent-Type: application/http\r\nContent-ID: <response-item0>\r\n\r\n"
+            b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{"id": "b"}\r\n'
+            b"--b1--\r\n"
+        ),
+    )
+    responses = decode_batch_response(response)
+    assert responses[0].status_code == 200
+    assert responses[0].json() == {"id": "b"}
+    assert responses[1].status_code == 404
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_abatch(mock_async_session, object_data):
+    server = StandInBatchServer()
+    respx.post(str(client_pool.settings.batch_url)).mock(side_effect=server)
+
+    async with api.abatch() as batch:
+        created = [
+            batch.create(api.new("GenericObject", object_data(f"test.object.{num}")))
+            for num in range(5)
+        ]
+        read = batch.read("GenericObject", "test.object.existing")
+
+    assert server.batch_requests == 1
+    assert [r.result().id for r in created] == [f"test.object.{n}" for n in range(5)]
+    assert read.result().id == "test.object.existing"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_abatch_transport_error_fails_its_calls(mock_async_session):
+    respx.post(str(client_pool.settings.batch_url)).mock(
+        side_effect=httpx.ConnectError("Connection refused")
+    )
+
+    with pytest.raises(httpx.ConnectError):
+        async with api.abatch() as batch:
+            result = batch.read("GenericObject", "id.1")
+
+    assert isinstance(result.exception(), httpx.ConnectError)
@@ -0,0 +1,193 @@
+"""Tests for the bulk API functions (create_many, update_many, message_many)."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.exceptions import ObjectAlreadyExistsException
+from edutap.wallet_google.exceptions import QuotaExceededException
+
+import asyncio
+import httpx
+import json
+import pytest
+import respx
+import threading
+import time
+
+
+def _echo(request):
+    """Return the posted object, answer 409 for ids ending with 3."""
+    data = json.loads(request.content)
+    if data["id"].endswith("3"):
+        return httpx.Response(409, json={"error": {"code": 409}})
+    return httpx.Response(200, json=data)
+
+
+@respx.mock
+def test_create_many_preserves_order_and_reports_errors(mock_session, object_data):
+    respx.post(client_pool.url("GenericObject")).mock(side_effect=_echo)
+
+    objects = (
+        api.new("GenericObject", object_data(f"test.object.{num}")) for num in range(12)
+    )
+    results = list(api.create_many(objects, concurrency=3))
+
+    assert len(results) == 12
+    for num, result in enumerate(results):
+        if num in (3,):
+            assert isinstance(result, ObjectAlreadyExistsException)
+        else:
+            assert result.id == f"test.object.{num}"
+
+
+@respx.mock
+def test_create_many_respects_concurrency(mock_session, object_data):
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def slow_echo(request):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return httpx.Response(200, json=json.loads(request.content))
+
+    respx.post(client_pool.url("GenericObject")).mock(side_effect=slow_echo)
+
+    objects = (
+        api.new("GenericObject", object_data(f"test.object.{num}")) for num in range(20)
+    )
+    results = list(api.create_many(objects, concurrency=4))
+
+    assert [r.id for r in results] == [f"test.object.{n}" for n in range(20)]
+    assert 1 < max_in_flight <= 4
+
+
+@respx.mock
+def test_update_many(mock_session):
+    object_ids = ["test.object.1", "test.object.2"]
+    for object_id in object_ids:
+        respx.patch(client_pool.url("GenericObject", f"/{object_id}")).mock(
+            return_value=httpx.Response(
+                200,
+                json={"id": object_id, "classId": "test.class.123", "state": "ACTIVE"},
+            )
+        )
+    respx.patch(client_pool.url("GenericObject", "/test.object.3")).mock(
+        return_value=httpx.Response(404, json={"error": {"code": 404}})
+    )
+    items = [
+        api.new("GenericObject", {"id": object_id, "classId": "test.class.123"})
+        for object_id in object_ids + ["test.object.3"]
+    ]
+
+    results = list(api.update_many(items, concurrency=2))
+
+    assert results[0].id == "test.object.1"
+    assert results[1].id == "test.object.2"
+    assert isinstance(results[2], LookupError)
+
+
+@respx.mock
+def test_message_many(mock_session):
+    respx.post(client_pool.url("GenericObject", "/test.object.1/addMessage")).mock(
+        return_value=httpx.Response(
+            200, json={"resource": {"id": "test.object.1", "classId": "c"}}
+        )
+    )
+    respx.post(client_pool.url("GenericObject", "/test.object.2/addMessage")).mock(
+        return_value=httpx.Response(
+            403, json={"error": {"code": 403, "message": "Quota exceeded"}}
+        )
+    )
+    msg = {"header": "Header", "body": "Body"}
+
+    results = list(
+        api.message_many(
+            "GenericObject", [("test.object.1", msg), ("test.object.2", msg)]
+        )
+    )
+
+    assert results[0].id == "test.object.1"
+    assert isinstance(results[1], QuotaExceededException)
+
+
+@pytest.mark.parametrize(
+    "many",
+    [
+        api.create_many,
+        api.update_many,
+        api.upsert_many,
+        api.acreate_many,
+        api.aupdate_many,
+        api.aupsert_many,
+    ],
+)
+def test_many_invalid_concurrency(many):
+    # raised when called, not when the returned generator is iterated
+    with pytest.raises(ValueError):
+        many([], concurrency=0)
+
+
+@pytest.mark.parametrize("many", [api.message_many, api.amessage_many])
+def test_message_many_invalid_concurrency(many):
+    with pytest.raises(ValueError):
+        many("GenericObject", [], concurrency=0)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_acreate_many_async_iterable(mock_async_session, object_data):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def slow_echo(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _echo(request)
+
+    respx.post(client_pool.url("GenericObject")).mock(side_effect=slow_echo)
+
+    async def items():
+        for num in range(10):
+            yield api.new("GenericObject", object_data(f"test.object.{num}"))
+
+    results = [r async for r in api.acreate_many(items(), concurrency=3)]
+
+    assert len(results) == 10
+    assert isinstance(results[3], ObjectAlreadyExistsException)
+    assert [r.id for n, r in enumerate(results) if n != 3] == [
+        f"test.object.{n}" for n in range(10) if n != 3
+    ]
+    assert 1 < max_in_flight <= 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aupdate_many_and_amessage_many(mock_async_session):
+    respx.patch(client_pool.url("GenericObject", "/test.object.1")).mock(
+        return_value=httpx.Response(200, json={"id": "test.object.1", "classId": "c"})
+    )
+    respx.post(client_pool.url("GenericObject", "/test.object.1/addMessage")).mock(
+        return_value=httpx.Response(
+            200, json={"resource": {"id": "test.object.1", "classId": "c"}}
+        )
+    )
+    item = api.new("GenericObject", {"id": "test.object.1", "classId": "c"})
+
+    updated = [r async for r in api.aupdate_many([item])]
+    messaged = [
+        r
+        async for r in api.amessage_many(
+            "GenericObject", [("test.object.1", {"header": "H", "body": "B"})]
+        )
+    ]
+
+    assert updated[0].id == "test.object.1"
+    assert messaged[0].id == "test.object.1"
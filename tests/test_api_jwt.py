@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import pytest
 
@@ -182,3 +183,135 @@ def test__convert_str_or_datetime_to_str__not_decimal():
 
     with pytest.raises(ValueError):
         _convert_str_or_datetime_to_str("x 100")
+
+
+def test_save_link_signing_key_cached(monkeypatch):
+    from edutap.wallet_google import api
+    from edutap.wallet_google.credentials import credentials_manager
+    from edutap.wallet_google.settings import ROOT_DIR
+    from joserfc.jwk import RSAKey
+
+    import json
+
+    credentials_file = ROOT_DIR / "tests" / "data" / "credentials_fake.json"
+    with open(credentials_file) as fd:
+        credentials = json.load(fd)
+    imports = []
+    import_key = RSAKey.import_key
+
+    def counting_import_key(*args, **kwargs):
+        imports.append(args[0])
+        return import_key(*args, **kwargs)
+
+    monkeypatch.setattr(RSAKey, "import_key", counting_import_key)
+    credentials_manager.clear_signing_keys()
+    reference = api.new(
+        "Reference",
+        {"id": "1234567890123456789.test-1.edutap.eu", "model_name": "GenericObject"},
+    )
+
+    links = {api.save_link([reference], credentials=credentials) for _ in range(3)}
+    assert len(imports) == 1
+    assert len(links) == 1
+
+    # a key rotated in place under the same key id is parsed again
+    rotated = {
+        **credentials,
+        "private_key": RSAKey.generate_key(2048).as_pem(private=True).decode(),
+    }
+    assert api.save_link([reference], credentials=rotated) not in links
+    assert len(imports) == 2
+    credentials_manager.clear_signing_keys()
+
+
+def test_save_links_in_order():
+    from edutap.wallet_google import api
+    from edutap.wallet_google.settings import ROOT_DIR
+
+    import json
+
+    credentials_file = ROOT_DIR / "tests" / "data" / "credentials_fake.json"
+    with open(credentials_file) as fd:
+        credentials = json.load(fd)
+    batches = [
+        [
+            api.new(
+                "Reference",
+                {
+                    "id": f"1234567890123456789.test-{num}.edutap.eu",
+                    "model_name": "GenericObject",
+                },
+            )
+        ]
+        for num in range(7)
+    ]
+
+    links = api.save_links(
+        iter(batches), credentials=credentials, workers=2, chunk_size=3
+    )
+
+    assert list(links) == [
+        api.save_link(models, credentials=credentials) for models in batches
+    ]
+
+
+def test_save_links_validation():
+    from edutap.wallet_google import api
+
+    # raised by the call, not when the links are iterated
+    with pytest.raises(ValueError):
+        api.save_links([], workers=0)
+    with pytest.raises(ValueError):
+        api.save_links([], chunk_size=0)
+
+
+def _fake_credentials():
+    from edutap.wallet_google.settings import ROOT_DIR
+
+    import json
+
+    with open(ROOT_DIR / "tests" / "data" / "credentials_fake.json") as fd:
+        return json.load(fd)
+
+
+def _reference():
+    from edutap.wallet_google import api
+
+    return api.new(
+        "Reference",
+        {"id": "1234567890123456789.test-1.edutap.eu", "model_name": "GenericObject"},
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor", ["thread", "process"])
+async def test_asave_link(mock_settings, monkeypatch, executor):
+    from edutap.wallet_google import api
+
+    monkeypatch.setattr(api, "_link_executor", None)
+    mock_settings.save_link_executor = executor
+    mock_settings.save_link_workers = 2
+    credentials = _fake_credentials()
+
+    links = await asyncio.gather(
+        *(api.asave_link([_reference()], credentials=credentials) for _ in range(3))
+    )
+
+    expected = api.save_link([_reference()], credentials=credentials)
+    assert links == [expected] * 3
+    assert type(api._link_executor).__name__ == f"{executor.title()}PoolExecutor"
+    api._link_executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_asave_link_executor():
+    from concurrent.futures import ThreadPoolExecutor
+    from edutap.wallet_google import api
+
+    credentials = _fake_credentials()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="signer") as executor:
+        link = await api.asave_link(
+            [_reference()], credentials=credentials, executor=executor
+        )
+
+    assert link == api.save_link([_reference()], credentials=credentials)
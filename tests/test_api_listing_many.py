@@ -0,0 +1,142 @@
+"""Tests for the concurrent listing of many classes (api.alisting_many)."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.ratelimit import TokenBucket
+
+import asyncio
+import httpx
+import pytest
+import respx
+
+
+class StandInListingServer:
+    """Answers object listings with two pages per class, 404 for missing classes."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        class_id = request.url.params["classId"]
+        if class_id.startswith("missing"):
+            return httpx.Response(404, json={"error": {"code": 404}})
+        page = int(request.url.params.get("token", "0"))
+        data = {
+            "resources": [
+                {"id": f"{class_id}.object.{page}.{num}", "classId": class_id}
+                for num in range(2)
+            ],
+            "pagination": {"resultsPerPage": 2},
+        }
+        if page == 0:
+            data["pagination"]["nextPageToken"] = "1"
+        return httpx.Response(200, json=data)
+
+
+@pytest.fixture
+def listing_server():
+    server = StandInListingServer(delay=0.01)
+    with respx.mock:
+        respx.get(client_pool.url("GenericObject")).mock(side_effect=server)
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_alisting_many(mock_async_session, listing_server):
+    class_ids = [f"test.class.{num}" for num in range(6)]
+
+    results = [
+        item
+        async for item in api.alisting_many(
+            "GenericObject", class_ids, concurrency=3, page_size=2
+        )
+    ]
+
+    assert len(results) == 24
+    assert listing_server.max_in_flight == 3
+    for class_id in class_ids:
+        objects = [obj.id for tag, obj in results if tag == class_id]
+        assert objects == [
+            f"{class_id}.object.{page}.{num}" for page in range(2) for num in range(2)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_alisting_many_failed_class(mock_async_session, listing_server):
+    async def class_ids():
+        yield "test.class.0"
+        yield "missing.class"
+        yield "test.class.1"
+
+    results = [item async for item in api.alisting_many("GenericObject", class_ids())]
+
+    failed = [(tag, obj) for tag, obj in results if isinstance(obj, Exception)]
+    assert len(failed) == 1
+    assert failed[0][0] == "missing.class"
+    assert isinstance(failed[0][1], LookupError)
+    assert len(results) == 9
+
+
+@pytest.mark.asyncio
+async def test_alisting_many_shared_rate(mock_async_session, listing_server):
+    bucket = TokenBucket(rate=1, burst=4)
+
+    results = [
+        item
+        async for item in api.alisting_many(
+            "GenericObject", ["test.class.0", "test.class.1"], rate=bucket
+        )
+    ]
+
+    assert len(results) == 8
+    # four page requests were paid from the shared budget
+    assert bucket.tokens < 1
+
+
+@pytest.mark.asyncio
+async def test_alisting_many_stops_workers_on_close(mock_async_session, listing_server):
+    listing = api.alisting_many(
+        "GenericObject", [f"test.class.{num}" for num in range(100)], concurrency=2
+    )
+    await anext(listing)
+    await listing.aclose()
+    requests = listing_server.requests
+    await asyncio.sleep(0.05)
+
+    assert listing_server.in_flight == 0
+    assert listing_server.requests == requests
+
+
+def test_alisting_many_invalid_input():
+    with pytest.raises(ValueError):
+        api.alisting_many("GenericClass", ["test.class.0"])
+    with pytest.raises(ValueError):
+        api.alisting_many("GenericObject", ["test.class.0"], concurrency=0)
+
+
+def test_token_bucket(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("edutap.wallet_google.ratelimit.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+    now[0] += 0.2
+    assert bucket.tokens == pytest.approx(0)
+    now[0] += 10
+    assert bucket.tokens == 2
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
@@ -10,6 +10,7 @@ from edutap.wallet_google.clientpool import client_pool
 from edutap.wallet_google.models.datatypes import enums
 from edutap.wallet_google.models.passes import GenericClass
 from edutap.wallet_google.models.passes import GenericObject
+from pydantic import ValidationError
 
 import httpx
 import pytest
@@ -279,6 +280,31 @@ def test_listing_empty_result(mock_session):
     assert len(results) == 0
 
 
+@respx.mock
+def test_listing_invalid_record(mock_session):
+    """Test listing raises when a record of the page does not validate."""
+    name = "GenericObject"
+    class_id = "test.class.123"
+    url = client_pool.url(name)
+
+    respx.get(url).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "resources": [
+                    {"id": "obj1", "classId": class_id},
+                    {"id": "obj2", "classId": class_id, "unknownField": 1},
+                ]
+            },
+        )
+    )
+
+    with pytest.raises(ValidationError) as excinfo:
+        list(listing(name, resource_id=class_id))
+
+    assert excinfo.value.errors()[0]["loc"] == ("resources", 1, "unknownField")
+
+
 @respx.mock
 def test_listing_with_pagination_token(mock_session):
     """Test listing returns pagination token when result_per_page is set."""
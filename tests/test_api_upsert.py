@@ -0,0 +1,141 @@
+"""Tests for upsert (create or update) API functions."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.exceptions import QuotaExceededException
+
+import httpx
+import pytest
+import respx
+
+
+OBJECT_ID = "test.object.123"
+
+
+@respx.mock
+def test_upsert_creates(mock_session, object_data):
+    create = respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+    update = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}"))
+
+    result = api.upsert(api.new("GenericObject", object_data()))
+
+    assert result.id == OBJECT_ID
+    assert create.call_count == 1
+    assert not update.called
+
+
+@respx.mock
+def test_upsert_updates_on_409(mock_session, object_data):
+    create = respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(409, json={"error": {"code": 409}})
+    )
+    update = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    result = api.upsert(api.new("GenericObject", object_data()))
+
+    assert result.id == OBJECT_ID
+    assert create.call_count == 1
+    assert update.call_count == 1
+
+
+@respx.mock
+def test_upsert_update_first(mock_session, object_data):
+    create = respx.post(client_pool.url("GenericObject"))
+    update = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    result = api.upsert(api.new("GenericObject", object_data()), update_first=True)
+
+    assert result.id == OBJECT_ID
+    assert update.call_count == 1
+    assert not create.called
+
+
+@respx.mock
+def test_upsert_update_first_creates_on_404(mock_session, object_data):
+    create = respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+    update = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(404, json={"error": {"code": 404}})
+    )
+
+    result = api.upsert(api.new("GenericObject", object_data()), update_first=True)
+
+    assert result.id == OBJECT_ID
+    assert update.call_count == 1
+    assert create.call_count == 1
+
+
+@respx.mock
+def test_upsert_errors_propagate(mock_session, object_data):
+    respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(403, text="Quota exceeded")
+    )
+
+    with pytest.raises(QuotaExceededException):
+        api.upsert(api.new("GenericObject", object_data()))
+
+
+@respx.mock
+def test_upsert_many(mock_session, object_data):
+    respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(409, json={"error": {"code": 409}})
+    )
+    respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    results = list(
+        api.upsert_many(
+            [
+                api.new("GenericObject", object_data()),
+                api.new("GenericObject", object_data()),
+            ],
+            concurrency=2,
+        )
+    )
+
+    assert [r.id for r in results] == [OBJECT_ID, OBJECT_ID]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aupsert(mock_async_session, object_data):
+    create = respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(409, json={"error": {"code": 409}})
+    )
+    update = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    result = await api.aupsert(api.new("GenericObject", object_data()))
+
+    assert result.id == OBJECT_ID
+    assert create.call_count == 1
+    assert update.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aupsert_update_first_creates_on_404(mock_async_session, object_data):
+    respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+    respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(404, json={"error": {"code": 404}})
+    )
+
+    results = [
+        r
+        async for r in api.aupsert_many(
+            [api.new("GenericObject", object_data())], update_first=True
+        )
+    ]
+
+    assert results[0].id == OBJECT_ID
@@ -0,0 +1,312 @@
+"""Tests for the read-through cache and read coalescing."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.cache import AsyncSingleFlight
+from edutap.wallet_google.cache import read_cache
+from edutap.wallet_google.cache import read_flights
+from edutap.wallet_google.cache import ReadCache
+from edutap.wallet_google.clientpool import client_pool
+
+import asyncio
+import httpx
+import pytest
+import respx
+
+
+CLASS_ID = "test.class.123"
+
+
+@pytest.fixture
+def enabled_read_cache(monkeypatch):
+    monkeypatch.setattr(read_cache, "maxsize", 10)
+    read_cache.clear()
+    yield read_cache
+    read_cache.clear()
+
+
+def test_cache_lru_eviction():
+    cache = ReadCache(maxsize=2)
+    keys = [("creds", "GenericClass", f"id{num}", None) for num in range(3)]
+    for key in keys:
+        cache.put(key, key[2])
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) == "id1"
+    assert cache.get(keys[2]) == "id2"
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "expirations": 0,
+        "size": 2,
+    }
+
+
+def test_cache_lru_recently_used_survives():
+    cache = ReadCache(maxsize=2)
+    keys = [("creds", "GenericClass", f"id{num}", None) for num in range(3)]
+    cache.put(keys[0], "id0")
+    cache.put(keys[1], "id1")
+    assert cache.get(keys[0]) == "id0"
+    cache.put(keys[2], "id2")
+    assert cache.get(keys[0]) == "id0"
+    assert cache.get(keys[1]) is None
+
+
+def test_cache_ttl_per_model(clock):
+    cache = ReadCache(maxsize=10, ttl=10, ttls={"GenericObject": 1})
+    class_key = ("creds", "GenericClass", "id", None)
+    object_key = ("creds", "GenericObject", "id", None)
+    cache.put(class_key, "class")
+    cache.put(object_key, "object")
+
+    clock[0] += 5
+    assert cache.get(class_key) == "class"
+    assert cache.get(object_key) is None
+    assert cache.stats()["expirations"] == 1
+
+    clock[0] += 5
+    assert cache.get(class_key) is None
+
+
+def test_cache_disabled_by_ttl_zero():
+    cache = ReadCache(maxsize=10, ttls={"GenericObject": 0})
+    assert cache.key(None, "GenericObject", "id") is None
+    assert cache.key(None, "GenericClass", "id") is not None
+
+
+def test_cache_disabled_by_default():
+    cache = ReadCache()
+    assert not cache.enabled
+    assert cache.key(None, "GenericClass", "id") is None
+
+
+def test_cache_written_drops_entries_of_resource():
+    cache = ReadCache(maxsize=10)
+    key = cache.key(None, "GenericClass", "id")
+    partial_key = cache.key(None, "GenericClass", "id", "id")
+    other_key = cache.key(None, "GenericClass", "other")
+    for k in (key, partial_key, other_key):
+        cache.put(k, k[2])
+
+    cache.written(None, "GenericClass", "id", "new")
+
+    assert cache.get(key) == "new"
+    assert cache.get(partial_key) is None
+    assert cache.get(other_key) == "other"
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_read_overtaken_by_write_not_stored():
+    cache = ReadCache(maxsize=10)
+    key = cache.key(None, "GenericClass", "id")
+    generation = cache.generation(key)
+
+    cache.written(None, "GenericClass", "id")
+    cache.put(key, "stale", generation)
+    assert cache.get(key) is None
+
+    cache.put(key, "fresh", cache.generation(key))
+    assert cache.get(key) == "fresh"
+
+
+def test_cache_read_overtaken_by_forgotten_write_not_stored():
+    cache = ReadCache(maxsize=2)
+    key = cache.key(None, "GenericClass", "id")
+    generation = cache.generation(key)
+
+    for resource_id in ("id", "a", "b", "c"):
+        cache.written(None, "GenericClass", resource_id)
+    cache.put(key, "stale", generation)
+
+    assert cache.get(key) is None
+
+
+@respx.mock
+def test_read_uses_cache(mock_session, enabled_read_cache):
+    route = respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+
+    first = api.read("GenericClass", CLASS_ID)
+    second = api.read("GenericClass", CLASS_ID)
+    partial = api.read("GenericClass", CLASS_ID, fields=["id"])
+
+    assert first is second
+    assert partial is not first
+    assert route.call_count == 2
+    assert enabled_read_cache.stats()["hits"] == 1
+    assert enabled_read_cache.stats()["misses"] == 2
+
+
+@respx.mock
+def test_update_refreshes_cache(mock_session, enabled_read_cache):
+    read_route = respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+    respx.patch(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID, "enableSmartTap": True})
+    )
+
+    api.read("GenericClass", CLASS_ID)
+    api.read("GenericClass", CLASS_ID, fields=["id"])
+    updated = api.update(api.new("GenericClass", {"id": CLASS_ID}))
+
+    assert enabled_read_cache.stats()["size"] == 1
+    assert api.read("GenericClass", CLASS_ID) is updated
+    assert read_route.call_count == 2
+
+
+@respx.mock
+def test_partial_update_invalidates_cache(mock_session, enabled_read_cache):
+    read_route = respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+    respx.patch(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+
+    api.read("GenericClass", CLASS_ID)
+    api.update(api.new("GenericClass", {"id": CLASS_ID}), fields=["id"])
+    api.read("GenericClass", CLASS_ID)
+
+    assert read_route.call_count == 2
+
+
+@respx.mock
+def test_message_refreshes_cache(mock_session, enabled_read_cache):
+    object_id = "test.object.1"
+    read_route = respx.get(client_pool.url("GenericObject", f"/{object_id}")).mock(
+        return_value=httpx.Response(200, json={"id": object_id, "classId": CLASS_ID})
+    )
+    respx.post(client_pool.url("GenericObject", f"/{object_id}/addMessage")).mock(
+        return_value=httpx.Response(
+            200, json={"resource": {"id": object_id, "classId": CLASS_ID}}
+        )
+    )
+
+    api.read("GenericObject", object_id)
+    messaged = api.message("GenericObject", object_id, {"header": "H", "body": "B"})
+
+    assert api.read("GenericObject", object_id) is messaged
+    assert read_route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aread_uses_cache(mock_async_session, enabled_read_cache):
+    route = respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+    respx.post(client_pool.url("GenericClass")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+
+    first = await api.aread("GenericClass", CLASS_ID)
+    assert await api.aread("GenericClass", CLASS_ID) is first
+    created = await api.acreate(api.new("GenericClass", {"id": CLASS_ID}))
+    assert await api.aread("GenericClass", CLASS_ID) is created
+    assert route.call_count == 1
+
+
+@pytest.fixture
+def slow_class_route():
+    async def slow_response(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"id": CLASS_ID})
+
+    with respx.mock:
+        yield respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+            side_effect=slow_response
+        )
+
+
+@pytest.mark.asyncio
+async def test_aread_coalesces_concurrent_reads(mock_async_session, slow_class_route):
+    results = await asyncio.gather(
+        *(api.aread("GenericClass", CLASS_ID) for _ in range(50))
+    )
+
+    assert slow_class_route.call_count == 1
+    assert all(result is results[0] for result in results)
+    assert read_flights.in_flight() == 0
+
+    await api.aread("GenericClass", CLASS_ID)
+    assert slow_class_route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_aread_coalescing_distinguishes_fields(
+    mock_async_session, slow_class_route
+):
+    await asyncio.gather(
+        api.aread("GenericClass", CLASS_ID),
+        api.aread("GenericClass", CLASS_ID, fields=["id"]),
+    )
+
+    assert slow_class_route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_aread_coalescing_disabled(
+    mock_async_session, slow_class_route, mock_settings
+):
+    mock_settings.read_coalescing = False
+
+    await asyncio.gather(*(api.aread("GenericClass", CLASS_ID) for _ in range(3)))
+
+    assert slow_class_route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aread_coalesced_error_propagates(mock_async_session):
+    async def not_found(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(404, json={"error": {"code": 404}})
+
+    route = respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        side_effect=not_found
+    )
+
+    results = await asyncio.gather(
+        *(api.aread("GenericClass", CLASS_ID) for _ in range(5)),
+        return_exceptions=True,
+    )
+
+    assert route.call_count == 1
+    assert all(isinstance(result, LookupError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_aread_cancelled_waiter_does_not_cancel_fetch(
+    mock_async_session, slow_class_route
+):
+    first = asyncio.ensure_future(api.aread("GenericClass", CLASS_ID))
+    second = asyncio.ensure_future(api.aread("GenericClass", CLASS_ID))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    result = await second
+
+    assert first.cancelled()
+    assert result.id == CLASS_ID
+    assert slow_class_route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_all_waiters_cancelled():
+    flights = AsyncSingleFlight()
+    finished = asyncio.Event()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        finished.set()
+        raise ValueError("nobody listens")
+
+    waiter = asyncio.ensure_future(flights.do("key", work))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await finished.wait()
+    await asyncio.sleep(0)
+
+    assert flights.in_flight() == 0
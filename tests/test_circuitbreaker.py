@@ -0,0 +1,223 @@
+"""Tests for the circuit breakers of the pooled clients."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.circuitbreaker import CircuitBreaker
+from edutap.wallet_google.circuitbreaker import CircuitBreakers
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.clientpool import ClientPoolManager
+from edutap.wallet_google.exceptions import CircuitOpenException
+from edutap.wallet_google.exceptions import WalletException
+from edutap.wallet_google.settings import API_URL
+from edutap.wallet_google.settings import BATCH_URL
+from edutap.wallet_google.transports import AsyncPoolTransport
+from edutap.wallet_google.transports import endpoint_of
+from edutap.wallet_google.transports import PoolTransport
+
+import httpx
+import json
+import pytest
+import respx
+
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+
+class StandInEndpoint:
+    """Answers with the given status codes, then 200."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.requests = 0
+
+    def __call__(self, request):
+        self.requests += 1
+        if self.statuses:
+            status = self.statuses.pop(0)
+            if isinstance(status, Exception):
+                raise status
+            return httpx.Response(status)
+        return httpx.Response(200, json={})
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("read genericObject", threshold=3, cooldown=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenException, match="read genericObject"):
+        breaker.before_request()
+    assert breaker.stats() == {"state": "open", "failures": 3, "retry_in": 10.0}
+
+
+def test_breaker_probe(clock):
+    breaker = CircuitBreaker("read genericObject", threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+
+    breaker.before_request()
+    assert breaker.state == "half-open"
+    # only one probe at a time
+    with pytest.raises(CircuitOpenException):
+        breaker.before_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] += 5
+    with pytest.raises(CircuitOpenException):
+        breaker.before_request()
+
+    clock[0] += 5
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_breaker_aborted_probe(clock):
+    breaker = CircuitBreaker("read genericObject", threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_request()
+
+    breaker.release()
+
+    assert breaker.state == "open"
+    breaker.before_request()
+    assert breaker.state == "half-open"
+
+
+def test_breaker_late_failure_keeps_cooldown(clock):
+    breaker = CircuitBreaker("read genericObject", threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 6
+    breaker.record_failure()
+    clock[0] += 4
+
+    breaker.before_request()
+
+    assert breaker.state == "half-open"
+
+
+@pytest.mark.parametrize(
+    "method,url,expected",
+    [
+        ("GET", f"{API_URL}/genericObject?classId=c", ("genericObject", "list")),
+        ("GET", f"{API_URL}/genericObject/o1", ("genericObject", "read")),
+        ("POST", f"{API_URL}/genericClass", ("genericClass", "create")),
+        ("PATCH", f"{API_URL}/genericClass/c1", ("genericClass", "update")),
+        (
+            "POST",
+            f"{API_URL}/genericObject/o1/addMessage",
+            ("genericObject", "message"),
+        ),
+        ("POST", BATCH_URL, ("batch", "batch")),
+        ("POST", TOKEN_URL, None),
+    ],
+)
+def test_endpoint_of(method, url, expected):
+    assert endpoint_of(httpx.Request(method, url), API_URL, BATCH_URL) == expected
+
+
+def test_transport_fails_fast(clock):
+    endpoint = StandInEndpoint(503, httpx.ConnectError("Connection refused"))
+    breakers = CircuitBreakers(threshold=2, cooldown=10)
+    transport = PoolTransport(
+        httpx.MockTransport(endpoint),
+        breakers=breakers,
+        api_url=API_URL,
+        batch_url=BATCH_URL,
+    )
+    with httpx.Client(transport=transport) as client:
+        assert client.get(f"{API_URL}/genericObject/o1").status_code == 503
+        with pytest.raises(httpx.ConnectError):
+            client.get(f"{API_URL}/genericObject/o1")
+        with pytest.raises(CircuitOpenException):
+            client.get(f"{API_URL}/genericObject/o1")
+        # other endpoints are not affected
+        assert client.get(f"{API_URL}/genericObject").status_code == 200
+
+        clock[0] += 10
+        assert client.get(f"{API_URL}/genericObject/o1").status_code == 200
+
+    assert endpoint.requests == 4
+    assert [(state["operation"], state["state"]) for state in breakers.states()] == [
+        ("read", "closed"),
+        ("list", "closed"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_transport_fails_fast(clock):
+    endpoint = StandInEndpoint(500, 502)
+    breakers = CircuitBreakers(threshold=2, cooldown=10)
+    transport = AsyncPoolTransport(
+        httpx.MockTransport(endpoint),
+        breakers=breakers,
+        api_url=API_URL,
+        batch_url=BATCH_URL,
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(2):
+            await client.post(f"{API_URL}/genericObject")
+        with pytest.raises(CircuitOpenException):
+            await client.post(f"{API_URL}/genericObject")
+
+    assert endpoint.requests == 2
+    (state,) = breakers.states()
+    assert state["state"] == "open"
+
+
+@respx.mock
+def test_client_pool_circuit_breaker(clock, mock_settings, monkeypatch):
+    mock_settings.circuit_breaker_threshold = 2
+    respx.post(TOKEN_URL).mock(
+        return_value=httpx.Response(
+            200, json={"access_token": "token", "expires_in": 3600}
+        )
+    )
+    route = respx.get(client_pool.url("GenericObject", "/o1")).mock(
+        return_value=httpx.Response(503, text="Service unavailable")
+    )
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    monkeypatch.setattr("edutap.wallet_google.api.client_pool", manager)
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    for _ in range(2):
+        with pytest.raises(WalletException, match="503"):
+            api.read("GenericObject", "o1", credentials=credentials)
+    with pytest.raises(CircuitOpenException):
+        api.read("GenericObject", "o1", credentials=credentials)
+    manager.close_all_clients()
+
+    assert route.call_count == 2
+    (state,) = manager.circuit_breaker_states()
+    assert state == {
+        "credentials": manager._get_credentials_key(credentials),
+        "url_part": "genericObject",
+        "operation": "read",
+        "state": "open",
+        "failures": 2,
+        "retry_in": 30.0,
+    }
+
+
+def test_client_pool_without_circuit_breaker(mock_settings):
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    client = manager.client(credentials)
+    manager.close_all_clients()
+
+    assert client._transport.breakers is None
+    assert manager.circuit_breaker_states() == []
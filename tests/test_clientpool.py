@@ -1,6 +1,7 @@
 from edutap.wallet_google.settings import ROOT_DIR
 
 import pytest
+import respx
 
 
 def test_client_pool_url(
@@ -40,6 +41,7 @@ def test_client_pool_url(
 
 
 def test_client_creation(monkeypatch):
+    from authlib.integrations.httpx_client import AssertionClient
     from edutap.wallet_google.clientpool import ClientPoolManager
     from edutap.wallet_google.credentials import credentials_manager
 
@@ -70,9 +72,487 @@ def test_client_creation(monkeypatch):
     assert client is not None
     assert manager.settings.credentials_file is not None
     # With httpx/authlib AssertionClient, verify the client was created successfully
-    assert client.__class__.__name__ == "AssertionClient"
+    assert isinstance(client, AssertionClient)
 
     # Each call to client() now returns the SAME cached client (for connection pooling)
     client2 = manager.client()
     assert client2 is not None
     assert client2 is client  # Same instance (cached)
+
+
+def test_client_connection_settings(mock_settings):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import json
+
+    mock_settings.http_max_connections = 50
+    mock_settings.http_max_keepalive_connections = 10
+    mock_settings.http_keepalive_expiry = 30.0
+    mock_settings.http_timeout_read = 20.0
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    client = manager.client(credentials)
+    manager.close_all_clients()
+
+    pool = client._transport.transport._pool
+    assert pool._max_connections == 50
+    assert pool._max_keepalive_connections == 10
+    assert pool._keepalive_expiry == 30.0
+    assert pool._http2 is False
+    assert client.timeout.read == 20.0
+    assert client.timeout.connect == 5.0
+
+
+@pytest.mark.asyncio
+async def test_async_client_http2(mock_settings):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import json
+    import sys
+
+    pytest.importorskip("h2")
+    mock_settings.http2 = True
+    mock_settings.http_max_connections = None
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    client = manager.async_client(credentials)
+    await manager.aclose_all_clients()
+
+    pool = client._transport.transport._pool
+    assert pool._http2 is True
+    assert pool._max_connections == sys.maxsize
+
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+
+@pytest.fixture
+def token_route():
+    import httpx
+    import respx
+
+    with respx.mock:
+        yield respx.post(TOKEN_URL).mock(
+            return_value=httpx.Response(
+                200, json={"access_token": "token", "expires_in": 3600}
+            )
+        )
+
+
+@pytest.fixture
+def closed_transports(monkeypatch):
+    """Record the pool transports closed."""
+    from edutap.wallet_google.transports import AsyncPoolTransport
+    from edutap.wallet_google.transports import PoolTransport
+
+    closed = []
+    close = PoolTransport.close
+    aclose = AsyncPoolTransport.aclose
+
+    def record_close(self):
+        closed.append(self)
+        close(self)
+
+    async def record_aclose(self):
+        closed.append(self)
+        await aclose(self)
+
+    monkeypatch.setattr(PoolTransport, "close", record_close)
+    monkeypatch.setattr(AsyncPoolTransport, "aclose", record_aclose)
+    return closed
+
+
+def _credentials(settings, key_id=None):
+    import json
+
+    with open(settings.credentials_file) as file:
+        credentials = json.load(file)
+    if key_id:
+        credentials["private_key_id"] = key_id
+    return credentials
+
+
+def test_warmup(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    credentials = [_credentials(mock_settings), _credentials(mock_settings, "key2")]
+
+    assert manager.warmup(credentials) == 2
+    assert manager.warmup(credentials) == 0
+    manager.close_all_clients()
+
+    assert token_route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_awarmup(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    credentials = _credentials(mock_settings)
+
+    assert await manager.awarmup([credentials]) == 1
+    client = manager.async_client(credentials)
+    await manager.aclose_all_clients()
+
+    assert client.token["access_token"] == "token"
+    assert token_route.call_count == 1
+
+
+def test_refresh_due_tokens(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import time
+
+    mock_settings.token_refresh_margin = 300
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    soon = manager.client(_credentials(mock_settings))
+    later = manager.client(_credentials(mock_settings, "key2"))
+    soon.token = {"access_token": "old", "expires_at": int(time.time()) + 200}
+    later.token = {"access_token": "old", "expires_at": int(time.time()) + 400}
+
+    assert manager.refresh_due_tokens() == 1
+    manager.close_all_clients()
+
+    assert soon.token["access_token"] == "token"
+    assert later.token["access_token"] == "old"
+
+
+def test_refresh_due_tokens_failure_logged(mock_settings, token_route, caplog):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import httpx
+
+    token_route.mock(return_value=httpx.Response(500, json={"error": "internal"}))
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    manager.client(_credentials(mock_settings))
+
+    assert manager.refresh_due_tokens() == 0
+    manager.close_all_clients()
+
+    assert "Renewing the access token" in caplog.text
+
+
+def test_token_refresher(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import time
+
+    mock_settings.token_refresh_interval = 0.01
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    client = manager.client(_credentials(mock_settings))
+
+    manager.start_token_refresher()
+    manager.start_token_refresher()
+    for _ in range(200):
+        if client.token:
+            break
+        time.sleep(0.01)
+    manager.close_all_clients()
+
+    assert client.token["access_token"] == "token"
+    assert token_route.call_count == 1
+    assert manager._refresher is None
+
+
+@pytest.mark.asyncio
+async def test_async_token_refresher(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import asyncio
+
+    mock_settings.token_refresh_interval = 0.01
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    client = manager.async_client(_credentials(mock_settings))
+
+    task = manager.start_async_token_refresher()
+    assert manager.start_async_token_refresher() is task
+    for _ in range(200):
+        if client.token:
+            break
+        await asyncio.sleep(0.01)
+    await manager.aclose_all_clients()
+
+    assert client.token["access_token"] == "token"
+    assert task.cancelled()
+
+
+def test_async_clients_per_event_loop(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import asyncio
+    import threading
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    credentials = _credentials(mock_settings)
+    clients = {}
+
+    async def use(name):
+        client = manager.async_client(credentials)
+        assert manager.async_client(credentials) is client
+        await client.refresh_token()
+        clients[name] = client
+
+    threads = [threading.Thread(target=asyncio.run, args=(use(name),)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert clients["a"] is not clients["b"]
+    # the clients of all loops share one token
+    assert token_route.call_count == 1
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(use("c"))
+    assert len(manager._async_clients) == 1
+    loop.close()
+
+    asyncio.run(use("d"))
+
+    assert clients["d"] is not clients["c"]
+    assert loop not in manager._async_clients
+
+
+@pytest.mark.asyncio
+async def test_aclose_loop_clients(mock_settings):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import asyncio
+    import threading
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    credentials = _credentials(mock_settings)
+    others = []
+
+    async def create():
+        others.append(manager.async_client(credentials))
+
+    thread = threading.Thread(target=asyncio.run, args=(create(),))
+    thread.start()
+    thread.join()
+    client = manager.async_client(credentials)
+
+    await manager.aclose_loop_clients()
+
+    assert client.is_closed
+    assert not others[0].is_closed
+    assert manager.async_client(credentials) is not client
+    await manager.aclose_all_clients()
+
+
+def test_async_client_without_event_loop(mock_settings):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+
+    with pytest.raises(RuntimeError):
+        manager.async_client(_credentials(mock_settings))
+
+
+def test_client_created_once_concurrently(mock_settings, monkeypatch):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import threading
+    import time
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    credentials = _credentials(mock_settings)
+    create = manager._create_client
+
+    def slow_create(*args):
+        time.sleep(0.05)
+        return create(*args)
+
+    monkeypatch.setattr(manager, "_create_client", slow_create)
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(manager.client(credentials)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    manager.close_all_clients()
+
+    assert len({id(client) for client in clients}) == 1
+    assert manager.pool_stats()["sync"]["misses"] == 1
+
+
+def test_client_pool_evicts_least_recently_used(mock_settings, closed_transports):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import gc
+
+    mock_settings.client_pool_max_clients = 2
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    a, b, c = (_credentials(mock_settings, key_id) for key_id in "abc")
+
+    client_a = manager.client(a)
+    client_b = manager.client(b)
+    assert manager.client(a) is client_a
+    manager.client(c)
+
+    assert manager.client(a) is client_a
+    stats = manager.pool_stats()["sync"]
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["misses"] == 3
+    assert stats["retired"] == 1
+    # closed once no longer referenced
+    transport_b = client_b._transport
+    gc.collect()
+    assert transport_b not in closed_transports
+    del client_b
+    gc.collect()
+    assert transport_b in closed_transports
+    assert manager.pool_stats()["sync"]["retired"] == 0
+    manager.close_all_clients()
+    assert client_a.is_closed
+
+
+@respx.mock
+def test_evicted_client_still_usable(mock_settings, token_route):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import httpx
+
+    mock_settings.client_pool_max_clients = 1
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    url = manager.settings.api_url
+    route = respx.get(f"{url}/genericObject").mock(
+        return_value=httpx.Response(200, json={"resources": []})
+    )
+    a, b = (_credentials(mock_settings, key_id) for key_id in "ab")
+
+    client_a = manager.client(a)
+    manager.client(b)
+
+    assert client_a.get(f"{url}/genericObject").json() == {"resources": []}
+    assert route.call_count == 1
+    manager.close_all_clients()
+
+
+def test_client_pool_evicts_idle(mock_settings, monkeypatch, closed_transports):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import gc
+
+    now = [100.0]
+    monkeypatch.setattr(
+        "edutap.wallet_google.clientcache.time.monotonic", lambda: now[0]
+    )
+    mock_settings.client_pool_idle_timeout = 60
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    a, b = (_credentials(mock_settings, key_id) for key_id in "ab")
+
+    transport_a = manager.client(a)._transport
+    now[0] += 50
+    client_b = manager.client(b)
+    now[0] += 20
+    manager.client(b)
+    gc.collect()
+
+    assert transport_a in closed_transports
+    assert not client_b.is_closed
+    assert manager.pool_stats()["sync"]["idle_evictions"] == 1
+    manager.close_all_clients()
+
+
+def test_evicted_client_closed_after_its_requests(
+    mock_settings, token_route, closed_transports
+):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import gc
+    import httpx
+    import respx
+
+    mock_settings.client_pool_max_clients = 1
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    url = manager.settings.api_url
+    respx.get(f"{url}/genericObject").mock(
+        return_value=httpx.Response(200, json={"resources": []})
+    )
+    a, b = (_credentials(mock_settings, key_id) for key_id in "ab")
+
+    client = manager.client(a)
+    transport = client._transport
+    with client.stream("GET", f"{url}/genericObject") as response:
+        manager.client(b)
+        del client
+        gc.collect()
+        assert transport not in closed_transports
+        assert response.read()
+    gc.collect()
+
+    assert transport in closed_transports
+    assert manager.pool_stats()["sync"]["retired"] == 0
+    manager.close_all_clients()
+
+
+@pytest.mark.asyncio
+async def test_async_client_pool_evicts(mock_settings, closed_transports):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import asyncio
+    import gc
+
+    mock_settings.client_pool_max_clients = 1
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    a, b = (_credentials(mock_settings, key_id) for key_id in "ab")
+
+    transport_a = manager.async_client(a)._transport
+    client_b = manager.async_client(b)
+    gc.collect()
+    await asyncio.sleep(0)
+
+    assert transport_a in closed_transports
+    assert not client_b.is_closed
+    stats = manager.pool_stats()["async"]
+    assert stats["loops"] == 1
+    assert stats["size"] == 1
+    assert stats["evictions"] == 1
+    await manager.aclose_all_clients()
+    assert client_b.is_closed
+
+
+def test_async_client_pool_does_not_keep_loops(mock_settings):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    import asyncio
+    import gc
+
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+
+    async def create():
+        manager.async_client(_credentials(mock_settings))
+
+    asyncio.run(create())
+    gc.collect()
+
+    assert len(manager._async_clients) == 0
@@ -0,0 +1,181 @@
+"""Tests for the adaptive concurrency limiter."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.concurrency import AdaptiveConcurrencyLimiter
+from edutap.wallet_google.concurrency import is_overload
+from edutap.wallet_google.exceptions import ObjectAlreadyExistsException
+from edutap.wallet_google.exceptions import QuotaExceededException
+from edutap.wallet_google.exceptions import WalletException
+
+import asyncio
+import httpx
+import pytest
+import respx
+
+
+@pytest.mark.parametrize(
+    "error,expected",
+    [
+        (QuotaExceededException("Quota exceeded", status_code=403), True),
+        (WalletException("Too many requests", status_code=429), True),
+        (WalletException("Service unavailable", status_code=503), True),
+        (httpx.ReadTimeout("Timed out"), True),
+        (WalletException("Access denied", status_code=403), False),
+        (ObjectAlreadyExistsException("Exists", status_code=409), False),
+        (LookupError("Not found"), False),
+        (ValueError("Invalid"), False),
+    ],
+)
+def test_is_overload(error, expected):
+    assert is_overload(error) is expected
+
+
+@pytest.mark.asyncio
+async def test_additive_increase():
+    limiter = AdaptiveConcurrencyLimiter(1, max_limit=3)
+    limits = []
+    for _ in range(6):
+        token = await limiter.acquire()
+        await limiter.release(token, 0.1)
+        limits.append(limiter.limit)
+
+    # one more request per round of limit requests
+    assert limits == [2, 2, 2, 3, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_multiplicative_decrease_once_per_round():
+    limiter = AdaptiveConcurrencyLimiter(8)
+    tokens = [await limiter.acquire() for _ in range(3)]
+
+    await limiter.release(tokens[0], 0.1, QuotaExceededException("Quota exceeded"))
+    # started before the cut, does not cut again
+    await limiter.release(tokens[1], 0.1, WalletException("Error", status_code=500))
+    assert limiter.limit == 4
+
+    await limiter.release(tokens[2], 0.1, LookupError("Not found"))
+    token = await limiter.acquire()
+    await limiter.release(token, 0.1, WalletException("Error", status_code=429))
+    assert limiter.limit == 2
+    assert limiter.stats() == {
+        "limit": 2,
+        "in_flight": 0,
+        "latency": None,
+        "decreases": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_min_limit():
+    limiter = AdaptiveConcurrencyLimiter(2, min_limit=2)
+    token = await limiter.acquire()
+    await limiter.release(token, 0.1, QuotaExceededException("Quota exceeded"))
+
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_latency_spike_decreases():
+    limiter = AdaptiveConcurrencyLimiter(8, max_limit=8)
+    for _ in range(3):
+        token = await limiter.acquire()
+        await limiter.release(token, 0.1)
+    assert limiter.limit == 8
+
+    token = await limiter.acquire()
+    await limiter.release(token, 0.5)
+
+    assert limiter.limit == 4
+    assert limiter.stats()["latency"] == pytest.approx(0.14)
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_slot():
+    limiter = AdaptiveConcurrencyLimiter(1)
+    token = await limiter.acquire()
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    await limiter.release(token, 0.1)
+
+    await asyncio.wait_for(waiting, 1)
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"initial": 0},
+        {"initial": 4, "min_limit": 5},
+        {"initial": 4, "max_limit": 2},
+        {"decrease": 1},
+    ],
+)
+def test_invalid_limits(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(**kwargs)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_acreate_many_adaptive(mock_async_session):
+    in_flight = 0
+    max_in_flight = 0
+    requests = 0
+
+    async def server(request):
+        nonlocal in_flight, max_in_flight, requests
+        requests += 1
+        number = requests
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            await asyncio.sleep(0.001)
+        finally:
+            in_flight -= 1
+        if number == 5:
+            return httpx.Response(503, text="Service unavailable")
+        return httpx.Response(200, content=request.content)
+
+    respx.post(client_pool.url("GenericObject")).mock(side_effect=server)
+    items = [
+        api.new("GenericObject", {"id": f"test.object.{num}", "classId": "test.class"})
+        for num in range(20)
+    ]
+    # only the 503 decreases the limit, not latency jitter of the test machine
+    limiter = AdaptiveConcurrencyLimiter(2, max_limit=4, latency_tolerance=float("inf"))
+
+    results = [result async for result in api.acreate_many(items, concurrency=limiter)]
+
+    failed = [result for result in results if isinstance(result, Exception)]
+    assert len(failed) == 1
+    assert failed[0].status_code == 503
+    assert max_in_flight <= 4
+    assert limiter.stats()["decreases"] == 1
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_alisting_many_adaptive(mock_async_session):
+    async def server(request):
+        class_id = request.url.params["classId"]
+        return httpx.Response(
+            200, json={"resources": [{"id": f"{class_id}.object", "classId": class_id}]}
+        )
+
+    respx.get(client_pool.url("GenericObject")).mock(side_effect=server)
+    class_ids = [f"test.class.{num}" for num in range(10)]
+    limiter = AdaptiveConcurrencyLimiter(1, max_limit=3)
+
+    results = [
+        item
+        async for item in api.alisting_many(
+            "GenericObject", class_ids, concurrency=limiter
+        )
+    ]
+
+    assert sorted(class_id for class_id, _ in results) == class_ids
+    assert limiter.limit == 3
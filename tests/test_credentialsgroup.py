@@ -0,0 +1,265 @@
+"""Tests for spreading the requests over the service accounts of a group."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.cache import read_cache
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.clientpool import ClientPoolManager
+from edutap.wallet_google.credentialsgroup import CredentialsGroup
+from edutap.wallet_google.exceptions import QuotaExceededException
+
+import httpx
+import pytest
+import respx
+
+
+CLASS_ID = "test.class.123"
+OBJECT_ID = "test.object.123"
+QUOTA_ERROR = {
+    "error": {
+        "code": 403,
+        "message": "Quota exceeded for quota metric 'Write requests'",
+    }
+}
+
+
+@pytest.fixture
+def account_session(monkeypatch):
+    """Clients telling the account they belong to in a header."""
+
+    def client(self, credentials=None):
+        return httpx.Client(headers={"x-account": credentials["private_key_id"]})
+
+    monkeypatch.setattr(ClientPoolManager, "client", client)
+
+
+def _account(key_id):
+    return {
+        "client_email": "wallet@example.com",
+        "private_key_id": key_id,
+        "private_key": "",
+    }
+
+
+def _group(**kwargs):
+    return CredentialsGroup([_account(key_id) for key_id in "abc"], **kwargs)
+
+
+def test_group_validation():
+    with pytest.raises(ValueError):
+        CredentialsGroup([])
+    with pytest.raises(ValueError):
+        CredentialsGroup([_account("a")], strategy="random")
+
+
+def test_round_robin():
+    group = _group()
+
+    selected = [group.select()["private_key_id"] for _ in range(6)]
+
+    assert selected == ["a", "b", "c", "a", "b", "c"]
+
+
+def test_least_loaded():
+    group = _group(strategy="least-loaded")
+    loads = {"wallet@example.com:a": 3, "wallet@example.com:b": 1}
+
+    selected = {
+        group.select(load=lambda key: loads.get(key, 1))["private_key_id"]
+        for _ in range(4)
+    }
+
+    assert selected == {"b", "c"}
+
+
+def test_affinity_sticks_to_account(clock):
+    group = _group()
+    account = group.select(OBJECT_ID)
+
+    assert all(group.select(OBJECT_ID) is account for _ in range(5))
+
+    group.drain(account)
+    moved = group.select(OBJECT_ID)
+    assert moved is not account
+    assert all(group.select(OBJECT_ID) is moved for _ in range(5))
+
+    clock[0] += group.drain_time
+    assert group.select(OBJECT_ID) is account
+
+
+def test_drain_and_restore(clock):
+    group = _group(drain_time=30)
+    a, b, c = group.members
+
+    group.drain(a)
+    assert {group.select()["private_key_id"] for _ in range(6)} == {"b", "c"}
+    assert [state["drained"] for state in group.states()] == [True, False, False]
+    assert group.states()[0]["back_in"] == 30
+
+    group.drain(b, duration=10)
+    group.drain(c, duration=20)
+    # all drained, the one back first is used
+    assert group.select() is b
+
+    group.restore(a)
+    assert group.select() is a
+
+
+@respx.mock
+def test_create_drains_account_over_quota(account_session, clock, object_data):
+    group = _group()
+    owner = group.select(OBJECT_ID)["private_key_id"]
+
+    def created(request):
+        if request.headers["x-account"] == owner:
+            return httpx.Response(403, json=QUOTA_ERROR)
+        return httpx.Response(200, content=request.content)
+
+    route = respx.post(client_pool.url("GenericObject")).mock(side_effect=created)
+
+    result = api.create(api.new("GenericObject", object_data()), credentials=group)
+
+    assert result.id == OBJECT_ID
+    accounts = [call.request.headers["x-account"] for call in route.calls]
+    assert accounts[0] == owner
+    assert accounts[1] != owner
+    drained = [state["drained"] for state in group.states()]
+    assert drained == [key_id == owner for key_id in "abc"]
+
+
+@respx.mock
+def test_cached_read_refreshed_by_write_on_other_account(
+    account_session, clock, monkeypatch
+):
+    monkeypatch.setattr(read_cache, "maxsize", 10)
+    read_cache.clear()
+    group = _group()
+    owner = group.select(CLASS_ID)
+    read_route = respx.get(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID})
+    )
+    respx.patch(client_pool.url("GenericClass", f"/{CLASS_ID}")).mock(
+        return_value=httpx.Response(200, json={"id": CLASS_ID, "enableSmartTap": True})
+    )
+
+    api.read("GenericClass", CLASS_ID, credentials=group)
+    group.drain(owner)
+    updated = api.update(api.new("GenericClass", {"id": CLASS_ID}), credentials=group)
+    clock[0] += group.drain_time
+
+    assert group.select(CLASS_ID) is owner
+    assert api.read("GenericClass", CLASS_ID, credentials=group) is updated
+    assert read_route.call_count == 1
+    read_cache.clear()
+
+
+@respx.mock
+def test_quota_of_all_accounts_exceeded(account_session, clock):
+    group = _group()
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(403, json=QUOTA_ERROR)
+    )
+
+    with pytest.raises(QuotaExceededException):
+        api.read("GenericObject", OBJECT_ID, credentials=group)
+
+    accounts = {call.request.headers["x-account"] for call in route.calls}
+    assert accounts == {"a", "b", "c"}
+
+
+@pytest.fixture
+def listing_page(object_data):
+    """Two pages of one object each, account "b" is over its quota."""
+
+    def page(request):
+        if request.headers["x-account"] == "b":
+            return httpx.Response(403, json=QUOTA_ERROR)
+        token = request.url.params.get("token")
+        return httpx.Response(
+            200,
+            json={
+                "resources": [object_data(f"{OBJECT_ID}.{token or 1}")],
+                "pagination": {
+                    "nextPageToken": None if token else "2",
+                    "resultsPerPage": 1,
+                },
+            },
+        )
+
+    return page
+
+
+@respx.mock
+@pytest.mark.parametrize("stream", [False, True])
+def test_listing_drains_account_over_quota(
+    account_session, clock, listing_page, stream
+):
+    group = _group()
+    route = respx.get(client_pool.url("GenericObject")).mock(side_effect=listing_page)
+
+    results = list(
+        api.listing(
+            "GenericObject", resource_id=CLASS_ID, credentials=group, stream=stream
+        )
+    )
+
+    assert [result.id for result in results] == [f"{OBJECT_ID}.1", f"{OBJECT_ID}.2"]
+    accounts = [call.request.headers["x-account"] for call in route.calls]
+    # the second page again on an account not drained
+    assert accounts[:2] == ["a", "b"]
+    assert len(accounts) == 3 and accounts[2] != "b"
+    assert [state["drained"] for state in group.states()] == [False, True, False]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_alisting_cursor_drains_account_over_quota(
+    monkeypatch, clock, listing_page
+):
+    group = _group()
+
+    def async_client(self, credentials=None):
+        return httpx.AsyncClient(headers={"x-account": credentials["private_key_id"]})
+
+    monkeypatch.setattr(ClientPoolManager, "async_client", async_client)
+    route = respx.get(client_pool.url("GenericObject")).mock(side_effect=listing_page)
+
+    cursor = api.alisting_cursor(
+        "GenericObject", resource_id=CLASS_ID, credentials=group, prefetch=0
+    )
+    results = [result.id async for result in cursor]
+
+    assert results == [f"{OBJECT_ID}.1", f"{OBJECT_ID}.2"]
+    accounts = [call.request.headers["x-account"] for call in route.calls]
+    # the second page again on an account not drained
+    assert accounts[:2] == ["a", "b"]
+    assert len(accounts) == 3 and accounts[2] != "b"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aupdate_on_account_of_object(monkeypatch, clock, object_data):
+    group = _group()
+    owner = group.select(OBJECT_ID)["private_key_id"]
+
+    def async_client(self, credentials=None):
+        return httpx.AsyncClient(headers={"x-account": credentials["private_key_id"]})
+
+    monkeypatch.setattr(ClientPoolManager, "async_client", async_client)
+    route = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    for _ in range(3):
+        await api.aupdate(api.new("GenericObject", object_data()), credentials=group)
+
+    assert {call.request.headers["x-account"] for call in route.calls} == {owner}
+
+
+def test_pool_selects_least_loaded(mock_settings):
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    group = _group(strategy="least-loaded")
+    loads = {"wallet@example.com:a": 2, "wallet@example.com:b": 0}
+    manager._in_flight = lambda key: loads.get(key, 1)
+
+    assert manager.select_credentials(group) is group.members[1]
@@ -0,0 +1,158 @@
+"""Tests for the prefetching listing cursors."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.cursor import AsyncListingCursor
+from edutap.wallet_google.cursor import ListingCursor
+
+import asyncio
+import httpx
+import pytest
+import respx
+import threading
+
+
+CLASS_ID = "test.class.123"
+
+
+def _page(num, next_page_token=None):
+    data = {
+        "resources": [
+            {"id": f"test.object.{num}.{index}", "classId": CLASS_ID}
+            for index in range(2)
+        ],
+        "pagination": {"resultsPerPage": 2},
+    }
+    if next_page_token:
+        data["pagination"]["nextPageToken"] = next_page_token
+    return httpx.Response(200, json=data)
+
+
+def _pages(count):
+    return [
+        _page(num, f"token{num + 1}" if num + 1 < count else None)
+        for num in range(count)
+    ]
+
+
+@respx.mock
+def test_listing_cursor(mock_session):
+    route = respx.get(client_pool.url("GenericObject")).mock(side_effect=_pages(3))
+
+    cursor = api.listing_cursor("GenericObject", resource_id=CLASS_ID, page_size=2)
+    result = [obj.id for obj in cursor]
+
+    assert len(result) == 6
+    assert result[0] == "test.object.0.0"
+    assert result[-1] == "test.object.2.1"
+    assert cursor.next_page_token is None
+    assert cursor.exhausted
+    assert route.calls[1].request.url.params["token"] == "token1"
+    assert route.calls[1].request.url.params["maxResults"] == "2"
+    with pytest.raises(RuntimeError):
+        list(cursor)
+
+
+@respx.mock
+def test_listing_cursor_max_pages_and_resume(mock_session):
+    route = respx.get(client_pool.url("GenericObject")).mock(side_effect=_pages(3))
+
+    cursor = api.listing_cursor("GenericObject", resource_id=CLASS_ID, max_pages=2)
+    assert len(list(cursor.pages())) == 2
+    assert cursor.next_page_token == "token2"
+    assert not cursor.exhausted
+    assert route.call_count == 2
+
+    resumed = api.listing_cursor(
+        "GenericObject",
+        resource_id=CLASS_ID,
+        next_page_token=cursor.next_page_token,
+    )
+    assert [obj.id for obj in resumed] == ["test.object.2.0", "test.object.2.1"]
+    assert route.calls[2].request.url.params["token"] == "token2"
+
+
+@respx.mock
+def test_listing_cursor_error(mock_session):
+    respx.get(client_pool.url("GenericObject")).mock(
+        side_effect=[_page(0, "token1"), httpx.Response(404, json={})]
+    )
+
+    cursor = api.listing_cursor("GenericObject", resource_id=CLASS_ID)
+    pages = cursor.pages()
+    assert len(next(pages)) == 2
+    with pytest.raises(LookupError):
+        next(pages)
+    assert cursor.next_page_token == "token1"
+
+
+def test_listing_cursor_invalid_input():
+    with pytest.raises(ValueError):
+        api.listing_cursor("GenericObject")
+    with pytest.raises(ValueError):
+        ListingCursor(lambda token: ([], None), prefetch=-1)
+
+
+def test_listing_cursor_prefetches():
+    requested = []
+    fetched = threading.Event()
+
+    def fetch_page(token):
+        requested.append(token)
+        if len(requested) == 3:
+            fetched.set()
+        num = len(requested)
+        return [], f"token{num}" if num < 5 else None
+
+    cursor = ListingCursor(fetch_page, prefetch=2)
+    pages = cursor.pages()
+    next(pages)
+    # while the first page is consumed, the next two are fetched
+    assert fetched.wait(timeout=5)
+    assert requested == [None, "token1", "token2"]
+    pages.close()
+
+
+def test_listing_cursor_no_prefetch():
+    requested = []
+
+    def fetch_page(token):
+        requested.append(token)
+        return [], "next"
+
+    cursor = ListingCursor(fetch_page, prefetch=0)
+    pages = cursor.pages()
+    next(pages)
+    next(pages)
+    assert requested == [None, "next"]
+    pages.close()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_alisting_cursor(mock_async_session):
+    respx.get(client_pool.url("GenericObject")).mock(side_effect=_pages(3))
+
+    cursor = api.alisting_cursor("GenericObject", resource_id=CLASS_ID)
+    result = [obj.id async for obj in cursor]
+
+    assert len(result) == 6
+    assert cursor.next_page_token is None
+
+
+@pytest.mark.asyncio
+async def test_alisting_cursor_prefetches():
+    requested = []
+
+    async def fetch_page(token):
+        requested.append(token)
+        return [], f"token{len(requested)}"
+
+    cursor = AsyncListingCursor(fetch_page, prefetch=1, max_pages=10)
+    async for _ in cursor.pages():
+        await asyncio.sleep(0.01)
+        break
+
+    # the page in use and one page ahead
+    assert requested == [None, "token1"]
+    assert cursor.next_page_token == "token1"
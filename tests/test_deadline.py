@@ -0,0 +1,269 @@
+"""Tests for deadlines and per-operation timeouts of API calls."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.deadline import current_deadline
+from edutap.wallet_google.deadline import Deadline
+from edutap.wallet_google.deadline import deadline
+from edutap.wallet_google.deadline import request_timeout
+from edutap.wallet_google.deadline import resolve_deadline
+from edutap.wallet_google.exceptions import DeadlineExceededException
+from edutap.wallet_google.exceptions import WalletException
+
+import asyncio
+import httpx
+import pytest
+import respx
+
+
+CLASS_ID = "test.class.123"
+OBJECT_ID = "test.object.123"
+
+
+def test_resolve_deadline_earlier_wins(clock):
+    assert resolve_deadline(None) is None
+    assert resolve_deadline(5).remaining() == 5
+
+    with deadline(10) as outer:
+        assert current_deadline() is outer
+        assert resolve_deadline(None) is outer
+        assert resolve_deadline(20) is outer
+        assert resolve_deadline(5).remaining() == 5
+        with deadline(30) as inner:
+            assert inner is outer
+        with deadline(2) as inner:
+            assert inner.remaining() == 2
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_request_timeout(clock, mock_settings):
+    assert request_timeout("read", None) is httpx.USE_CLIENT_DEFAULT
+    assert request_timeout("read", Deadline(3)) == httpx.Timeout(3)
+
+    mock_settings.operation_timeouts = {"read": 2}
+    assert request_timeout("read", None) == httpx.Timeout(2)
+    assert request_timeout("read", Deadline(1.5)) == httpx.Timeout(1.5)
+    assert request_timeout("list", None) is httpx.USE_CLIENT_DEFAULT
+
+    expired = Deadline(1)
+    clock[0] += 1
+    with pytest.raises(DeadlineExceededException, match="before read"):
+        request_timeout("read", expired)
+
+
+@respx.mock
+def test_read_timeout_capped(clock, mock_session, mock_settings, object_data):
+    mock_settings.operation_timeouts = {"read": 10}
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    api.read("GenericObject", OBJECT_ID)
+    api.read("GenericObject", OBJECT_ID, timeout=4)
+
+    timeouts = [call.request.extensions["timeout"]["read"] for call in route.calls]
+    assert timeouts == [10, 4]
+
+
+@respx.mock
+def test_read_not_started_after_deadline(clock, mock_session, object_data):
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+    expired = Deadline(1)
+    clock[0] += 2
+
+    with pytest.raises(DeadlineExceededException):
+        api.read("GenericObject", OBJECT_ID, timeout=expired)
+
+    assert route.call_count == 0
+
+
+@respx.mock
+def test_timeout_at_deadline_raises(clock, mock_session):
+    def timed_out(request):
+        clock[0] += 1
+        raise httpx.ReadTimeout("Timed out", request=request)
+
+    respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        side_effect=timed_out
+    )
+
+    with pytest.raises(DeadlineExceededException) as exc_info:
+        api.read("GenericObject", OBJECT_ID, timeout=1)
+
+    assert isinstance(exc_info.value.__cause__, httpx.ReadTimeout)
+
+
+@respx.mock
+def test_no_retry_past_deadline(clock, mock_session, mock_settings, monkeypatch):
+    mock_settings.retry_max_attempts = 3
+    mock_settings.retry_jitter = False
+    mock_settings.retry_base_delay = 2
+    sleeps = []
+    monkeypatch.setattr("edutap.wallet_google.retry.time.sleep", sleeps.append)
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(503, text="Service unavailable")
+    )
+
+    with pytest.raises(WalletException, match="503"):
+        api.read("GenericObject", OBJECT_ID, timeout=1.5)
+
+    assert route.call_count == 1
+    assert sleeps == []
+
+
+@respx.mock
+def test_update_timeout(clock, mock_session, mock_settings, object_data):
+    mock_settings.operation_timeouts = {"update": 3, "message": 1}
+    update_route = respx.patch(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+    message_route = respx.post(
+        client_pool.url("GenericObject", f"/{OBJECT_ID}/addMessage")
+    ).mock(return_value=httpx.Response(200, json={"resource": object_data()}))
+
+    api.update(api.new("GenericObject", object_data()))
+    api.message(
+        "GenericObject", OBJECT_ID, {"header": "Hello", "body": "World"}, timeout=5
+    )
+
+    assert update_route.calls.last.request.extensions["timeout"]["read"] == 3
+    assert message_route.calls.last.request.extensions["timeout"]["read"] == 1
+
+
+@respx.mock
+@pytest.mark.parametrize("stream", [False, True])
+def test_listing_pages_within_deadline(clock, mock_session, stream, object_data):
+    def page(request):
+        clock[0] += 1
+        return httpx.Response(
+            200,
+            json={
+                "resources": [object_data(f"{OBJECT_ID}.{clock[0]}")],
+                "pagination": {"nextPageToken": "next", "resultsPerPage": 1},
+            },
+        )
+
+    route = respx.get(client_pool.url("GenericObject")).mock(side_effect=page)
+
+    results = []
+    with pytest.raises(DeadlineExceededException):
+        for result in api.listing(
+            "GenericObject", resource_id=CLASS_ID, stream=stream, timeout=2.5
+        ):
+            results.append(result)
+
+    assert len(results) == 3
+    timeouts = [call.request.extensions["timeout"]["read"] for call in route.calls]
+    assert timeouts == [2.5, 1.5, 0.5]
+
+
+@respx.mock
+def test_create_many_deadline(clock, mock_session, object_data):
+    def created(request):
+        clock[0] += 1
+        return httpx.Response(200, content=request.content)
+
+    route = respx.post(client_pool.url("GenericObject")).mock(side_effect=created)
+    items = (
+        api.new("GenericObject", object_data(f"{OBJECT_ID}.{i}")) for i in range(4)
+    )
+
+    results = list(api.create_many(items, concurrency=1, timeout=2))
+
+    assert [type(result).__name__ for result in results] == [
+        "GenericObject",
+        "GenericObject",
+        "DeadlineExceededException",
+        "DeadlineExceededException",
+    ]
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aread_within_deadline_context(
+    clock, mock_async_session, mock_settings, object_data
+):
+    mock_settings.read_coalescing = False
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    with deadline(3):
+        await api.aread("GenericObject", OBJECT_ID)
+        clock[0] += 3
+        with pytest.raises(DeadlineExceededException):
+            await api.aread("GenericObject", f"{OBJECT_ID}.2")
+
+    assert route.calls.last.request.extensions["timeout"]["read"] == 3
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aread_cancelled_at_deadline(mock_async_session, mock_settings):
+    mock_settings.read_coalescing = False
+
+    async def hanging(request):
+        await asyncio.sleep(10)
+
+    respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        side_effect=hanging
+    )
+
+    with pytest.raises(DeadlineExceededException):
+        await asyncio.wait_for(
+            api.aread("GenericObject", OBJECT_ID, timeout=0.05), timeout=2
+        )
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aread_coalesced_waiters_keep_their_deadlines(
+    mock_async_session, object_data
+):
+    release = asyncio.Event()
+
+    async def slow(request):
+        await release.wait()
+        return httpx.Response(200, json=object_data())
+
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        side_effect=slow
+    )
+
+    short = asyncio.ensure_future(api.aread("GenericObject", OBJECT_ID, timeout=0.05))
+    long = asyncio.ensure_future(api.aread("GenericObject", OBJECT_ID, timeout=5))
+    with pytest.raises(DeadlineExceededException):
+        await short
+    assert not long.done()
+    release.set()
+
+    assert (await long).id == OBJECT_ID
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_acreate_many_deadline(clock, mock_async_session, object_data):
+    def created(request):
+        clock[0] += 1
+        return httpx.Response(200, content=request.content)
+
+    respx.post(client_pool.url("GenericObject")).mock(side_effect=created)
+    items = [
+        api.new("GenericObject", object_data(f"{OBJECT_ID}.{i}")) for i in range(3)
+    ]
+
+    results = [
+        result async for result in api.acreate_many(items, concurrency=1, timeout=1.5)
+    ]
+
+    assert [isinstance(result, DeadlineExceededException) for result in results] == [
+        False,
+        False,
+        True,
+    ]
@@ -0,0 +1,152 @@
+"""Tests for the issuer-wide NDJSON export."""
+
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.exceptions import WalletException
+from edutap.wallet_google.export import aexport
+from edutap.wallet_google.export import export
+from edutap.wallet_google.export import exportable_class_names
+
+import gzip
+import httpx
+import json
+import pytest
+import respx
+
+
+ISSUER_ID = "3388000000022141777"
+
+
+class StandInIssuer:
+    """Lists three generic classes with three objects each, in pages of two."""
+
+    def __init__(self):
+        self.classes = [f"{ISSUER_ID}.class.{num}" for num in range(3)]
+        self.requests = []
+        self.fail_on = set()
+
+    def _page(self, resources, token):
+        start = int(token or 0)
+        data = {
+            "resources": resources[start : start + 2],
+            "pagination": {"resultsPerPage": 2},
+        }
+        if start + 2 < len(resources):
+            data["pagination"]["nextPageToken"] = str(start + 2)
+        return data
+
+    def __call__(self, request):
+        params = request.url.params
+        key = (params.get("classId") or params["issuerId"], params.get("token"))
+        self.requests.append(key)
+        if key in self.fail_on:
+            self.fail_on.remove(key)
+            return httpx.Response(500, text="Backend Error")
+        if "issuerId" in params:
+            resources = [{"id": class_id} for class_id in self.classes]
+        else:
+            class_id = params["classId"]
+            resources = [
+                {"id": f"{class_id}.object.{num}", "classId": class_id}
+                for num in range(3)
+            ]
+        return httpx.Response(200, json=self._page(resources, params.get("token")))
+
+
+@pytest.fixture
+def issuer():
+    issuer = StandInIssuer()
+    with respx.mock:
+        respx.get(client_pool.url("GenericClass")).mock(side_effect=issuer)
+        respx.get(client_pool.url("GenericObject")).mock(side_effect=issuer)
+        yield issuer
+
+
+def _read(path):
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as file:
+        return [json.loads(line)["id"] for line in file]
+
+
+def _objects(directory, class_id, suffix=".ndjson"):
+    return _read(directory / "objects" / "GenericObject" / f"{class_id}{suffix}")
+
+
+def test_exportable_class_names():
+    names = exportable_class_names()
+    assert "GenericClass" in names
+    assert "FlightClass" in names
+    assert not [name for name in names if not name.endswith("Class")]
+
+
+def test_export(mock_session, issuer, tmp_path):
+    stats = export(tmp_path, ISSUER_ID, names=["GenericClass"], page_size=2)
+
+    assert stats == {"classes": 3, "objects": 9, "pages": 8}
+    assert _read(tmp_path / "classes" / "GenericClass.ndjson") == issuer.classes
+    for class_id in issuer.classes:
+        assert _objects(tmp_path, class_id) == [
+            f"{class_id}.object.{num}" for num in range(3)
+        ]
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text())
+    assert all(state["done"] for state in checkpoint["files"].values())
+
+    # a complete export is not fetched again
+    requests = len(issuer.requests)
+    assert export(tmp_path, ISSUER_ID, names=["GenericClass"])["pages"] == 0
+    assert len(issuer.requests) == requests
+
+
+def test_export_resumes(mock_session, issuer, tmp_path):
+    failing_class = issuer.classes[1]
+    issuer.fail_on = {(failing_class, "2"), (ISSUER_ID, "2")}
+
+    with pytest.raises(WalletException):
+        export(tmp_path, ISSUER_ID, names=["GenericClass"], concurrency=1)
+    issuer.requests.clear()
+    export(tmp_path, ISSUER_ID, names=["GenericClass"], concurrency=1)
+
+    # the first pages were not fetched again
+    assert (ISSUER_ID, None) not in issuer.requests
+    assert (failing_class, None) not in issuer.requests
+    assert (failing_class, "2") in issuer.requests
+    assert _read(tmp_path / "classes" / "GenericClass.ndjson") == issuer.classes
+    for class_id in issuer.classes:
+        assert len(_objects(tmp_path, class_id)) == 3
+
+
+def test_export_truncates_unrecorded_data(mock_session, issuer, tmp_path):
+    issuer.fail_on = {(issuer.classes[0], "2")}
+    with pytest.raises(WalletException):
+        export(tmp_path, ISSUER_ID, names=["GenericClass"], concurrency=1)
+    path = tmp_path / "objects" / "GenericObject" / f"{issuer.classes[0]}.ndjson"
+    with open(path, "ab") as file:
+        file.write(b'{"id": "half written')
+
+    export(tmp_path, ISSUER_ID, names=["GenericClass"], concurrency=1)
+
+    assert len(_objects(tmp_path, issuer.classes[0])) == 3
+
+
+def test_export_other_issuer(mock_session, issuer, tmp_path):
+    export(tmp_path, ISSUER_ID, names=["GenericClass"])
+    with pytest.raises(ValueError):
+        export(tmp_path, "other.issuer", names=["GenericClass"])
+    with pytest.raises(ValueError):
+        export(tmp_path, ISSUER_ID, names=["Issuer"])
+
+
+@pytest.mark.asyncio
+async def test_aexport_compressed_resumes(mock_async_session, issuer, tmp_path):
+    issuer.fail_on = {(issuer.classes[2], "2")}
+
+    with pytest.raises(WalletException):
+        await aexport(tmp_path, ISSUER_ID, names=["GenericClass"], compress=True)
+    stats = await aexport(tmp_path, ISSUER_ID, names=["GenericClass"], compress=True)
+
+    assert stats["classes"] == 0
+    assert stats["pages"] >= 1
+    assert _read(tmp_path / "classes" / "GenericClass.ndjson.gz") == issuer.classes
+    for class_id in issuer.classes:
+        assert _objects(tmp_path, class_id, ".ndjson.gz") == [
+            f"{class_id}.object.{num}" for num in range(3)
+        ]
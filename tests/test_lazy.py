@@ -0,0 +1,118 @@
+"""Tests for lazy record views of listing results."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.lazy import LazyRecord
+from edutap.wallet_google.models.datatypes import enums
+from edutap.wallet_google.models.passes import GenericObject
+from edutap.wallet_google.registry import lookup_model_by_name
+from pydantic import ValidationError
+
+import httpx
+import pytest
+import respx
+
+
+CLASS_ID = "test.class.123"
+
+
+def _record(num, **extra):
+    return {
+        "id": f"test.object.{num}",
+        "classId": CLASS_ID,
+        "state": "ACTIVE",
+        "hasUsers": True,
+        "header": {"defaultValue": {"language": "en", "value": f"Header {num}"}},
+        **extra,
+    }
+
+
+def test_lazy_record_fields():
+    record = LazyRecord(GenericObject, _record(1))
+
+    assert record.id == "test.object.1"
+    assert record.state == enums.State.ACTIVE
+    assert record.hasUsers is True
+    assert record.header.defaultValue.value == "Header 1"
+    assert record.header is record.header
+    assert record.cardTitle is None
+    assert record.raw["classId"] == CLASS_ID
+    with pytest.raises(AttributeError):
+        record.unknownField
+    with pytest.raises(AttributeError):
+        record.id = "other"
+
+
+def test_lazy_record_validates_on_access_only():
+    record = LazyRecord(GenericObject, _record(1, textModulesData="invalid"))
+
+    assert record.id == "test.object.1"
+    with pytest.raises(ValidationError):
+        record.textModulesData
+    with pytest.raises(ValidationError):
+        record.materialize()
+
+
+def test_lazy_record_missing_required_field():
+    record = LazyRecord(GenericObject, {"classId": CLASS_ID})
+
+    with pytest.raises(ValidationError):
+        record.id
+
+
+def test_lazy_record_materialize():
+    model = lookup_model_by_name("FlightObject")
+    data = {
+        "id": "test.flight.1",
+        "classId": CLASS_ID,
+        "reservationInfo": {"confirmationCode": "ABC123", "frequentFlyerInfo": None},
+    }
+    record = LazyRecord(model, data)
+
+    materialized = record.materialize()
+    assert isinstance(materialized, model)
+    assert materialized == model.model_validate(data)
+    assert record.reservationInfo == materialized.reservationInfo
+
+
+@respx.mock
+def test_listing_lazy(mock_session):
+    respx.get(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "resources": [_record(num) for num in range(3)],
+                "pagination": {"resultsPerPage": 3, "nextPageToken": "token1"},
+            },
+        )
+    )
+
+    result = list(
+        api.listing("GenericObject", resource_id=CLASS_ID, result_per_page=3, lazy=True)
+    )
+
+    assert all(isinstance(record, LazyRecord) for record in result[:-1])
+    assert [record.id for record in result[:-1]] == [
+        f"test.object.{num}" for num in range(3)
+    ]
+    assert result[-1] == "token1"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_alisting_lazy_stream(mock_async_session):
+    respx.get(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(
+            200, json={"resources": [_record(num) for num in range(3)]}
+        )
+    )
+
+    result = [
+        record
+        async for record in api.alisting(
+            "GenericObject", resource_id=CLASS_ID, lazy=True, stream=True
+        )
+    ]
+
+    assert [record.state for record in result] == [enums.State.ACTIVE] * 3
+    assert isinstance(result[0].materialize(), GenericObject)
@@ -0,0 +1,151 @@
+"""Tests for the client-side rate limiting of the pooled clients."""
+
+from edutap.wallet_google.clientpool import ClientPoolManager
+from edutap.wallet_google.deadline import deadline
+from edutap.wallet_google.exceptions import DeadlineExceededException
+from edutap.wallet_google.ratelimit import RateLimiter
+from edutap.wallet_google.settings import API_URL
+from edutap.wallet_google.settings import BATCH_URL
+from edutap.wallet_google.transports import AsyncPoolTransport
+from edutap.wallet_google.transports import operation_of
+from edutap.wallet_google.transports import PoolTransport
+
+import httpx
+import json
+import pytest
+import respx
+
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+
+@pytest.fixture
+def limiter_clock(monkeypatch):
+    """Let time pass only when the rate limiter sleeps."""
+    now = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    async def asleep(seconds):
+        sleep(seconds)
+
+    monkeypatch.setattr("edutap.wallet_google.ratelimit.time.monotonic", lambda: now[0])
+    monkeypatch.setattr("edutap.wallet_google.ratelimit.time.sleep", sleep)
+    monkeypatch.setattr("edutap.wallet_google.ratelimit.asyncio.sleep", asleep)
+    return sleeps
+
+
+def _ok(request):
+    return httpx.Response(200, json={})
+
+
+@pytest.mark.parametrize(
+    "method,path,operation",
+    [
+        ("GET", "/genericObject?classId=c", "list"),
+        ("GET", "/genericObject/o1", "read"),
+        ("POST", "/genericObject", "create"),
+        ("PATCH", "/genericObject/o1", "update"),
+        ("PUT", "/genericObject/o1", "update"),
+        ("POST", "/genericObject/o1/addMessage", "message"),
+    ],
+)
+def test_operation_of(method, path, operation):
+    request = httpx.Request(method, f"{API_URL}{path}")
+    assert operation_of(request, API_URL, BATCH_URL) == operation
+
+
+def test_operation_of_other_requests():
+    assert operation_of(httpx.Request("POST", BATCH_URL), API_URL, BATCH_URL) == "batch"
+    assert operation_of(httpx.Request("POST", TOKEN_URL), API_URL, BATCH_URL) is None
+
+
+def test_transport_waits(limiter_clock):
+    limiter = RateLimiter(rate=10, burst=2, operation_rates={"update": 1})
+    transport = PoolTransport(
+        httpx.MockTransport(_ok), limiter=limiter, api_url=API_URL, batch_url=BATCH_URL
+    )
+    with httpx.Client(transport=transport) as client:
+        for _ in range(4):
+            client.get(f"{API_URL}/genericObject/o1")
+        client.post(TOKEN_URL)
+        client.patch(f"{API_URL}/genericObject/o1")
+        client.patch(f"{API_URL}/genericObject/o1")
+
+    # the second update waits for the update limit, minus the time already waited
+    assert limiter_clock == pytest.approx([0.1, 0.1, 0.1, 0.9])
+    assert set(limiter.tokens()) == {"*", "update"}
+
+
+@pytest.mark.asyncio
+async def test_async_transport_waits(limiter_clock):
+    limiter = RateLimiter(rate=5, burst=1)
+    transport = AsyncPoolTransport(
+        httpx.MockTransport(_ok), limiter=limiter, api_url=API_URL, batch_url=BATCH_URL
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(3):
+            await client.post(f"{API_URL}/genericObject")
+
+    assert limiter_clock == pytest.approx([0.2, 0.2])
+
+
+def test_transport_wait_within_deadline(limiter_clock):
+    limiter = RateLimiter(rate=1, burst=1)
+    transport = PoolTransport(
+        httpx.MockTransport(_ok), limiter=limiter, api_url=API_URL, batch_url=BATCH_URL
+    )
+    with httpx.Client(transport=transport) as client:
+        with deadline(0.5):
+            client.get(f"{API_URL}/genericObject/o1")
+            with pytest.raises(DeadlineExceededException):
+                client.get(f"{API_URL}/genericObject/o1")
+        client.get(f"{API_URL}/genericObject/o1")
+
+    # the token of the request not sent was given back
+    assert limiter_clock == pytest.approx([1.0])
+
+
+@respx.mock
+def test_client_pool_rate_limit(limiter_clock, mock_settings):
+    mock_settings.rate_limit_rps = 1
+    mock_settings.rate_limit_burst = 3
+    mock_settings.rate_limit_operations = {"read": 0.5}
+    respx.post(TOKEN_URL).mock(
+        return_value=httpx.Response(
+            200, json={"access_token": "token", "expires_in": 3600}
+        )
+    )
+    respx.get(f"{API_URL}/genericObject/o1").mock(side_effect=_ok)
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    client = manager.client(credentials)
+    client.get(f"{API_URL}/genericObject/o1")
+    client.get(f"{API_URL}/genericObject/o1")
+    manager.close_all_clients()
+
+    assert isinstance(client._transport, PoolTransport)
+    # the token request is not limited, the second read waits for the read limit
+    assert limiter_clock == pytest.approx([2.0])
+    (levels,) = manager.rate_limit_tokens().values()
+    assert levels["*"] == pytest.approx(3.0)
+    assert levels["read"] == pytest.approx(0.0)
+
+
+def test_client_pool_without_rate_limit(mock_settings):
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    client = manager.client(credentials)
+    manager.close_all_clients()
+
+    assert client._transport.limiter is None
+    assert manager.rate_limit_tokens() == {}
@@ -0,0 +1,299 @@
+"""Tests for the retries of failed API calls."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.exceptions import ObjectAlreadyExistsException
+from edutap.wallet_google.exceptions import WalletException
+from edutap.wallet_google.retry import add_retry_hook
+from edutap.wallet_google.retry import remove_retry_hook
+from edutap.wallet_google.retry import RetryPolicy
+
+import httpx
+import pytest
+import respx
+
+
+CLASS_ID = "test.class.123"
+OBJECT_ID = "test.object.123"
+QUOTA_ERROR = {"error": {"code": 403, "message": "Quota exceeded for quota metric"}}
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the backoff sleeps instead of sleeping."""
+    sleeps = []
+
+    async def asleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr("edutap.wallet_google.retry.time.sleep", sleeps.append)
+    monkeypatch.setattr("edutap.wallet_google.retry.asyncio.sleep", asleep)
+    return sleeps
+
+
+@pytest.fixture
+def retries(mock_settings):
+    """Enable retries with deterministic delays and record the retry events."""
+    mock_settings.retry_max_attempts = 3
+    mock_settings.retry_jitter = False
+    events = []
+    add_retry_hook(events.append)
+    yield events
+    remove_retry_hook(events.append)
+
+
+def test_policy_backoff():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=3, jitter=False)
+
+    assert [policy.delay(attempt) for attempt in range(1, 5)] == [0.5, 1, 2, 3]
+
+
+def test_policy_jitter(monkeypatch):
+    monkeypatch.setattr(
+        "edutap.wallet_google.retry.random.uniform", lambda low, high: high / 4
+    )
+    policy = RetryPolicy(max_attempts=5, base_delay=1)
+
+    assert policy.delay(3) == 1
+
+
+@pytest.mark.parametrize(
+    "retry_after,expected",
+    [
+        ("7", 7),
+        ("120", 30),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0),
+        ("soon", 2),
+    ],
+)
+def test_policy_retry_after(retry_after, expected):
+    policy = RetryPolicy(max_attempts=3, base_delay=1, jitter=False)
+    response = httpx.Response(429, headers={"Retry-After": retry_after})
+
+    assert policy.delay(2, response) == expected
+
+
+@pytest.mark.parametrize(
+    "response,expected",
+    [
+        (httpx.Response(429), True),
+        (httpx.Response(500), True),
+        (httpx.Response(503), True),
+        (httpx.Response(403, json=QUOTA_ERROR), True),
+        (httpx.Response(403, json={"error": {"message": "Permission denied"}}), False),
+        (httpx.Response(404), False),
+        (httpx.Response(409), False),
+    ],
+)
+def test_policy_is_retryable(response, expected):
+    assert RetryPolicy().is_retryable(response) is expected
+
+
+@respx.mock
+def test_read_retried(mock_session, retries, sleeps, object_data):
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        side_effect=[
+            httpx.Response(503),
+            httpx.Response(403, json=QUOTA_ERROR),
+            httpx.Response(200, json=object_data()),
+        ]
+    )
+
+    result = api.read("GenericObject", OBJECT_ID)
+
+    assert result.id == OBJECT_ID
+    assert route.call_count == 3
+    assert sleeps == [0.5, 1.0]
+    assert [(event.operation, event.attempt, event.reason) for event in retries] == [
+        ("read", 1, "503"),
+        ("read", 2, "403"),
+    ]
+
+
+@respx.mock
+def test_read_retries_exhausted(mock_session, retries, sleeps):
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(500, text="Internal error")
+    )
+
+    with pytest.raises(WalletException, match="500"):
+        api.read("GenericObject", OBJECT_ID)
+
+    assert route.call_count == 3
+    assert len(retries) == 2
+
+
+@respx.mock
+def test_read_not_retried_by_default(mock_session, mock_settings, sleeps):
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(503)
+    )
+
+    with pytest.raises(WalletException):
+        api.read("GenericObject", OBJECT_ID)
+
+    assert route.call_count == 1
+    assert sleeps == []
+
+
+@respx.mock
+def test_read_not_found_not_retried(mock_session, retries, sleeps):
+    route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(404)
+    )
+
+    with pytest.raises(LookupError):
+        api.read("GenericObject", OBJECT_ID)
+
+    assert route.call_count == 1
+    assert retries == []
+
+
+@respx.mock
+def test_read_transport_error_retried(mock_session, retries, sleeps, object_data):
+    respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        side_effect=[
+            httpx.ConnectError("Connection refused"),
+            httpx.Response(200, json=object_data()),
+        ]
+    )
+
+    assert api.read("GenericObject", OBJECT_ID).id == OBJECT_ID
+    assert retries[0].reason == "ConnectError"
+
+
+@respx.mock
+def test_create_409_after_retry_reads(mock_session, retries, sleeps, object_data):
+    respx.post(client_pool.url("GenericObject")).mock(
+        side_effect=[
+            httpx.ReadTimeout("Timed out"),
+            httpx.Response(409, json={"error": {"code": 409}}),
+        ]
+    )
+    read_route = respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    result = api.create(api.new("GenericObject", object_data()))
+
+    assert result.id == OBJECT_ID
+    assert read_route.call_count == 1
+
+
+@respx.mock
+def test_create_409_on_first_attempt_raises(mock_session, retries, sleeps, object_data):
+    respx.post(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(409, json={"error": {"code": 409}})
+    )
+
+    with pytest.raises(ObjectAlreadyExistsException):
+        api.create(api.new("GenericObject", object_data()))
+
+    assert retries == []
+
+
+@respx.mock
+def test_create_without_id_not_retried(mock_session, retries, sleeps):
+    route = respx.post(client_pool.url("Issuer")).mock(return_value=httpx.Response(503))
+
+    with pytest.raises(WalletException):
+        api.create(api.new("Issuer", {"name": "Test Issuer"}))
+
+    assert route.call_count == 1
+    assert retries == []
+
+
+@respx.mock
+def test_update_not_retried(mock_session, retries, sleeps, object_data):
+    route = respx.put(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(503)
+    )
+
+    with pytest.raises(WalletException):
+        api.update(api.new("GenericObject", object_data()), partial=False)
+
+    assert route.call_count == 1
+
+
+@respx.mock
+def test_listing_stream_retried(mock_session, retries, sleeps, object_data):
+    respx.get(client_pool.url("GenericObject")).mock(
+        side_effect=[
+            httpx.Response(429, headers={"Retry-After": "2"}),
+            httpx.Response(200, json={"resources": [object_data()]}),
+        ]
+    )
+
+    result = list(api.listing("GenericObject", resource_id=CLASS_ID, stream=True))
+
+    assert [obj.id for obj in result] == [OBJECT_ID]
+    assert sleeps == [2.0]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aread_retried(mock_async_session, retries, sleeps, object_data):
+    respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        side_effect=[httpx.Response(502), httpx.Response(200, json=object_data())]
+    )
+
+    result = await api.aread("GenericObject", OBJECT_ID)
+
+    assert result.id == OBJECT_ID
+    assert sleeps == [0.5]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_acreate_409_after_retry_reads(
+    mock_async_session, retries, sleeps, object_data
+):
+    respx.post(client_pool.url("GenericObject")).mock(
+        side_effect=[
+            httpx.Response(500),
+            httpx.Response(409, json={"error": {"code": 409}}),
+        ]
+    )
+    respx.get(client_pool.url("GenericObject", f"/{OBJECT_ID}")).mock(
+        return_value=httpx.Response(200, json=object_data())
+    )
+
+    result = await api.acreate(api.new("GenericObject", object_data()))
+
+    assert result.id == OBJECT_ID
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_acreate_without_id_not_retried(mock_async_session, retries, sleeps):
+    route = respx.post(client_pool.url("Issuer")).mock(return_value=httpx.Response(503))
+
+    with pytest.raises(WalletException):
+        await api.acreate(api.new("Issuer", {"name": "Test Issuer"}))
+
+    assert route.call_count == 1
+    assert retries == []
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_alisting_retried(mock_async_session, retries, sleeps, object_data):
+    route = respx.get(client_pool.url("GenericObject")).mock(
+        side_effect=[
+            httpx.Response(
+                200,
+                json={
+                    "resources": [object_data("o1")],
+                    "pagination": {"nextPageToken": "t1", "resultsPerPage": 1},
+                },
+            ),
+            httpx.Response(503),
+            httpx.Response(200, json={"resources": [object_data("o2")]}),
+        ]
+    )
+
+    result = [obj async for obj in api.alisting("GenericObject", resource_id=CLASS_ID)]
+
+    assert [obj.id for obj in result] == ["o1", "o2"]
+    assert route.calls[2].request.url.params["token"] == "t1"
+    assert [event.operation for event in retries] == ["list"]
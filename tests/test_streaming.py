@@ -0,0 +1,185 @@
+"""Tests for the incremental decoding of listing responses."""
+
+from edutap.wallet_google import api
+from edutap.wallet_google.clientpool import client_pool
+from edutap.wallet_google.registry import lookup_model_by_name
+from edutap.wallet_google.streaming import ListingPageDecoder
+from pydantic import ValidationError
+
+import httpx
+import json
+import pytest
+import respx
+
+
+CLASS_ID = "test.class.123"
+# brackets, quotes and escapes within strings must not confuse the decoder
+TRICKY_IDS = [f'test.object.{num}"}}]{{[\\' for num in range(3)]
+
+
+def _body(ids, next_page_token=None):
+    page = {
+        "pagination": {"resultsPerPage": len(ids)},
+        "resources": [
+            {
+                "id": object_id,
+                "classId": CLASS_ID,
+                "header": {"defaultValue": {"language": "en", "value": "]}\\"}},
+            }
+            for object_id in ids
+        ],
+    }
+    if next_page_token:
+        page["pagination"]["nextPageToken"] = next_page_token
+    return json.dumps(page, indent=2).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 100000])
+def test_decoder_chunks(chunk_size):
+    body = _body(TRICKY_IDS, 'token"1')
+    decoder = ListingPageDecoder(lookup_model_by_name("GenericObject"))
+    result = []
+    for start in range(0, len(body), chunk_size):
+        result += decoder.feed(body[start : start + chunk_size])
+    pagination = decoder.close()
+
+    assert [obj.id for obj in result] == TRICKY_IDS
+    assert pagination.nextPageToken == 'token"1'
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100000])
+def test_decoder_top_level_string_values(chunk_size):
+    # string values equal to the keys must not be taken for them
+    body = json.dumps(
+        {
+            "kind": "resources",
+            "resources": [{"id": "test.object.1", "classId": CLASS_ID}],
+            "next": "pagination",
+            "pagination": ["resources"],
+        }
+    ).encode()
+    decoder = ListingPageDecoder(lookup_model_by_name("GenericObject"))
+    result = []
+    for start in range(0, len(body), chunk_size):
+        result += decoder.feed(body[start : start + chunk_size])
+
+    assert [obj.id for obj in result] == ["test.object.1"]
+
+
+def test_decoder_yields_records_early():
+    body = _body(TRICKY_IDS)
+    second_record_end = body.index(b"}\n    }", body.index(TRICKY_IDS[1][:13].encode()))
+    decoder = ListingPageDecoder(lookup_model_by_name("GenericObject"))
+
+    assert len(decoder.feed(body[: second_record_end + 7])) == 2
+    assert len(decoder.feed(body[second_record_end + 7 :])) == 1
+
+
+def test_decoder_incomplete_body():
+    body = _body(TRICKY_IDS)
+    decoder = ListingPageDecoder(lookup_model_by_name("GenericObject"))
+    decoder.feed(body[:-10])
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_decoder_invalid_record():
+    decoder = ListingPageDecoder(lookup_model_by_name("GenericObject"))
+    with pytest.raises(ValidationError):
+        decoder.feed(b'{"resources": [{"id": "x", "unknownField": 1}]}')
+
+
+@respx.mock
+def test_listing_stream(mock_session):
+    route = respx.get(client_pool.url("GenericObject")).mock(
+        side_effect=[
+            httpx.Response(200, content=_body(TRICKY_IDS[:2], "token1")),
+            httpx.Response(200, content=_body(TRICKY_IDS[2:])),
+        ]
+    )
+
+    result = list(api.listing("GenericObject", resource_id=CLASS_ID, stream=True))
+
+    assert [obj.id for obj in result] == TRICKY_IDS
+    assert route.calls[1].request.url.params["token"] == "token1"
+
+
+@respx.mock
+def test_listing_stream_first_record_before_body_complete(mock_session):
+    body = _body(TRICKY_IDS)
+    sent = []
+
+    def chunks():
+        for start in range(0, len(body), 16):
+            sent.append(start)
+            yield body[start : start + 16]
+
+    respx.get(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(200, content=chunks())
+    )
+
+    listing = api.listing("GenericObject", resource_id=CLASS_ID, stream=True)
+    assert next(listing).id == TRICKY_IDS[0]
+    assert len(sent) < len(body) // 16
+    assert len(list(listing)) == 2
+
+
+@respx.mock
+def test_listing_stream_error(mock_session):
+    respx.get(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(404, json={"error": {"code": 404}})
+    )
+
+    with pytest.raises(LookupError):
+        list(api.listing("GenericObject", resource_id=CLASS_ID, stream=True))
+
+
+@respx.mock
+def test_listing_stream_authorized(mock_settings, monkeypatch):
+    from edutap.wallet_google.clientpool import ClientPoolManager
+
+    respx.post("https://oauth2.googleapis.com/token").mock(
+        return_value=httpx.Response(
+            200, json={"access_token": "token", "expires_in": 3600}
+        )
+    )
+    route = respx.get(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(200, content=_body(TRICKY_IDS))
+    )
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    monkeypatch.setattr("edutap.wallet_google.api.client_pool", manager)
+    with open(mock_settings.credentials_file) as file:
+        credentials = json.load(file)
+
+    result = list(
+        api.listing(
+            "GenericObject", resource_id=CLASS_ID, credentials=credentials, stream=True
+        )
+    )
+    manager.close_all_clients()
+
+    assert len(result) == 3
+    assert route.calls[0].request.headers["Authorization"] == "Bearer token"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_alisting_stream(mock_async_session):
+    respx.get(client_pool.url("GenericObject")).mock(
+        return_value=httpx.Response(200, content=_body(TRICKY_IDS, "token1"))
+    )
+
+    result = [
+        obj
+        async for obj in api.alisting(
+            "GenericObject",
+            resource_id=CLASS_ID,
+            result_per_page=3,
+            fields=["resources/id"],
+            stream=True,
+        )
+    ]
+
+    assert [obj.id for obj in result[:-1]] == TRICKY_IDS
+    assert result[-1] == "token1"
@@ -0,0 +1,225 @@
+"""Tests for the access tokens shared by the pooled clients."""
+
+from edutap.wallet_google.clientpool import ClientPoolManager
+from edutap.wallet_google.protocols import TokenStore
+from edutap.wallet_google.tokenstore import aobtain_token
+from edutap.wallet_google.tokenstore import FileTokenStore
+from edutap.wallet_google.tokenstore import MemoryTokenStore
+from edutap.wallet_google.tokenstore import obtain_token
+
+import asyncio
+import httpx
+import json
+import os
+import pytest
+import respx
+import stat
+import threading
+import time
+
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+
+@pytest.fixture(params=["memory", "file"])
+def store(request, tmp_path):
+    if request.param == "file":
+        return FileTokenStore(tmp_path / "tokens")
+    return MemoryTokenStore()
+
+
+@pytest.fixture
+def token_route():
+    with respx.mock:
+        yield respx.post(TOKEN_URL).mock(
+            return_value=httpx.Response(
+                200, json={"access_token": "token", "expires_in": 3600}
+            )
+        )
+
+
+def _token(access_token="token", expires_in=3600):
+    return {"access_token": access_token, "expires_at": int(time.time()) + expires_in}
+
+
+def _credentials(settings):
+    with open(settings.credentials_file) as file:
+        return json.load(file)
+
+
+def test_store_protocol(store):
+    assert isinstance(store, TokenStore)
+    assert store.get("key") is None
+
+    store.set("key", _token())
+
+    assert store.get("key")["access_token"] == "token"
+    assert store.get("other") is None
+
+
+def test_store_lock(store):
+    assert store.try_lock("key")
+    assert not store.try_lock("key")
+    assert store.try_lock("other")
+
+    store.unlock("key")
+
+    assert store.try_lock("key")
+    store.unlock("key")
+    store.unlock("other")
+
+
+def test_file_store_shared(tmp_path):
+    first = FileTokenStore(tmp_path)
+    second = FileTokenStore(tmp_path)
+
+    first.set("key", _token())
+    assert first.try_lock("key")
+
+    assert second.get("key")["access_token"] == "token"
+    assert not second.try_lock("key")
+    first.unlock("key")
+    assert second.try_lock("key")
+    second.unlock("key")
+
+
+def test_file_store_private(tmp_path):
+    store = FileTokenStore(tmp_path / "tokens")
+    store.set("key", _token())
+
+    (token_file,) = (tmp_path / "tokens").glob("*.json")
+    assert stat.S_IMODE(token_file.stat().st_mode) == 0o600
+    assert stat.S_IMODE((tmp_path / "tokens").stat().st_mode) == 0o700
+
+
+def test_file_store_refuses_shared_directory(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError, match="other users"):
+        FileTokenStore(shared)
+
+    private = tmp_path / "private"
+    private.mkdir(mode=0o700)
+    (tmp_path / "link").symlink_to(private)
+    with pytest.raises(PermissionError, match="not a directory"):
+        FileTokenStore(tmp_path / "link")
+
+
+def test_file_store_replaces_planted_files(tmp_path):
+    store = FileTokenStore(tmp_path / "tokens")
+    target = tmp_path / "target"
+    target.write_text("untouched")
+    # the predictable name of a temporary file
+    planted = store._path("key", f".{os.getpid()}.{threading.get_ident()}.tmp")
+    planted.symlink_to(target)
+
+    store.set("key", _token())
+
+    assert target.read_text() == "untouched"
+    assert store.get("key") == _token()
+    assert list((tmp_path / "tokens").glob("*.tmp")) == [planted]
+
+
+def test_file_store_corrupt(tmp_path):
+    store = FileTokenStore(tmp_path)
+    store.set("key", _token())
+    (token_file,) = tmp_path.glob("*.json")
+    token_file.write_text("{")
+
+    assert store.get("key") is None
+
+
+def test_obtain_token_fetches_once(store):
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        time.sleep(0.1)
+        return _token()
+
+    tokens = []
+    threads = [
+        threading.Thread(target=lambda: tokens.append(obtain_token(store, "k", fetch)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
+    assert [token["access_token"] for token in tokens] == ["token"] * 8
+
+
+def test_obtain_token_renews_expiring(store):
+    store.set("k", _token("old", expires_in=30))
+
+    assert obtain_token(store, "k", lambda: _token("new"))["access_token"] == "new"
+    assert obtain_token(store, "k", lambda: _token("newer"))["access_token"] == "new"
+    token = obtain_token(store, "k", lambda: _token("newer"), leeway=3600)
+    assert token["access_token"] == "newer"
+
+
+def test_obtain_token_stuck_lock(store, monkeypatch):
+    monkeypatch.setattr("edutap.wallet_google.tokenstore.LOCK_TIMEOUT", 0.1)
+    assert store.try_lock("k")
+
+    assert obtain_token(store, "k", lambda: _token())["access_token"] == "token"
+    store.unlock("k")
+
+
+@pytest.mark.asyncio
+async def test_aobtain_token_fetches_once(store):
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.1)
+        return _token()
+
+    tokens = await asyncio.gather(*(aobtain_token(store, "k", fetch) for _ in range(8)))
+
+    assert len(fetches) == 1
+    assert {token["access_token"] for token in tokens} == {"token"}
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_clients_share_token(mock_settings, token_route):
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+    credentials = _credentials(mock_settings)
+
+    manager.client(credentials).refresh_token()
+    client = manager.async_client(credentials)
+    await client.refresh_token()
+    manager.close_all_clients()
+    await manager.aclose_all_clients()
+
+    assert client.token["access_token"] == "token"
+    assert token_route.call_count == 1
+
+
+def test_processes_share_token(mock_settings, token_route, tmp_path):
+    mock_settings.token_store = "file"
+    mock_settings.token_store_directory = tmp_path
+    credentials = _credentials(mock_settings)
+    workers = [ClientPoolManager() for _ in range(3)]
+    for worker in workers:
+        worker.settings = mock_settings
+
+    for worker in workers:
+        worker.warmup([credentials])
+        worker.close_all_clients()
+
+    assert isinstance(workers[0].token_store, FileTokenStore)
+    assert token_route.call_count == 1
+
+
+def test_default_token_directory(mock_settings, tmp_path, monkeypatch):
+    mock_settings.token_store = "file"
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    manager = ClientPoolManager()
+    manager.settings = mock_settings
+
+    assert manager.token_store.directory == tmp_path / "edutap-wallet-google-tokens"